@@ -1,29 +1,47 @@
 import datetime
 import logging
+import re
 from urllib.parse import urlencode
 
 from django import forms
 from django.conf import settings
 from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.utils import get_fields_from_path
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import Group
 from django.db import models
-from django.db.models import Count, Exists, F, Func, OuterRef, Subquery, Value
+from django.db.models import Count, Exists, F, Func, OuterRef, Q, Subquery, Value
 from django.http import HttpResponseRedirect
 from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.html import format_html, format_html_join
 from django.utils.safestring import mark_safe
+from django.utils.text import smart_split, unescape_string_literal
 
 from admin_extra_buttons.api import ExtraButtonsMixin, button, confirm_action
 from durationwidget.widgets import TimeDurationWidget
+from phonenumber_field.modelfields import PhoneNumberField
 
-from .apis import twilio_phone_url_for
+from .audio import MOSTLY_SILENT_SPEECH_RATIO, SILENT_EFFECTIVE_DURATION, SILENT_SPEECH_RATIO
 from .constants import CORE_ENGLISH_SPEAKING_COUNTRIES, CORE_ENGLISH_SPEAKING_COUNTRIES_NAMES, SIMULATED_PREFIX
-from .models import HIT, Assignment, Caller, CallRecording, Topic, User, Voicemail, Worker, WorkerPageLoad
-from .twilio import twilio_client
-from .utils import block_or_unblock_workers, get_mturk_client, short_datetime_str
+from .jobs import enqueue
+from .models import (
+    HIT,
+    Assignment,
+    AutoBlock,
+    Caller,
+    CallRecording,
+    Job,
+    Topic,
+    User,
+    Voicemail,
+    Worker,
+    WorkerPageLoad,
+)
+from .utils import get_mturk_client, short_datetime_str
 
 
 logger = logging.getLogger(f"calls.{__name__}")
@@ -119,7 +137,49 @@ class NumAssignmentsMixin:
         return format_html('<a href="{}">{}</a>', f"{url}?{urlencode(query)}", obj.num_assignments)
 
 
-class BaseModelAdmin(ExtraButtonsMixin, admin.ModelAdmin):
+class IndexedSearchMixin:
+    # Searches each of search_fields with a lookup that an index can serve, and unions the primary keys of the matches.
+    # Django's default ORs together UPPER("field"::text) LIKE UPPER('%term%') across joined tables, which Postgres can
+    # only plan as a sequential scan. Plain fields match with icontains (trigram GIN indexes on UPPER(field)), and ones
+    # prefixed with "^" match by prefix (btree indexes). MTurk IDs match by prefix as typed or uppercased, and phone
+    # numbers by the digits typed.
+    PHONE_NUMBER_RE = re.compile(r"\+?[\d\s().-]+")
+
+    def is_phone_number_field(self, field_path):
+        return isinstance(get_fields_from_path(self.model, field_path.removeprefix("^"))[-1], PhoneNumberField)
+
+    def get_search_lookups(self, field_path, term):
+        if not field_path.startswith("^"):
+            return [Q(**{f"{field_path}__icontains": term})]
+
+        field_path = field_path.removeprefix("^")
+        if self.is_phone_number_field(field_path):
+            digits = re.sub(r"\D", "", term)
+            return [Q(**{f"{field_path}__startswith": f"+{digits}"})] if digits else []
+        return [Q(**{f"{field_path}__startswith": prefix}) for prefix in {term, term.upper()}]
+
+    def get_search_results(self, request, queryset, search_term):
+        search_fields = self.get_search_fields(request)
+        if not search_fields or not search_term:
+            return super().get_search_results(request, queryset, search_term)
+
+        terms = smart_split(search_term)
+        if self.PHONE_NUMBER_RE.fullmatch(search_term) and any(map(self.is_phone_number_field, search_fields)):
+            terms = (search_term,)  # Phone numbers are often typed with spaces
+
+        for term in terms:
+            if term.startswith(('"', "'")) and term[0] == term[-1]:
+                term = unescape_string_literal(term)
+            matches = [
+                self.model._default_manager.filter(lookup).order_by().values("pk")
+                for field_path in search_fields
+                for lookup in self.get_search_lookups(field_path, term)
+            ]
+            queryset = queryset.filter(pk__in=matches[0].union(*matches[1:])) if matches else queryset.none()
+        return queryset, False
+
+
+class BaseModelAdmin(IndexedSearchMixin, ExtraButtonsMixin, admin.ModelAdmin):
     date_hierarchy = "created_at"
     list_max_show_all = 2500
     list_per_page = 200
@@ -130,6 +190,21 @@ class BaseModelAdmin(ExtraButtonsMixin, admin.ModelAdmin):
         models.CharField: {"widget": forms.TextInput(attrs={"style": "width: 75%"})},
     }
 
+    def enqueue_job(self, request, task_name, description, *, key="", **kwargs):
+        # Heavy operations run in the background (see ./manage.py run_jobs), rather than holding up the request
+        job = enqueue(task_name, key=key, created_by=request.user, **kwargs)
+        self.message_user(
+            request,
+            format_html(
+                '{} in the background. Follow its progress as <a href="{}">job #{}</a>.',
+                description,
+                reverse("admin:api_job_change", args=(job.id,)),
+                job.id,
+            ),
+            messages.WARNING,
+        )
+        return job
+
 
 def has_publish_permission(request, hit, **kwargs):
     return request.user.is_superuser and hit.status == HIT.Status.LOCAL
@@ -156,10 +231,15 @@ class HITAdmin(NumAssignmentsMixin, BaseModelAdmin):
         "Assignment Settings",
         {"fields": ("assignment_number", "assignment_reward", "assignment_duration")},
     )
+    FIELDSET_SCHEDULE = (
+        "Schedule",
+        {"fields": ("publish_at", "publish_to_production", "show_ends_at", "expired_at", "max_assignment_number")},
+    )
     add_fieldsets = (
         (None, {"fields": ("name", "topic", "show_host")}),
         FIELDSET_HIT_SETTINGS,
         FIELDSET_ASSIGNMENT_SETTINGS,
+        FIELDSET_SCHEDULE,
         FIELDSET_QUALIFICATIONS,
         (
             "Miscellaneous",
@@ -194,6 +274,7 @@ class HITAdmin(NumAssignmentsMixin, BaseModelAdmin):
         ),
         FIELDSET_HIT_SETTINGS,
         FIELDSET_ASSIGNMENT_SETTINGS,
+        FIELDSET_SCHEDULE,
         FIELDSET_QUALIFICATIONS,
         (
             "Miscellaneous",
@@ -229,6 +310,7 @@ class HITAdmin(NumAssignmentsMixin, BaseModelAdmin):
         "approval_code",
         "created_at",
         "created_by",
+        "expired_at",
         "get_amazon_status",
         "get_cost_estimate",
         "get_unit_cost",
@@ -247,6 +329,8 @@ class HITAdmin(NumAssignmentsMixin, BaseModelAdmin):
         "description",
         "duration",
         "keywords",
+        "publish_at",
+        "publish_to_production",
         "qualification_adult",
         "qualification_approval_rate",
         "qualification_countries",
@@ -255,8 +339,9 @@ class HITAdmin(NumAssignmentsMixin, BaseModelAdmin):
         "title",
     )
     list_filter = ("status", "submitted_at", "created_at")
-    search_fields = ("amazon_id", "name")
+    search_fields = ("^amazon_id", "name")
     date_hierarchy = "submitted_at"
+    actions = ("bulk_publish_to_sandbox", "bulk_publish_to_production")
 
     def get_changeform_initial_data(self, request):
         initial = super().get_changeform_initial_data(request)
@@ -280,9 +365,7 @@ class HITAdmin(NumAssignmentsMixin, BaseModelAdmin):
 
     @admin.display(description="Is running?", boolean=True)
     def is_running(self, obj: HIT):
-        if obj.submitted_at:
-            return obj.submitted_at + obj.duration >= timezone.now()
-        return False
+        return obj.is_running
 
     def get_fieldsets(self, request, obj: HIT = None):
         if obj is None:
@@ -293,6 +376,11 @@ class HITAdmin(NumAssignmentsMixin, BaseModelAdmin):
         readonly_fields = super().get_readonly_fields(request, obj)
         if obj is not None and obj.status != HIT.Status.LOCAL:
             return readonly_fields + self.submitted_additional_readonly_fields
+        # Scheduling a HIT publishes it, so takes the same permissions
+        if not self.has_publish_sandbox_permission(request):
+            readonly_fields += ("publish_at",)
+        if not self.has_publish_production_permission(request):
+            readonly_fields += ("publish_to_production",)
         return readonly_fields
 
     @button(permission=lambda request, hit, **kw: request.user.has_perm("api.preview_hit"))
@@ -317,10 +405,9 @@ class HITAdmin(NumAssignmentsMixin, BaseModelAdmin):
     )
     def publish_to_sandbox(self, request, pk):
         hit = get_object_or_404(HIT, pk=pk)
-        if hit.publish_to_mturk(production=False):
-            self.message_user(request, f"Published {hit.name} to the Sandbox! It should appear shortly.")
-        else:
-            self.message_user(request, f"An error occured while publishing {hit.name} to the Sandbox!", messages.ERROR)
+        self.enqueue_job(
+            request, "publish_hit", f"Publishing {hit.name} to the Sandbox", key=f"publish_hit:{hit.id}", hit_id=hit.id
+        )
 
     @button(
         html_attrs=attr_color("error"),
@@ -332,7 +419,14 @@ class HITAdmin(NumAssignmentsMixin, BaseModelAdmin):
         hit = get_object_or_404(HIT, pk=pk)
 
         def publish_to_production(request):
-            hit.publish_to_mturk(production=True)
+            self.enqueue_job(
+                request,
+                "publish_hit",
+                f"Publishing {hit.name} to Production",
+                key=f"publish_hit:{hit.id}",
+                hit_id=hit.id,
+                production=True,
+            )
             return redirect("admin:api_hit_change", object_id=hit.pk)
 
         return confirm_action(
@@ -342,11 +436,55 @@ class HITAdmin(NumAssignmentsMixin, BaseModelAdmin):
             description=f"HIT has an estimated cost of ${hit.get_cost_estimate()}.",
             message=format_html('Are you sure you want to publish HIT <em>"{}"</em> to Production?', hit.name),
             pk=pk,
-            success_message=f"Published {hit.name} to Production! It should appear shortly.",
             error_message=f"An error occured while publishing {hit.name} to production!",
             title="Publish HIT to Production",
         )
 
+    def has_publish_sandbox_permission(self, request):
+        return request.user.has_perm("api.publish_sandbox_hit")
+
+    def has_publish_production_permission(self, request):
+        return settings.ALLOW_MTURK_PRODUCTION_ACCESS and request.user.has_perm("api.publish_production_hit")
+
+    def enqueue_publish_hits(self, request, hits, *, production):
+        self.enqueue_job(
+            request,
+            "publish_hits",
+            f"Publishing {len(hits)} HIT(s) to {'Production' if production else 'the Sandbox'}",
+            hit_ids=[hit.id for hit in hits],
+            production=production,
+        )
+
+    @admin.action(description="Publish selected unpublished HIT(s) to the Sandbox", permissions=("publish_sandbox",))
+    def bulk_publish_to_sandbox(self, request, queryset):
+        if hits := list(queryset.filter(status=HIT.Status.LOCAL)):
+            self.enqueue_publish_hits(request, hits, production=False)
+        else:
+            self.message_user(request, "None of the selected HITs are unpublished!", messages.ERROR)
+
+    @admin.action(description="Publish selected unpublished HIT(s) to Production", permissions=("publish_production",))
+    def bulk_publish_to_production(self, request, queryset):
+        hits = list(queryset.filter(status=HIT.Status.LOCAL))
+        if not hits:
+            self.message_user(request, "None of the selected HITs are unpublished!", messages.ERROR)
+        elif request.POST.get("post"):
+            self.enqueue_publish_hits(request, hits, production=True)
+        else:
+            return TemplateResponse(
+                request,
+                "admin/api/hit/publish_confirmation.html",
+                {
+                    **self.admin_site.each_context(request),
+                    **self.add_balance_to_context(),
+                    "title": "Publish HITs to Production",
+                    "opts": self.model._meta,
+                    "hits": hits,
+                    "total_cost": sum(hit.get_cost_estimate() for hit in hits),
+                    "action": "bulk_publish_to_production",
+                    "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+                },
+            )
+
     def changeform_view(self, request, object_id, form_url, extra_context):
         if object_id is not None and request.method != "POST":
             self.run_hit_warning_messages(request, self.model.objects.get(id=object_id))
@@ -392,6 +530,18 @@ class HITAdmin(NumAssignmentsMixin, BaseModelAdmin):
         if obj.assignment_number > 150:
             warn(f"{name('assignment_number').capitalize()} is more than 150")
 
+        if obj.max_assignment_number is not None:
+            if obj.max_assignment_number <= obj.assignment_number:
+                warn(f"{name('max_assignment_number').capitalize()} isn't more than {name('assignment_number')}")
+            elif obj.assignment_number < 10 <= obj.max_assignment_number:
+                warn(
+                    f"{name('assignment_number').capitalize()} is less than 10, so MTurk won't top it up to more than 9"
+                    f" assignments (rather than {obj.max_assignment_number})"
+                )
+
+        if obj.publish_at and obj.show_ends_at and obj.show_ends_at <= obj.publish_at:
+            warn(f"{name('show_ends_at').capitalize()} isn't after {name('publish_at')}")
+
         if not (datetime.timedelta(days=1) <= obj.approval_delay <= datetime.timedelta(days=3)):
             warn(f"{name('approval_delay').capitalize()} should be between 1 and 3 days")
 
@@ -404,6 +554,60 @@ class HITAdmin(NumAssignmentsMixin, BaseModelAdmin):
             )
 
 
+class ConditionListFilter(admin.SimpleListFilter):
+    # List filter with a condition per lookup. Facets are counted with COUNT(*) FILTER (WHERE <condition>), rather
+    # than Django's default of a "pk IN (<filtered queryset>)" per lookup, which takes minutes on big tables.
+    def get_conditions(self) -> dict:
+        raise NotImplementedError
+
+    def queryset(self, request, queryset):
+        if (condition := self.get_conditions().get(self.value())) is not None:
+            queryset = queryset.filter(condition)
+        return queryset
+
+    def get_facet_counts(self, pk_attname, filtered_qs):
+        conditions = self.get_conditions()
+        return {
+            f"{i}__c": Count(pk_attname, filter=conditions[value]) for i, (value, _) in enumerate(self.lookup_choices)
+        }
+
+
+class SpeechListFilter(ConditionListFilter):
+    title = "speech"
+    parameter_name = "speech"
+    field_prefix = ""
+
+    def lookups(self, request, model_admin):
+        return (
+            ("silent", "Silent"),
+            ("mostly_silent", "Mostly silent"),
+            ("speech", "Speech"),
+            ("unanalyzed", "Not analyzed"),
+        )
+
+    def get_conditions(self):
+        ratio, duration = f"{self.field_prefix}speech_ratio", f"{self.field_prefix}effective_duration"
+        return {
+            "silent": Q(**{f"{ratio}__lt": SILENT_SPEECH_RATIO}) | Q(**{f"{duration}__lt": SILENT_EFFECTIVE_DURATION}),
+            "mostly_silent": Q(**{
+                f"{ratio}__gte": SILENT_SPEECH_RATIO,
+                f"{ratio}__lt": MOSTLY_SILENT_SPEECH_RATIO,
+                f"{duration}__gte": SILENT_EFFECTIVE_DURATION,
+            }),
+            "speech": Q(**{f"{ratio}__gte": MOSTLY_SILENT_SPEECH_RATIO, f"{duration}__gte": SILENT_EFFECTIVE_DURATION}),
+            "unanalyzed": Q(**{f"{ratio}__isnull": True}),
+        }
+
+
+class VoicemailSpeechListFilter(SpeechListFilter):
+    title = "voicemail speech"
+    parameter_name = "voicemail_speech"
+    field_prefix = "voicemail_"
+
+    def get_conditions(self):
+        return {value: ~Q(voicemail_url="") & condition for value, condition in super().get_conditions().items()}
+
+
 class WorkerAndAssignmentBaseAdmin(NumAssignmentsMixin, BaseModelAdmin):
     actions = ("mark_good_workers", "unmark_good_workers", "block_workers", "unblock_workers")
 
@@ -426,8 +630,7 @@ class WorkerAndAssignmentBaseAdmin(NumAssignmentsMixin, BaseModelAdmin):
         label="Resynchronize blocks",
     )
     def resync_blocks(self, request):
-        Worker.resync_blocks()
-        self.message_user(request, "Worker blocks have been resynchronized!")
+        self.enqueue_job(request, "resync_blocks", "Resynchronizing worker blocks", key="resync_blocks")
 
     def _get_worker_queryset(self, queryset):
         if self.model == Assignment:
@@ -436,17 +639,15 @@ class WorkerAndAssignmentBaseAdmin(NumAssignmentsMixin, BaseModelAdmin):
 
     @admin.action(description="Block selected worker(s)", permissions=("block",))
     def block_workers(self, request, queryset):
-        queryset = self._get_worker_queryset(queryset)
-        blocks = filter(None, (w.block() for w in queryset))
-        num_blocks = len(list(blocks))
-        self.message_user(request, f"Blocked {num_blocks} worker(s)", messages.WARNING)
+        amazon_ids = list(self._get_worker_queryset(queryset).values_list("amazon_id", flat=True))
+        self.enqueue_job(request, "block_workers", f"Blocking {len(amazon_ids)} worker(s)", amazon_ids=amazon_ids)
 
     @admin.action(description="Unblock selected worker(s)", permissions=("block",))
     def unblock_workers(self, request, queryset):
-        queryset = self._get_worker_queryset(queryset)
-        unblocks = filter(None, (w.unblock() for w in queryset))
-        num_unblocks = len(list(unblocks))
-        self.message_user(request, f"Unblocked {num_unblocks} worker(s)", messages.WARNING)
+        amazon_ids = list(self._get_worker_queryset(queryset).values_list("amazon_id", flat=True))
+        self.enqueue_job(
+            request, "block_workers", f"Unblocking {len(amazon_ids)} worker(s)", amazon_ids=amazon_ids, block=False
+        )
 
     @admin.action(description="Mark as good worker(s)", permissions=("change",))
     def mark_good_workers(self, request, queryset):
@@ -478,6 +679,10 @@ class AssignmentAdmin(HITListDisplayMixin, PrefetchRelatedMixin, WorkerAndAssign
         "left_voicemail",
         "voicemail_duration",
         "voicemail_url_display",
+        "voicemail_file",
+        "voicemail_speech_ratio",
+        "voicemail_peak_level",
+        "voicemail_effective_duration",
         "feedback",
         "get_amazon_status",
         "user_agent",
@@ -489,6 +694,7 @@ class AssignmentAdmin(HITListDisplayMixin, PrefetchRelatedMixin, WorkerAndAssign
         "worker_display",
         "hit_display",
         "left_voicemail",
+        "voicemail_speech_ratio",
         "get_call_duration",
         "last_progress",
         "num_assignments",
@@ -509,11 +715,15 @@ class AssignmentAdmin(HITListDisplayMixin, PrefetchRelatedMixin, WorkerAndAssign
         "user_agent",
         "voicemail_duration",
         "voicemail_url_display",
+        "voicemail_file",
+        "voicemail_speech_ratio",
+        "voicemail_peak_level",
+        "voicemail_effective_duration",
         "worker_blocked",
         "worker_display",
     )
-    list_filter = ("hit", "call_step", "worker__blocked", "worker__is_good_worker")
-    search_fields = ("amazon_id", "worker__name", "hit__name", "worker__amazon_id", "hit__amazon_id")
+    list_filter = ("hit", "call_step", VoicemailSpeechListFilter, "worker__blocked", "worker__is_good_worker")
+    search_fields = ("^amazon_id", "worker__name", "hit__name", "^worker__amazon_id", "^hit__amazon_id")
     prefetch_related = ("hit", "worker")
 
     @admin.display(description="Good worker", boolean=True, ordering="worker__is_good_worker")
@@ -531,7 +741,12 @@ class AssignmentAdmin(HITListDisplayMixin, PrefetchRelatedMixin, WorkerAndAssign
     @admin.display(description="Voicemail")
     def voicemail_url_display(self, obj: Assignment):
         if obj.voicemail_url:
-            return format_html('<a href="{}">{}</a>', obj.voicemail_url, obj.voicemail_url)
+            return format_html(
+                '{}<br><a href="{}">{}</a>',
+                format_html(PLAYER_HTML, obj.voicemail_file.url if obj.voicemail_file else obj.voicemail_url),
+                obj.voicemail_url,
+                obj.voicemail_url,
+            )
 
     @admin.display(boolean=True, ordering="voicemail_duration")
     def left_voicemail(self, obj: Assignment):
@@ -591,7 +806,7 @@ class WorkerAdmin(WorkerAndAssignmentBaseAdmin):
         "num_assignments",
         "blocked",
     )
-    search_fields = ("amazon_id", "name", "location")
+    search_fields = ("^amazon_id", "name", "location")
     list_filter = ("assignment__hit", "gender", "blocked", "is_good_worker")
     inlines = (AssignmentInline,)
 
@@ -638,36 +853,29 @@ class WorkerAdmin(WorkerAndAssignmentBaseAdmin):
         return redirect("admin:api_worker_change", object_id=worker.pk)
 
 
-class HasAssociatedWorkerListFilter(admin.SimpleListFilter):
+class HasAssociatedWorkerListFilter(ConditionListFilter):
     title = "has associated worker"
     parameter_name = "has_associated"
 
     def lookups(self, request, model_admin):
         return (("yes", "Yes"), ("no", "No"))
 
-    def queryset(self, request, queryset):
-        value = self.value()
-        if value == "yes":
-            queryset = queryset.filter(worker_id__isnull=False)
-        elif value == "no":
-            queryset = queryset.filter(worker_id__isnull=True)
-        return queryset
+    def get_conditions(self):
+        # IN rather than the worker_id annotation, so Postgres can hash the workers' IDs once
+        has_worker = Q(worker_amazon_id__in=Worker.objects.filter(amazon_id__isnull=False).values("amazon_id"))
+        return {"yes": has_worker, "no": ~has_worker}
 
 
-class IsGoodWorkerListFilter(admin.SimpleListFilter):
+class IsGoodWorkerListFilter(ConditionListFilter):
     title = "good worker"
     parameter_name = "is_good_worker"
 
     def lookups(self, request, model_admin):
         return (("yes", "Yes"), ("no", "No"))
 
-    def queryset(self, request, queryset):
-        value = self.value()
-        if value == "yes":
-            queryset = queryset.filter(is_good_worker=True)
-        elif value == "no":
-            queryset = queryset.filter(is_good_worker=False)
-        return queryset
+    def get_conditions(self):
+        is_good_worker = Q(worker_amazon_id__in=Worker.objects.filter(is_good_worker=True).values("amazon_id"))
+        return {"yes": is_good_worker, "no": ~is_good_worker}
 
 
 class WorkerPageLoadAdmin(BaseModelAdmin):
@@ -686,17 +894,15 @@ class WorkerPageLoadAdmin(BaseModelAdmin):
 
     @admin.action(description="Block selected worker(s)", permissions=("block",))
     def block_workers(self, request, queryset):
-        queryset = queryset.filter(is_good_worker=False).values_list("worker_amazon_id", flat=True)
-        blocks = filter(None, block_or_unblock_workers(queryset, block=True))
-        num_blocks = len(list(blocks))
-        self.message_user(request, f"Blocked {num_blocks} worker(s)", messages.WARNING)
+        amazon_ids = sorted(set(queryset.filter(is_good_worker=False).values_list("worker_amazon_id", flat=True)))
+        self.enqueue_job(request, "block_workers", f"Blocking {len(amazon_ids)} worker(s)", amazon_ids=amazon_ids)
 
     @admin.action(description="Unblock selected worker(s)", permissions=("block",))
     def unblock_workers(self, request, queryset):
-        queryset = queryset.values_list("worker_amazon_id", flat=True)
-        unblocks = filter(None, block_or_unblock_workers(queryset, block=False))
-        num_unblocks = len(list(unblocks))
-        self.message_user(request, f"Unblocked {num_unblocks} worker(s)", messages.WARNING)
+        amazon_ids = sorted(set(queryset.values_list("worker_amazon_id", flat=True)))
+        self.enqueue_job(
+            request, "block_workers", f"Unblocking {len(amazon_ids)} worker(s)", amazon_ids=amazon_ids, block=False
+        )
 
     def _display_helper(self, obj: WorkerPageLoad, field):
         id_value = getattr(obj, f"{field}_id")
@@ -739,9 +945,11 @@ class WorkerPageLoadAdmin(BaseModelAdmin):
                 is_good_worker=Exists(associated_worker_subquery.filter(is_good_worker=True)),
                 blocked=Exists(associated_worker_subquery.filter(blocked=True)),
                 **{
-                    f"{m._meta.model_name}_id": m.objects.filter(
-                        amazon_id=OuterRef(f"{m._meta.model_name}_amazon_id")
-                    ).values("id")[:1]
+                    f"{m._meta.model_name}_id": (
+                        m.objects.filter(amazon_id=OuterRef(f"{m._meta.model_name}_amazon_id"))
+                        .order_by()
+                        .values("id")[:1]
+                    )
                     for m in (Worker, Assignment, HIT)
                 },
             )
@@ -760,6 +968,107 @@ class WorkerPageLoadAdmin(BaseModelAdmin):
         return False
 
 
+class AutoBlockAdmin(BaseModelAdmin):
+    fields = list_display = readonly_fields = (
+        "worker_amazon_id",
+        "status",
+        "score",
+        "reason",
+        "created_at",
+        "processed_at",
+    )
+    list_filter = ("status",)
+    search_fields = ("^worker_amazon_id",)
+    actions = ("block_workers", "dismiss")
+
+    @admin.action(description="Block selected worker(s)", permissions=("block",))
+    def block_workers(self, request, queryset):
+        auto_block_ids = list(queryset.values_list("id", flat=True))
+        self.enqueue_job(
+            request,
+            "process_auto_blocks",
+            f"Blocking {len(auto_block_ids)} worker(s)",
+            auto_block_ids=auto_block_ids,
+        )
+
+    @admin.action(description="Dismiss selected worker(s)", permissions=("block",))
+    def dismiss(self, request, queryset):
+        num_dismissed = queryset.exclude(status=AutoBlock.Status.BLOCKED).update(
+            status=AutoBlock.Status.DISMISSED, processed_at=timezone.now()
+        )
+        self.message_user(request, f"Dismissed {num_dismissed} worker(s)", messages.WARNING)
+
+    @button(
+        html_attrs=attr_color("error"),
+        permission=lambda request, hit, **kw: request.user.has_perm("api.block_worker"),
+        label="Block all pending",
+    )
+    def block_pending(self, request):
+        self.enqueue_job(request, "process_auto_blocks", "Blocking all pending workers", key="process_auto_blocks")
+
+    def has_block_permission(self, request):
+        return request.user.has_perm("api.block_worker")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class JobAdmin(BaseModelAdmin):
+    list_display = (
+        "id",
+        "task",
+        "status",
+        "progress_display",
+        "attempts_display",
+        "created_by",
+        "created_at",
+        "started_at",
+        "finished_at",
+        "result",
+    )
+    fields = readonly_fields = list_display + ("kwargs", "key", "run_after", "locked_until", "error")
+    list_display_links = ("id", "task")
+    list_filter = ("status", "task")
+    actions = ("retry", "cancel")
+
+    @admin.display(description="Progress")
+    def progress_display(self, obj: Job):
+        if obj.progress_total:
+            return f"{obj.progress}/{obj.progress_total} ({obj.progress / obj.progress_total:.0%})"
+        return obj.progress or "-"
+
+    @admin.display(description="Attempts", ordering="attempts")
+    def attempts_display(self, obj: Job):
+        return f"{obj.attempts}/{obj.max_attempts}"
+
+    @admin.action(description="Retry selected failed or cancelled job(s)", permissions=("manage",))
+    def retry(self, request, queryset):
+        num_retried = 0
+        for job in queryset.filter(status__in=(Job.Status.FAILED, Job.Status.CANCELLED)):
+            enqueue(job.task, key=job.key, created_by=request.user, **job.kwargs)
+            num_retried += 1
+        self.message_user(request, f"Queued {num_retried} job(s) to be retried", messages.WARNING)
+
+    @admin.action(description="Cancel selected queued job(s)", permissions=("manage",))
+    def cancel(self, request, queryset):
+        num_cancelled = queryset.filter(status=Job.Status.QUEUED).update(
+            status=Job.Status.CANCELLED, finished_at=timezone.now()
+        )
+        self.message_user(request, f"Cancelled {num_cancelled} job(s)", messages.WARNING)
+
+    def has_manage_permission(self, request):
+        return request.user.has_perm("api.change_job")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 PLAYER_HTML = '<audio controls src="{}" style="height: 28px" />'
 LIST_BTN_HTML = '<a type="button" class="button" style="padding: 5px 7px; margin: 0" href="{}">{}</a>'
 
@@ -794,7 +1103,7 @@ class TopicAdmin(BaseModelAdmin):
 
     @admin.display(description="Player")
     def recording_player(self, obj):
-        return format_html(PLAYER_HTML, obj.recording.url)
+        return format_html(PLAYER_HTML, obj.recording_url)
 
     @staticmethod
     def topic_extra_context():
@@ -813,6 +1122,7 @@ class CallerAdmin(BaseModelAdmin):
     list_display = ("number", "name_display", "wants_calls", "location", "created_at", "call_now_btn")
     fields = ("name", "number", "wants_calls", "location", "created_at")
     readonly_fields = ("name_display", "created_at", "call_now_btn")
+    search_fields = ("^number", "name", "location")
     ordering = ("name",)
 
     @admin.display(description="Name", ordering="name")
@@ -826,17 +1136,7 @@ class CallerAdmin(BaseModelAdmin):
     )
     def call_now(self, request, pk):
         caller = Caller.objects.get(id=pk)
-        try:
-            twilio_client.calls.create(
-                url=twilio_phone_url_for("sip_outgoing_host", called_override=caller.number, domain_name=True),
-                to=f"sip:{settings.TWILIO_SIP_HOST_USERNAME}@{settings.TWILIO_SIP_DOMAIN}",
-                from_=caller.caller_id,
-            )
-        except Exception as e:
-            logger.exception(f"Error calling {caller}...")
-            self.message_error_to_user(request, e)
-        else:
-            self.message_user(request, f'Calling "{caller}" now!', level=messages.WARNING)
+        self.enqueue_job(request, "call_caller", f'Calling "{caller}"', caller_id=caller.id)
         return redirect("admin:api_caller_changelist")
 
     @admin.display(description="Call")
@@ -845,13 +1145,36 @@ class CallerAdmin(BaseModelAdmin):
 
 
 class VoicemailAndCallRecordingAdmin(BaseModelAdmin):
-    list_display = ("caller_display", "url_player", "duration", "created_at")
-    fields = ("caller_display_link", "url_player", "url_link", "duration", "created_at")
-    readonly_fields = ("caller_display", "caller_display_link", "url_link", "url_player", "duration", "created_at")
+    list_display = ("caller_display", "url_player", "duration", "speech_ratio", "effective_duration", "created_at")
+    fields = (
+        "caller_display_link",
+        "url_player",
+        "url_link",
+        "file",
+        "duration",
+        "speech_ratio",
+        "peak_level",
+        "effective_duration",
+        "created_at",
+    )
+    readonly_fields = (
+        "caller_display",
+        "caller_display_link",
+        "url_link",
+        "url_player",
+        "file",
+        "duration",
+        "speech_ratio",
+        "peak_level",
+        "effective_duration",
+        "created_at",
+    )
+    list_filter = (SpeechListFilter,)
 
     @admin.display(description="Player")
     def url_player(self, obj):
-        return format_html(PLAYER_HTML, obj.url)
+        # Prefer the local archived copy, falling back to streaming from Twilio if it hasn't been archived (yet)
+        return format_html(PLAYER_HTML, obj.file.url if obj.file else obj.url)
 
     @admin.display(description="URL link")
     def url_link(self, obj):
@@ -878,9 +1201,11 @@ class VoicemailAndCallRecordingAdmin(BaseModelAdmin):
 
 admin.site.unregister(Group)
 admin.site.register(Assignment, AssignmentAdmin)
+admin.site.register(AutoBlock, AutoBlockAdmin)
 admin.site.register(Caller, CallerAdmin)
 admin.site.register(CallRecording, VoicemailAndCallRecordingAdmin)
 admin.site.register(HIT, HITAdmin)
+admin.site.register(Job, JobAdmin)
 admin.site.register(Topic, TopicAdmin)
 admin.site.register(User, UserAdmin)
 admin.site.register(Worker, WorkerAdmin)
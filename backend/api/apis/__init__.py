@@ -1,6 +1,6 @@
 from .hit import api as hit_api
-from .twilio.mturk import api as twilio_mturk_api
+from .twilio.mturk import api as twilio_mturk_api, url_for as twilio_mturk_url_for
 from .twilio.phone import api as twilio_phone_api, url_for as twilio_phone_url_for
 
 
-__all__ = (hit_api, twilio_phone_api, twilio_phone_url_for, twilio_mturk_api)
+__all__ = (hit_api, twilio_phone_api, twilio_phone_url_for, twilio_mturk_api, twilio_mturk_url_for)
@@ -3,8 +3,6 @@ import logging
 import uuid
 
 from pydantic.alias_generators import to_camel
-from twilio.jwt.access_token import AccessToken
-from twilio.jwt.access_token.grants import VoiceGrant
 
 from django.conf import settings
 from django.db import transaction
@@ -15,6 +13,8 @@ from ninja.errors import AuthenticationError, HttpError, ValidationError
 
 from ..constants import ESTIMATED_BEFORE_VERIFIED_DURATION, NUM_WORDS_TO_PRONOUNCE, SIMULATED_PREFIX
 from ..models import HIT, WORKER_NAME_MAX_LENGTH, Assignment, Worker
+from ..ratelimit import RateLimited, rate_limited
+from ..tokens import get_identity_from_refresh_token, get_token, make_refresh_token
 
 
 api = NinjaAPI(urls_namespace="hit", docs_url=None)
@@ -45,6 +45,14 @@ def http_error_handler(request, exc):
     return api.create_response(request, {"success": False, "error": exc.message}, status=exc.status_code)
 
 
+@api.exception_handler(RateLimited)
+def rate_limited_handler(request, exc):
+    # Already logged (without a traceback, since there can be floods of these)
+    response = api.create_response(request, {"success": False, "error": exc.message}, status=exc.status_code)
+    response["Retry-After"] = str(max(round(exc.retry_after), 1))
+    return response
+
+
 class Schema(BaseSchema):
     class Config(BaseSchema.Config):
         alias_generator = to_camel
@@ -59,23 +67,14 @@ class BaseIn(Schema):
     assignment_id: str
 
 
-def get_token(worker):
-    token = AccessToken(
-        settings.TWILIO_ACCOUNT_SID, settings.TWILIO_API_KEY, settings.TWILIO_API_SECRET, identity=worker.id
-    )
-    grant = VoiceGrant(outgoing_application_sid=settings.TWILIO_TWIML_APP_SID)
-    token.add_grant(grant)
-    return token.to_jwt()
-
-
 def get_hit_and_common_handshake_out(request, handshake):
     hit = None
     try:
         if handshake.hit_id is not None:
-            hit = HIT.objects.get(amazon_id=handshake.hit_id)
+            hit = HIT.get_cached(amazon_id=handshake.hit_id)
         elif request.user.has_perm("api.preview_hit"):
             if handshake.db_id is not None:
-                hit = HIT.objects.get(id=handshake.db_id)
+                hit = HIT.get_cached(id=handshake.db_id)
             else:
                 hit = HIT.objects.latest()
     except HIT.DoesNotExist:
@@ -95,11 +94,8 @@ def get_hit_and_common_handshake_out(request, handshake):
     return hit, handshake_out
 
 
-def get_assignment(amazon_id, for_update=False) -> Assignment:
-    qs = Assignment.objects.filter(amazon_id=amazon_id)
-    if for_update:
-        qs = qs.select_for_update()
-    return qs.get()
+def get_assignment(amazon_id) -> Assignment:
+    return Assignment.objects.get(amazon_id=amazon_id)
 
 
 class HandshakeIn(Schema):
@@ -135,11 +131,14 @@ class HandshakeOut(HandshakePreviewOut):
     num_words_to_pronounce: int = NUM_WORDS_TO_PRONOUNCE
     name: str
     token: str
+    refresh_token: str
     worker_id: str
     location: str
 
 
 @api.post("handshake", response=HandshakeOut, by_alias=True)
+@rate_limited("handshake")
+@transaction.atomic
 def handshake(request, handshake: HandshakeIn):
     hit, handshake_out = get_hit_and_common_handshake_out(request, handshake)
     can_preview = request.user.has_perm("api.preview_hit")
@@ -179,7 +178,8 @@ def handshake(request, handshake: HandshakeIn):
         "gender": worker.gender,
         "hit_id": hit.amazon_id,
         "name": worker.name,
-        "token": get_token(worker),
+        "token": get_token(worker.id),
+        "refresh_token": make_refresh_token(worker.id),
         "worker_id": worker.amazon_id,
         "location": worker.location,
     }
@@ -190,10 +190,16 @@ class ProgressIn(BaseIn):
 
 
 @api.post("progress", response=BaseOut, by_alias=True)
-@transaction.atomic
+@rate_limited("progress", sheddable=True)
 def progress(request, progress: ProgressIn):
-    assignment = get_assignment(amazon_id=progress.assignment_id, for_update=True)
-    assignment.append_progress(progress.progress, backend=False)
+    # Appending is atomic, so no need to load (or lock) the assignment first
+    updated = Assignment.objects.filter(amazon_id=progress.assignment_id).update(
+        progress=Assignment.get_progress_append_expression(
+            [Assignment.encode_progress(progress.progress, backend=False)]
+        )
+    )
+    if not updated:
+        raise Http404
     return {"success": True}
 
 
@@ -201,10 +207,20 @@ class TokenOut(BaseOut):
     token: str
 
 
+class TokenIn(BaseIn):
+    refresh_token: str | None = None
+
+
 @api.post("token", response=TokenOut, by_alias=True)
-def token(request, token: BaseIn):
-    assignment = get_assignment(amazon_id=token.assignment_id)
-    return {"token": get_token(assignment.worker)}
+@rate_limited()
+def token(request, token: TokenIn):
+    # Refresh tokens from the handshake identify the worker without a database lookup
+    identity = None
+    if token.refresh_token:
+        identity = get_identity_from_refresh_token(token.refresh_token)
+    if identity is None:
+        identity = get_assignment(amazon_id=token.assignment_id).worker_id
+    return {"token": get_token(identity)}
 
 
 class NameIn(BaseIn):
@@ -213,6 +229,7 @@ class NameIn(BaseIn):
 
 
 @api.post("name", response=BaseOut, by_alias=True)
+@rate_limited()
 def name(request, name: NameIn):
     assignment = get_assignment(amazon_id=name.assignment_id)
 
@@ -227,7 +244,7 @@ def name(request, name: NameIn):
     assignment.append_progress(f"name change {worker.name}/{worker.gender} => {new_name}/{name.gender}")
     worker.name = new_name
     worker.gender = name.gender
-    worker.save()
+    worker.save(update_fields=("name", "gender"))
     return {"success": True}
 
 
@@ -243,28 +260,33 @@ class FinalizeOut(BaseOut):
 
 
 @api.post("finalize", response=FinalizeOut, by_alias=True)
+@rate_limited()
 @transaction.atomic
 def finalize(request, finalize: FinalizeIn):
-    # Status updating should be atomic
-    assignment = get_assignment(amazon_id=finalize.assignment_id, for_update=True)
+    # Status updating should be atomic (the call step transition is conditional, so no need to lock the row)
+    assignment = get_assignment(amazon_id=finalize.assignment_id)
     assignment.feedback = finalize.feedback.strip()
-    assignment.save()
 
     # Same as in frontend, if we got here it may be beacuse a call got disconnected abruptly
     # so a request to finalize should be accepted anyway
-    if assignment.call_step in (Assignment.CallStep.VOICEMAIL, Assignment.CallStep.CALL):
-        assignment.append_progress(f"finalize moving from {assignment.call_step} > {Assignment.CallStep.DONE}")
-        assignment.call_step = Assignment.CallStep.DONE
-        assignment.save()
+    call_step = assignment.call_step
+    if call_step in (Assignment.CallStep.VOICEMAIL, Assignment.CallStep.CALL):
+        assignment.append_progress(f"finalize moving from {call_step} > {Assignment.CallStep.DONE}")
+        call_step = Assignment.CallStep.DONE
 
-    if assignment.call_step == Assignment.CallStep.DONE:
+    if call_step == Assignment.CallStep.DONE:
         assignment.append_progress("finalize success, approval code granted")
+    else:
+        assignment.append_progress(f"finalize failure, wasn't in correct call step ({call_step})")
+    # Feedback, call step and progress in one UPDATE
+    assignment.transition(call_step, update_fields=("feedback",), conditional=True)
+
+    if assignment.call_step == Assignment.CallStep.DONE:
         return {
             "accepted": True,
-            "approval_code": assignment.hit.approval_code,
+            "approval_code": assignment.cached_hit.approval_code,
             "feedback": assignment.feedback or "[none]",
             "call_duration_seconds": round(assignment.get_call_duration().total_seconds()),
         }
     else:
-        assignment.append_progress(f"finalize failure, wasn't in correct call step ({assignment.call_step})")
         return {"accepted": False}
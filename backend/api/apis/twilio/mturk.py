@@ -11,10 +11,14 @@ from django.utils import timezone
 
 from ninja import Form
 
+from ... import holdqueue
 from ...constants import NUM_VERIFY_TRIES
-from ...models import Assignment
+from ...jobs import enqueue
+from ...models import Assignment, HoldQueueEntry
+from ...recordings import ANALYSIS_FIELDS, schedule_recording_archive
+from ...sounds import require_sounds
 from ...utils import is_subsequence, normalize_words_to_list
-from .utils import VoiceResponse, create_ninja_api, send_twilio_message_at_end_of_request
+from .utils import VoiceResponse, create_ninja_api, query_budget, send_twilio_message_at_end_of_request
 
 
 logger = logging.getLogger(f"calls.{__name__}")
@@ -25,6 +29,8 @@ logger = logging.getLogger(f"calls.{__name__}")
 # SIP_DONE_CODE = 200
 
 HOLD_MUSIC_TRACKS = 4
+# In call queue mode (HIT_CALL_QUEUE), the Twilio queue callers wait in for the host
+CALL_QUEUE_NAME = "hits"
 CALL = Assignment.CallStep.CALL
 DONE = Assignment.CallStep.DONE
 HOLD = Assignment.CallStep.HOLD
@@ -32,32 +38,35 @@ INITIAL = Assignment.CallStep.INITIAL
 VERIFIED = Assignment.CallStep.VERIFIED
 VOICEMAIL = Assignment.CallStep.VOICEMAIL
 
+require_sounds("beep", "busy-signal", "fun-music", *(f"hold-music-{i}" for i in range(1, HOLD_MUSIC_TRACKS + 1)))
+
 
 def to_pretty_minutes(timedelta):
     minutes = round(max(timedelta.total_seconds() / 60, 0))
     return f"{minutes} minute{'s' if minutes != 1 else ''}"
 
 
-def get_assignment_atomic(id) -> Assignment:
-    return Assignment.objects.select_for_update().get(id=id)
+def get_assignment(id) -> Assignment:
+    # Assignment with its HIT and worker in a single round-trip. No need to lock the row, since call step changes are
+    # conditional updates (see Assignment.transition), and progress is only ever appended to.
+    return Assignment.objects.select_related("hit", "worker").get(id=id)
 
 
 def update_assignment_call_step_and_message_client(
     request, call_sid, assignment: Assignment, call_step, *, countdown=None
-):
-    if call_step not in Assignment.CallStep.values:
-        raise Exception(f"Invalid call_step: {call_step}")
-
-    if call_step != assignment.call_step:
-        assignment.append_progress(f"call step {assignment.call_step} > {call_step}")
+) -> bool:
+    if assignment.transition(call_step, conditional=True):
+        send_twilio_message_at_end_of_request(request, call_sid, call_step, countdown)
+        return True
+    return False
 
-    assignment.call_step = call_step
-    assignment.save()
 
-    send_twilio_message_at_end_of_request(request, call_sid, call_step, countdown)
+def get_hold_countdown(assignment: Assignment) -> datetime.timedelta:
+    # Time left before the worker can leave a voicemail instead
+    return (assignment.cached_hit.leave_voicemail_after_duration + assignment.call_started_at) - timezone.now()
 
 
-def url_for(name, assignment=None, **params):
+def url_for(name, assignment=None, _external=False, **params):
     kwargs = {}
     if assignment is not None:
         kwargs["assignment_id"] = assignment.id
@@ -65,6 +74,8 @@ def url_for(name, assignment=None, **params):
     url = reverse(f"twilio_mturk:{name}", kwargs=kwargs)
     if params:
         url = f"{url}?{urlencode(params)}"
+    if _external:
+        url = f"https://{settings.DOMAIN_NAME}{url}"
     return url
 
 
@@ -72,9 +83,10 @@ api = create_ninja_api("mturk")
 
 
 @api.post("hit/outgoing")
+@query_budget(4)
 @transaction.atomic
 def hit_outgoing(request, assignment_id: Form[str], call_sid: Form[str], cheat: Form[bool] = False):
-    assignment = Assignment.objects.get(amazon_id=assignment_id)
+    assignment = Assignment.objects.select_related("worker").get(amazon_id=assignment_id)
     cheated = cheat and settings.DEBUG  # Only work in development
 
     response = VoiceResponse()
@@ -99,6 +111,7 @@ def hit_outgoing(request, assignment_id: Form[str], call_sid: Form[str], cheat:
 
 
 @api.post("hit/outgoing/{assignment_id}/verify")
+@query_budget(5)
 @transaction.atomic
 def hit_outgoing_verify(
     request,
@@ -108,7 +121,7 @@ def hit_outgoing_verify(
     first_run: bool = False,
     try_count: int = 1,
 ):
-    assignment = get_assignment_atomic(assignment_id)
+    assignment = get_assignment(assignment_id)
     response = VoiceResponse()
 
     if try_count > NUM_VERIFY_TRIES:
@@ -132,7 +145,7 @@ def hit_outgoing_verify(
             update_assignment_call_step_and_message_client(request, call_sid, assignment, VERIFIED)
             response.say(
                 "That is correct! Well done. You are now being connected to the radio show. The show is hosted by"
-                f" {assignment.hit.show_host}. The topic of conversation is: {assignment.hit.topic}."
+                f" {assignment.cached_hit.show_host}. The topic of conversation is: {assignment.cached_hit.topic}."
             )
             response.redirect(url_for("hit_outgoing_call", assignment))
             return response
@@ -169,16 +182,69 @@ def hit_outgoing_verify(
     return response
 
 
+def hold(request, call_sid, assignment: Assignment, countdown, num_ahead, *, response=None):
+    # Joins the hold queue (keeping its place if it's already queued) and loops through hold music
+    holdqueue.join(assignment)
+    assignment.append_progress(f"hold loop, countdown={countdown}, {num_ahead=}")
+    update_assignment_call_step_and_message_client(request, call_sid, assignment, HOLD, countdown=countdown)
+    response = response or VoiceResponse()
+    response.say(
+        f"You must wait for the host to answer your call for at least another {to_pretty_minutes(countdown)}, at which"
+        " point you can leave a voicemail and submit this assignment. NOTE: The host may answer sooner, so you may not"
+        f" have to wait the full {to_pretty_minutes(countdown)}."
+    )
+    return hold_loop(response, assignment, num_ahead)
+
+
+def hold_loop(response: VoiceResponse, assignment: Assignment, num_ahead):
+    hold_loop_music(response, num_ahead, random.randint(1, HOLD_MUSIC_TRACKS))
+    response.redirect(url_for("hit_outgoing_hold", assignment))
+    return response
+
+
+def leave_voicemail(request, call_sid, assignment: Assignment, *, response=None):
+    holdqueue.leave(assignment)
+    assignment.append_progress("finished hold loop, allowing voicemail")
+    update_assignment_call_step_and_message_client(request, call_sid, assignment, VERIFIED)
+    response = response or VoiceResponse()
+    response.say(
+        f"Since you have waited {to_pretty_minutes(assignment.cached_hit.leave_voicemail_after_duration)}, you may now"
+        " complete this assignment and submit it after leaving a voicemail. After you are done recording, press the"
+        " 'finish voicemail' button, or stay silent for a few moments. If you provide a silent voicemail, your"
+        " assignment will be rejected."
+    )
+    response.pause(1)
+    response.say("At the tone, please record your message.")
+    response.redirect(url_for("hit_outgoing_voicemail", assignment))
+    return response
+
+
 @api.post("hit/outgoing/{assignment_id}/call")
+@query_budget(12)
 @transaction.atomic
 def hit_outgoing_call(request, assignment_id, call_sid: Form[str]):
-    assignment = get_assignment_atomic(assignment_id)
+    assignment = get_assignment(assignment_id)
     if assignment.call_step == INITIAL:
         # Could have come here from cheating, so update status in that case
         update_assignment_call_step_and_message_client(request, call_sid, assignment, VERIFIED)
-    else:
-        # Since we're ringing, tell the user that via (but no need to update status)
-        send_twilio_message_at_end_of_request(request, call_sid, VERIFIED)
+
+    # Sent here from the hold loop when it's this worker's turn, or they've waited long enough to leave a voicemail
+    countdown = get_hold_countdown(assignment)
+    if assignment.call_step == HOLD and countdown <= datetime.timedelta(0):
+        return leave_voicemail(request, call_sid, assignment)
+    if settings.HIT_CALL_QUEUE:
+        return enqueue_call(request, call_sid, assignment, countdown)
+
+    is_turn, _, num_ahead = holdqueue.get_turn(assignment)
+    if not is_turn:
+        # Someone's ahead of them, so wait in line rather than dialing a host who's (likely) busy
+        response = VoiceResponse()
+        response.say("The host of the show is currently taking another call.")
+        return hold(request, call_sid, assignment, countdown, num_ahead, response=response)
+
+    holdqueue.take_turn(assignment)
+    # Since we're ringing, tell the user that via (but no need to update status)
+    send_twilio_message_at_end_of_request(request, call_sid, VERIFIED)
 
     response = VoiceResponse()
     dial = response.dial(
@@ -194,73 +260,215 @@ def hit_outgoing_call(request, assignment_id, call_sid: Form[str]):
     return response
 
 
+@api.post("hit/outgoing/{assignment_id}/hold")
+@query_budget(7)
+def hit_outgoing_hold(request, assignment_id):
+    # Every hold loop of every waiting worker comes here, so it only reads, besides its queue entry's heartbeat (and
+    # isn't in a transaction). Workers whose turn it is, or who can leave a voicemail, are sent to hit_outgoing_call to
+    # do the writing.
+    assignment = get_assignment(assignment_id)
+    response = VoiceResponse()
+    if get_hold_countdown(assignment) <= datetime.timedelta(0):
+        response.redirect(url_for("hit_outgoing_call", assignment))
+        return response
+
+    is_turn, is_queued, num_ahead = holdqueue.get_turn(assignment)
+    if is_turn or not is_queued:
+        # Not queued if they were presumed to have hung up, in which case they're queued up again
+        response.say("Trying to connect again now.")
+        response.redirect(url_for("hit_outgoing_call", assignment))
+        return response
+    holdqueue.touch(assignment)
+    return hold_loop(response, assignment, num_ahead)
+
+
+# Call queue mode (HIT_CALL_QUEUE): rather than a hold loop, callers wait in a Twilio queue, and the host is rung to
+# take the next one. Waiting is handled by Twilio, so the backend only hears about a caller when they join the queue,
+# get connected to the host or leave to record a voicemail.
+
+
+def enqueue_call(request, call_sid, assignment: Assignment, countdown):
+    response = VoiceResponse()
+    # Anything else is (say) a retried webhook after they were connected, so they're not queued or the host rung again
+    if assignment.call_step not in (VERIFIED, HOLD) or not update_assignment_call_step_and_message_client(
+        request, call_sid, assignment, HOLD, countdown=countdown
+    ):
+        assignment.append_progress(f"not joining call queue from call step {assignment.call_step}")
+        return response
+
+    holdqueue.join(assignment, call_sid=call_sid)
+    assignment.append_progress(f"joined call queue, countdown={countdown}")
+    enqueue("ring_host", key="ring_host")
+
+    response.say(
+        "The host of the show will answer your call as soon as they can. If you wait for more than another"
+        f" {to_pretty_minutes(countdown)}, you can leave a voicemail and submit this assignment instead."
+    )
+    response.enqueue(
+        CALL_QUEUE_NAME,
+        action=url_for("hit_outgoing_queue_done", assignment),
+        # The only timer, checked as callers wait
+        wait_url=url_for("hit_queue_wait", leave_after=max(round(countdown.total_seconds()), 0)),
+    )
+    return response
+
+
+def hold_loop_music(response: VoiceResponse, num_ahead, track):
+    if num_ahead == 1:
+        response.say("There is 1 caller ahead of you.")
+    elif num_ahead > 1:
+        response.say(f"There are {num_ahead} callers ahead of you.")
+    if settings.DEBUG:
+        response.play("busy-signal")  # Only play in dev, confusing for workers
+    else:
+        response.play(f"hold-music-{track}")
+    return response
+
+
+@api.post("hit/queue/wait")
+@query_budget(1)
+def hit_queue_wait(request, queue_time: Form[int], queue_position: Form[int], leave_after: int):
+    # Twilio's waitUrl, requested again each time its TwiML finishes for every waiting caller, so it doesn't touch the
+    # database. Callers that hang up are removed from the queue by Enqueue's action (hit_outgoing_queue_done).
+    response = VoiceResponse()
+    if queue_time >= leave_after:
+        response.leave()  # Sent to hit_outgoing_queue_done to leave a voicemail
+        return response
+    return hold_loop_music(response, queue_position - 1, random.randint(1, HOLD_MUSIC_TRACKS))
+
+
+@api.post("hit/outgoing/{assignment_id}/queue/done")
+@query_budget(9)
+@transaction.atomic
+def hit_outgoing_queue_done(request, assignment_id, call_sid: Form[str], queue_result: Form[str]):
+    # Enqueue's action, requested when the caller leaves the queue, or after the host's call with them ends
+    assignment = get_assignment(assignment_id)
+    response = VoiceResponse()
+    if queue_result == "bridged":
+        if assignment.call_step in (CALL, VOICEMAIL):
+            assignment.append_progress("queue call completed, marked done")
+            assignment.transition(DONE, conditional=True)
+        response.redirect(url_for("hit_outgoing_completed", assignment))
+    elif queue_result == "hangup":
+        assignment.append_progress("hung up in call queue")
+        holdqueue.leave(assignment)
+    elif queue_result == "leave" or (countdown := get_hold_countdown(assignment)) <= datetime.timedelta(0):
+        # Left when their wait was over, so they can leave a voicemail and be done
+        assignment.append_progress(f"left call queue, result={queue_result}")
+        leave_voicemail(request, call_sid, assignment, response=response)
+    else:
+        # The queue failed them (say, it was full) with time left to wait, so they keep their place in the hold loop,
+        # which queues them up again once it's their turn
+        assignment.append_progress(f"left call queue, result={queue_result}, falling back to hold loop")
+        _, _, num_ahead = holdqueue.get_turn(assignment)
+        hold(request, call_sid, assignment, countdown, num_ahead, response=response)
+    return response
+
+
+@api.post("hit/queue/bridge")
+@query_budget(8)
+@transaction.atomic
+def hit_queue_bridge(request, call_sid: Form[str]):
+    # Requested on the caller's call when the host's call takes them from the queue, right before they're connected
+    response = VoiceResponse()
+    entry = HoldQueueEntry.objects.select_related("assignment__hit", "assignment__worker").filter(call_sid=call_sid)
+    if entry := entry.first():
+        assignment = entry.assignment
+        holdqueue.host_answered()
+        holdqueue.leave(assignment)
+        update_assignment_call_step_and_message_client(
+            request, call_sid, assignment, CALL, countdown=assignment.cached_hit.min_call_duration
+        )
+        response.say("You are now being connected to the host.")
+    else:
+        logger.warning(f"Connecting unknown call {call_sid} from the call queue to the host")
+    return response
+
+
+@api.post("hit/queue/host")
+@query_budget(1)
+def hit_queue_host(request):
+    # The host's call, after they answer, taking callers from the queue until there are none left
+    response = VoiceResponse()
+    if holdqueue.get_call_queue().exists():
+        dial = response.dial(action=url_for("hit_queue_host"))
+        dial.queue(CALL_QUEUE_NAME, url=url_for("hit_queue_bridge", _external=True))
+    else:
+        response.say("There are no more callers waiting. Goodbye.")
+        response.hangup()
+    return response
+
+
+@api.post("hit/queue/host/callback")
+@query_budget(10)
+@transaction.atomic
+def hit_queue_host_callback(request, call_sid: Form[str], call_status: Form[str]):
+    # The host's call ended, so ring them again for the next caller, if there's anyone left waiting
+    holdqueue.release_host_ring(call_sid)
+    if call_status == "completed":
+        holdqueue.host_hung_up()
+        enqueue("ring_host", key="ring_host")
+    else:
+        holdqueue.host_busy()
+        enqueue("ring_host", key="ring_host", run_after=timezone.now() + holdqueue.RING_HOST_RETRY_AFTER)
+    return HttpResponse(status=204)
+
+
 @api.post("hit/outgoing/{assignment_id}/callback/answered")
+@query_budget(7)
 @transaction.atomic
 def hit_outgoing_callback_answered(request, assignment_id, call_status: Form[str], parent_call_sid: Form[str]):
-    assignment = get_assignment_atomic(assignment_id)
+    assignment = get_assignment(assignment_id)
     if call_status == "in-progress":  # Answered
+        holdqueue.host_answered()
+        holdqueue.leave(assignment)
         update_assignment_call_step_and_message_client(
-            request, parent_call_sid, assignment, CALL, countdown=assignment.hit.min_call_duration
+            request, parent_call_sid, assignment, CALL, countdown=assignment.cached_hit.min_call_duration
         )
     elif call_status == "completed":
+        holdqueue.host_hung_up()
         if assignment.call_step in (CALL, VOICEMAIL):
             # Don't message this to client, they can get to final call_step if call is in
             # CALL or VOICEMAIL status anyway, we get here after a hangup.
             assignment.append_progress("call completed, marked done (probably a hang up)")
-            assignment.call_step = DONE
-            assignment.save()
+            assignment.transition(DONE, conditional=True)
         else:
             assignment.append_progress("call completed, not marked done")
     return HttpResponse(status=204)
 
 
 @api.post("hit/outgoing/{assignment_id}/call/done")
+@query_budget(10)
 @transaction.atomic
 def hit_outgoing_call_done(request, assignment_id, call_sid: Form[str], dial_call_status: Form[str]):
-    assignment = get_assignment_atomic(assignment_id)
+    assignment = get_assignment(assignment_id)
 
     response = VoiceResponse()
 
     if dial_call_status == "completed":
+        # The answered callback's completed event says the same, but it's a separate request that may never arrive,
+        # which would hold up the queue
+        holdqueue.host_hung_up()
         response.redirect(url_for("hit_outgoing_completed", assignment))
 
     elif dial_call_status in ("no-answer", "busy"):
-        countdown = (assignment.hit.leave_voicemail_after_duration + assignment.call_started_at) - timezone.now()
+        holdqueue.host_busy()
         response.say("The host of the show is currently taking another call.")
+        countdown = get_hold_countdown(assignment)
         if countdown > datetime.timedelta(0):
-            assignment.append_progress(f"hold loop, countdown={countdown}")
-            update_assignment_call_step_and_message_client(request, call_sid, assignment, HOLD, countdown=countdown)
-            response.say(
-                f"You must wait for the host to answer your call for at least another {to_pretty_minutes(countdown)},"
-                " at which point you can leave a voicemail and submit this assignment. NOTE: The host"
-                f" may answer sooner, so you may not have to wait the full {to_pretty_minutes(countdown)}."
-            )
-            if settings.DEBUG:
-                response.play("busy-signal")  # Only play in dev, confusing for workers
-            else:
-                response.play(f"hold-music-{random.randint(1, HOLD_MUSIC_TRACKS)}")
-            response.say("Trying to connect again now.")
-            response.redirect(url_for("hit_outgoing_call", assignment))
+            _, _, num_ahead = holdqueue.get_turn(assignment)
+            hold(request, call_sid, assignment, countdown, num_ahead, response=response)
         else:
-            assignment.append_progress("finished hold loop, allowing voicemail")
-            update_assignment_call_step_and_message_client(request, call_sid, assignment, VERIFIED)
-            response.say(
-                f"Since you have waited {to_pretty_minutes(assignment.hit.leave_voicemail_after_duration)}, you may now"
-                " complete this assignment and submit it after leaving a voicemail. After you are done recording,"
-                " press the 'finish voicemail' button, or stay silent for a few moments. If you provide a silent"
-                " voicemail, your assignment will be rejected."
-            )
-            response.pause(1)
-            response.say("At the tone, please record your message.")
-            response.redirect(url_for("hit_outgoing_voicemail", assignment))
+            leave_voicemail(request, call_sid, assignment, response=response)
 
     return response
 
 
 @api.post("hit/outgoing/{assignment_id}/voicemail")
+@query_budget(4)
 @transaction.atomic
 def hit_outgoing_voicemail(request, assignment_id, call_sid: Form[str]):
-    assignment = get_assignment_atomic(assignment_id)
+    assignment = get_assignment(assignment_id)
     update_assignment_call_step_and_message_client(request, call_sid, assignment, VOICEMAIL)
 
     response = VoiceResponse()
@@ -275,22 +483,27 @@ def hit_outgoing_voicemail(request, assignment_id, call_sid: Form[str]):
 
 
 @api.post("hit/outgoing/{assignment_id}/callback/voicemail")
+@query_budget(4)
 @transaction.atomic
 def hit_outgoing_callback_voicemail(request, assignment_id, recording_duration: Form[int], recording_url: Form[str]):
-    # Callback may come from twilio at any time, causing a race condition, so do this in a transaction
-    assignment = get_assignment_atomic(assignment_id)
+    # Callback may come from twilio at any time, so merge with whatever else is being written (ie, the call step)
+    assignment = get_assignment(assignment_id)
     assignment.append_progress("voicemail callback")
-    assignment.voicemail_url = recording_url
-    assignment.voicemail_duration = datetime.timedelta(seconds=recording_duration)
-    assignment.save()
+    values = {"voicemail_url": recording_url, "voicemail_duration": datetime.timedelta(seconds=recording_duration)}
+    if recording_url != assignment.voicemail_url:
+        # Re-recorded, so the previous recording's archived copy and analysis no longer apply
+        values.update(voicemail_file="", **{f"voicemail_{field}": None for field in ANALYSIS_FIELDS})
+    if assignment.merge_update(**values):
+        schedule_recording_archive(assignment, prefix="voicemail_")
 
     return HttpResponse(status=204)
 
 
 @api.post("hit/outgoing/{assignment_id}/completed")
+@query_budget(5)
 @transaction.atomic
 def hit_outgoing_completed(request, assignment_id, call_sid: Form[str]):
-    assignment = get_assignment_atomic(assignment_id)
+    assignment = get_assignment(assignment_id)
     update_assignment_call_step_and_message_client(request, call_sid, assignment, DONE)
 
     response = VoiceResponse()
@@ -12,6 +12,8 @@ from ninja import Form
 
 from ....constants import LOCATION_UNKNOWN, PHONE_MODE_FORWARDING, PHONE_MODE_NO_CALLS, PHONE_MODE_TAKING_CALLS
 from ....models import Caller, CallRecording, Topic, Voicemail
+from ....recordings import schedule_recording_archive
+from ....sounds import require_sounds
 from ....twilio import twilio_client
 from ..utils import VoiceResponse
 from .api import api, url_for
@@ -21,6 +23,37 @@ logger = logging.getLogger(f"calls.{__name__}")
 
 HOLD_MUSIC_TRACKS = tuple(f"dialed/hold-music-{i}" for i in range(1, 4))
 
+require_sounds(
+    *HOLD_MUSIC_TRACKS,
+    "beep",
+    "dialed/goodbye",
+    "dialed/hold-music-throw",
+    "dialed/no-calls/blocked-caller-id",
+    "dialed/no-calls/welcome",
+    "dialed/opt-1-subscribe",
+    "dialed/opt-9-unsubscribe",
+    "dialed/opt-pound-repeat",
+    "dialed/opt-star-voicemail",
+    "dialed/subscribed",
+    "dialed/taking-calls/busy/opt-1-subscribe",
+    "dialed/taking-calls/busy/opt-hold",
+    "dialed/taking-calls/greeting/opt-1-call",
+    "dialed/taking-calls/greeting/opt-1-call-final",
+    "dialed/taking-calls/greeting/opt-2-topic",
+    "dialed/taking-calls/greeting/opt-hangup",
+    "dialed/taking-calls/rejected-voicemail",
+    "dialed/taking-calls/welcome",
+    "dialed/thanks",
+    "dialed/topic-intro",
+    "dialed/unsubscribed",
+    "dialed/voicemail-erased",
+    "dialed/voicemail-instructions",
+    "dialed/voicemail-intro-no-topic",
+    "dialed/voicemail-intro-topic",
+    "dialed/welcome",
+    "fun-music",
+)
+
 
 def get_caller_from_session(request) -> None | Caller:
     if caller_id := request.session.get("caller_id"):
@@ -70,7 +103,7 @@ def dialed_incoming(
         response.play("dialed/taking-calls/welcome")
         if topic := Topic.get_active():
             response.play("dialed/topic-intro")
-            response.play(topic.recording.url)
+            response.play(topic.recording_url)
         redirect_url = "dialed_incoming_gather_taking_calls"
     elif config.PHONE_MODE == PHONE_MODE_NO_CALLS:
         response.play("dialed/no-calls/welcome")
@@ -111,7 +144,7 @@ def dialed_incoming_gather_taking_calls(request, digits: Form[str] = None, run_n
     # 2 = repeats topics
     if topic and digits == "2":
         response.play("dialed/topic-intro")
-        response.play(topic.recording.url)
+        response.play(topic.recording_url)
 
     gather = response.gather(
         action=url_for("dialed_incoming_gather_taking_calls", run_number=run_number + 1),
@@ -247,7 +280,7 @@ def dialed_incoming_call_busy_gather(request, digits: Form[str] = None):
 
         if topic := Topic.get_active():
             gather.play("dialed/topic-intro")
-            gather.play(topic.recording.url)
+            gather.play(topic.recording_url)
 
         gather.play("dialed/hold-music-throw")
         gather.play(random.choice(HOLD_MUSIC_TRACKS))
@@ -298,7 +331,7 @@ def dialed_voicemail(request, digits: Form[str] = None):
         response.play("dialed/voicemail-intro-no-topic")
     else:
         response.play("dialed/voicemail-intro-topic")
-        response.play(topic.recording.url)
+        response.play(topic.recording_url)
     response.play("dialed/voicemail-instructions")
     response.play("beep")
 
@@ -323,5 +356,8 @@ def dial_recording_callback(
     except Caller.DoesNotExist:
         caller = None
     model = Voicemail if is_voicemail else CallRecording
-    model.objects.create(url=recording_url, duration=datetime.timedelta(seconds=recording_duration), caller=caller)
+    recording = model.objects.create(
+        url=recording_url, duration=datetime.timedelta(seconds=recording_duration), caller=caller
+    )
+    schedule_recording_archive(recording)
     return HttpResponse(status=204)
@@ -10,6 +10,7 @@ from ninja import Form
 
 from ....constants import LOCATION_UNKNOWN
 from ....models import Caller
+from ....sounds import require_sounds
 from ....twilio import twilio_client
 from ..utils import VoiceResponse
 from .api import api, url_for
@@ -17,6 +18,8 @@ from .api import api, url_for
 
 logger = logging.getLogger(f"calls.{__name__}")
 
+require_sounds("fun-music")
+
 
 @api.post("sip/outgoing")
 def sip_outgoing(request, caller: Form[str]):
@@ -1,3 +1,4 @@
+import functools
 import logging
 from pathlib import Path
 import pprint
@@ -7,7 +8,7 @@ from twilio.request_validator import RequestValidator
 from twilio.twiml.voice_response import Gather as TwilioGather, VoiceResponse as TwilioVoiceResponse
 
 from django.conf import settings
-from django.contrib.staticfiles import finders
+from django.db import connection
 from django.templatetags.static import static
 
 from constance import config
@@ -15,6 +16,8 @@ from ninja import NinjaAPI
 from ninja.parser import Parser
 from ninja.renderers import BaseRenderer
 
+from ...sounds import get_sound_url
+
 
 underscore_converter_re = re.compile(r"(?<!^)(?=[A-Z])")
 depunctuate_words_re = re.compile(r"[^a-z]+")
@@ -50,12 +53,8 @@ class SkipTwilioPlayMixin:
         if is_media:
             full_url = url
         else:
-            full_url = f"api/twilio/sounds/{url}.mp3"
-            if settings.DEBUG and not finders.find(full_url):
-                logger.warning(f"Couldn't find path for <Play /> verb: {full_url}!")
-                if settings.DEBUG:
-                    super().say("Warning! Path does not exist. Check logs.")
-            full_url = static(full_url)
+            # Missing sounds are reported at startup by a system check (see api.sounds)
+            full_url = get_sound_url(url) or static(f"api/twilio/sounds/{url}.mp3")
 
         if settings.DEBUG and config.SKIP_TWILIO_PLAY:
             super().say(re.sub(r"[\W\s]+", " ", Path(url).stem if is_media else url).strip().lower())
@@ -103,6 +102,36 @@ def create_ninja_api(name) -> NinjaAPI:
     )
 
 
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_queries):
+    # With QUERY_BUDGETS on (the default in DEBUG, and see api/tests.py), raise when a webhook runs more queries than it
+    # should (ie, lazy foreign key loads). Counts include BEGIN and COMMIT, and in DEBUG, reading SKIP_TWILIO_PLAY to
+    # play sounds.
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapped(*args, **kwargs):
+            if not settings.QUERY_BUDGETS:
+                return func(*args, **kwargs)
+
+            from django.test.utils import CaptureQueriesContext  # No need to import in production
+
+            with CaptureQueriesContext(connection) as queries:
+                response = func(*args, **kwargs)
+            if len(queries) > max_queries:
+                raise QueryBudgetExceeded(
+                    f"{func.__name__} ran {len(queries)} queries, over its budget of {max_queries}:\n"
+                    + "\n".join(query["sql"] for query in queries.captured_queries)
+                )
+            return response
+
+        return wrapped
+
+    return decorator
+
+
 def send_twilio_message_at_end_of_request(request, call_sid, call_step, countdown=None, words_heard=None):
     # Happens after request is processed via middle so any transactions aren't blocked
     request._twilio_user_defined_message = (call_sid, call_step, countdown, words_heard)
@@ -1,8 +1,10 @@
 import itertools
 
 from django.apps import AppConfig, apps
+from django.conf import settings
 from django.conf.locale.en import formats as en_formats
 from django.db.models import signals
+from django.utils.autoreload import autoreload_started
 
 
 class ApiConfig(AppConfig):
@@ -13,6 +15,19 @@ class ApiConfig(AppConfig):
     def ready(self):
         signals.post_migrate.connect(self.create_groups, sender=self)
         self.patch_date_formats()
+        self.build_sound_index()
+        self.register_tasks()
+
+    def build_sound_index(self):
+        from .sounds import get_sound_index, watch_sounds
+
+        get_sound_index()
+        if settings.DEBUG:
+            autoreload_started.connect(watch_sounds)
+
+    def register_tasks(self):
+        # So background jobs can be queued (and run) by name
+        from . import tasks  # noqa: F401
 
     def patch_date_formats(self):
         en_formats.SHORT_DATETIME_FORMAT = "n/j/y g:i:s A"
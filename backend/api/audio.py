@@ -0,0 +1,71 @@
+from array import array
+import datetime
+import math
+import subprocess
+import sys
+
+
+SAMPLE_RATE = 8000  # Telephone audio, no need for anything more
+FRAME_LENGTH = SAMPLE_RATE // 50  # 20ms frames
+FULL_SCALE = 32768
+SILENCE_FLOOR_DB = -90.0
+# Frames louder than the max of these two are considered speech
+SPEECH_MIN_DB = -45.0
+SPEECH_ABOVE_NOISE_FLOOR_DB = 12.0
+NOISE_FLOOR_PERCENTILE = 0.1
+
+# Used for admin triage
+SILENT_SPEECH_RATIO = 0.05
+SILENT_EFFECTIVE_DURATION = datetime.timedelta(seconds=3)
+MOSTLY_SILENT_SPEECH_RATIO = 0.25
+
+
+def decode_to_pcm(data: bytes) -> array:
+    process = subprocess.run(
+        (
+            "ffmpeg",
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-i",
+            "pipe:0",
+            *("-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le"),
+            "pipe:1",
+        ),
+        input=data,
+        capture_output=True,
+        check=True,
+    )
+    samples = array("h", process.stdout[: len(process.stdout) // 2 * 2])
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples
+
+
+def to_db(level):
+    return max(20 * math.log10(level), SILENCE_FLOOR_DB) if level > 0 else SILENCE_FLOOR_DB
+
+
+def analyze_pcm(samples: array) -> dict:
+    frame_levels = []
+    for start in range(0, len(samples) - FRAME_LENGTH + 1, FRAME_LENGTH):
+        frame = samples[start : start + FRAME_LENGTH]
+        frame_levels.append(to_db(math.sqrt(math.sumprod(frame, frame) / FRAME_LENGTH) / FULL_SCALE))
+
+    if not frame_levels:
+        return {"speech_ratio": 0.0, "peak_level": SILENCE_FLOOR_DB, "effective_duration": datetime.timedelta(0)}
+
+    # Simple energy based voice activity detection, relative to the recording's own noise floor
+    noise_floor = sorted(frame_levels)[int(len(frame_levels) * NOISE_FLOOR_PERCENTILE)]
+    threshold = max(SPEECH_MIN_DB, noise_floor + SPEECH_ABOVE_NOISE_FLOOR_DB)
+    num_speech_frames = sum(1 for level in frame_levels if level >= threshold)
+
+    return {
+        "speech_ratio": round(num_speech_frames / len(frame_levels), 4),
+        "peak_level": round(to_db(max(max(samples), -min(samples)) / FULL_SCALE), 2),
+        "effective_duration": datetime.timedelta(seconds=num_speech_frames * FRAME_LENGTH / SAMPLE_RATE),
+    }
+
+
+def analyze_audio(data: bytes) -> dict:
+    return analyze_pcm(decode_to_pcm(data))
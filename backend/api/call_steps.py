@@ -0,0 +1,53 @@
+from .constants import (
+    CALL_STEP_CALL,
+    CALL_STEP_DONE,
+    CALL_STEP_HOLD,
+    CALL_STEP_INITIAL,
+    CALL_STEP_VERIFIED,
+    CALL_STEP_VOICEMAIL,
+)
+
+
+INITIAL, VERIFIED, HOLD, CALL, VOICEMAIL, DONE = (
+    CALL_STEP_INITIAL,
+    CALL_STEP_VERIFIED,
+    CALL_STEP_HOLD,
+    CALL_STEP_CALL,
+    CALL_STEP_VOICEMAIL,
+    CALL_STEP_DONE,
+)
+CALL_STEPS = (INITIAL, VERIFIED, HOLD, CALL, VOICEMAIL, DONE)
+
+# Where each call step can move to. Going back to INITIAL only happens when an assignment is reset at handshake, and
+# DONE is final since it's what grants a worker their approval code.
+ALLOWED_TRANSITIONS = {
+    INITIAL: (VERIFIED,),
+    # DONE from VERIFIED and HOLD, since a dial can complete before its (asynchronous) answered callback arrives
+    VERIFIED: (HOLD, CALL, VOICEMAIL, DONE),
+    HOLD: (VERIFIED, CALL, DONE),
+    CALL: (DONE,),
+    VOICEMAIL: (DONE,),
+    DONE: (),
+}
+
+# Timestamps set on entering a call step, unless they're already set
+TIMESTAMPS = {
+    INITIAL: (),
+    VERIFIED: ("call_started_at",),
+    HOLD: ("call_started_at",),
+    CALL: ("call_started_at", "call_connected_at"),
+    VOICEMAIL: ("call_started_at", "call_connected_at"),
+    DONE: ("call_started_at", "call_connected_at", "call_completed_at"),
+}
+TIMESTAMP_FIELDS = TIMESTAMPS[DONE]
+
+# Compiled (from, to) => timestamps to set. Staying on the same step is always allowed.
+TRANSITIONS = {
+    (from_step, to_step): TIMESTAMPS[to_step]
+    for from_step, to_steps in ALLOWED_TRANSITIONS.items()
+    for to_step in (from_step, *to_steps)
+}
+
+
+def is_valid_transition(from_step, to_step):
+    return (from_step, to_step) in TRANSITIONS
@@ -0,0 +1,159 @@
+import datetime
+import logging
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Assignment, HoldQueueEntry, HostAvailability
+from .utils import upsert
+
+
+logger = logging.getLogger(f"calls.{__name__}")
+
+# Workers waiting for the host queue up first come first served, and only the first HOLD_QUEUE_DIALERS of them re-dial
+# the host after each hold loop. The rest loop through hold music, only touching their entry's heartbeat, until it's
+# their turn (or they can leave a voicemail). In call queue mode (HIT_CALL_QUEUE), Twilio keeps callers in order
+# instead, and entries map callers' calls to their assignments.
+
+# Longer than a hold loop (the longest hold music track plus what's said around it), so workers that haven't been seen
+# (starting a hold loop or dialing the host) in this long have presumably hung up, and are skipped
+TURN_TIMEOUT = datetime.timedelta(seconds=90)
+# In call queue mode, the host's call while it's being placed, before Twilio has given it a call SID
+RINGING_CALL_SID = "ringing"
+# ...which only takes a moment, so one still being placed after this long was presumably never placed (say, its worker
+# died), and the host is rung again. Placed calls stay until their completed callback, however long the host's on one.
+RINGING_TIMEOUT = datetime.timedelta(minutes=1)
+# ...and when the host doesn't answer a call to take the next caller (or it couldn't be placed), when they're rung again
+RING_HOST_RETRY_AFTER = datetime.timedelta(seconds=30)
+# Calls' completed callbacks and dial actions both say when the host is off a call, so one still on a call after this
+# long presumably missed both, and is dialed again
+ON_CALL_TIMEOUT = datetime.timedelta(minutes=30)
+
+
+def get_host_availability() -> HostAvailability:
+    return HostAvailability.objects.filter(host=settings.TWILIO_SIP_HOST_USERNAME).first() or HostAvailability()
+
+
+def update_host_availability(*, increment=(), **values):
+    # Created on first use, in a single round-trip
+    table = HostAvailability._meta.db_table
+    host = HostAvailability(host=settings.TWILIO_SIP_HOST_USERNAME, **values, **dict.fromkeys(increment, 1))
+    upsert(
+        host,
+        unique_field="host",
+        update={**dict.fromkeys(values), **{field: f"{table}.{field} + 1" for field in increment}},
+    )
+
+
+def host_answered():
+    now = timezone.now()
+    update_host_availability(on_call_since=now, last_answered_at=now, increment=("num_answered",))
+
+
+def host_hung_up():
+    update_host_availability(on_call_since=None, available_at=timezone.now())
+
+
+def host_busy():
+    update_host_availability(last_busy_at=timezone.now(), increment=("num_busy",))
+
+
+def get_entries_ahead(entry: HoldQueueEntry | None):
+    # Entries queued before entry in the queue's (queued_at, assignment_id) order, using the queued_at index, or all of
+    # them if it isn't queued
+    if entry is None:
+        return HoldQueueEntry.objects.all()
+    return HoldQueueEntry.objects.filter(
+        Q(queued_at__lt=entry.queued_at) | Q(queued_at=entry.queued_at, assignment_id__lt=entry.assignment_id)
+    )
+
+
+def get_turn(assignment: Assignment) -> tuple[bool, bool, int]:
+    """Whether it's assignment's turn to dial the host, whether it's in the hold queue and the number of workers ahead
+    of it. Only reads, so waiting out a hold loop doesn't write to the database."""
+    now = timezone.now()
+    host = get_host_availability()
+    entry = HoldQueueEntry.objects.filter(assignment=assignment).first()
+    ahead = get_entries_ahead(entry)
+    num_ahead = ahead.count()
+    if host.on_call_since and host.on_call_since >= now - ON_CALL_TIMEOUT:
+        return False, entry is not None, num_ahead
+    if num_ahead >= settings.HOLD_QUEUE_DIALERS:
+        # Only the head of the queue matters, ie whether there are that many live workers ahead
+        num_ahead_live = ahead.filter(seen_at__gte=now - TURN_TIMEOUT)[: settings.HOLD_QUEUE_DIALERS].count()
+        return num_ahead_live < settings.HOLD_QUEUE_DIALERS, entry is not None, num_ahead
+    return True, entry is not None, num_ahead
+
+
+def join(assignment: Assignment, *, call_sid=""):
+    # Keeps its place if it's already queued
+    HoldQueueEntry.objects.bulk_create(
+        [HoldQueueEntry(assignment=assignment, call_sid=call_sid, seen_at=timezone.now())],
+        update_conflicts=True,
+        unique_fields=("assignment",),
+        update_fields=("call_sid", "seen_at"),
+    )
+
+
+def touch(assignment: Assignment):
+    # The hold loop's heartbeat, a single row write, so workers that stop looping (ie, hung up) go stale
+    HoldQueueEntry.objects.filter(assignment=assignment).update(seen_at=timezone.now())
+
+
+def leave(assignment: Assignment):
+    HoldQueueEntry.objects.filter(assignment=assignment).delete()
+
+
+def take_turn(assignment: Assignment):
+    """Records that assignment is dialing the host, first removing workers ahead of it that have presumably hung up,
+    which is how it got its turn."""
+    now = timezone.now()
+    entry = HoldQueueEntry.objects.filter(assignment=assignment).first()
+    stale = get_entries_ahead(entry).filter(seen_at__lt=now - TURN_TIMEOUT)
+    if num_stale := stale.delete()[0]:
+        logger.info(f"Removed {num_stale} worker(s) from the hold queue that have presumably hung up")
+    if entry is not None:
+        HoldQueueEntry.objects.filter(assignment=assignment).update(dialed_at=now, seen_at=now)
+
+
+def get_call_queue():
+    # Callers waiting in call queue mode. Hang ups are heard from Enqueue's action, but in case one's missed, callers
+    # who joined longer ago than their wait to leave a voicemail (plus a hold loop) have left the queue, one way or
+    # another
+    return HoldQueueEntry.objects.exclude(call_sid="").filter(
+        seen_at__gte=timezone.now() - F("assignment__hit__leave_voicemail_after_duration") - TURN_TIMEOUT
+    )
+
+
+def claim_host_ring() -> HoldQueueEntry | None:
+    """In call queue mode, claims ringing the host to take callers from the queue, so they're only rung once. Returns
+    the caller at the front of the queue, or None if nobody's waiting or the host is already being rung (or is on one
+    of these calls). Once their call is placed, record it with record_host_ring()."""
+    now = timezone.now()
+    entry = get_call_queue().select_related("assignment__worker").first()
+    if entry is None:
+        return None
+
+    HostAvailability.objects.get_or_create(host=settings.TWILIO_SIP_HOST_USERNAME)
+    # A single conditional write, so the Twilio call can be placed without holding a lock
+    num_claimed = (
+        HostAvailability.objects.filter(host=settings.TWILIO_SIP_HOST_USERNAME)
+        .filter(Q(call_sid="") | Q(call_sid=RINGING_CALL_SID, rung_at__lt=now - RINGING_TIMEOUT))
+        .update(call_sid=RINGING_CALL_SID, rung_at=now)
+    )
+    return entry if num_claimed else None
+
+
+def record_host_ring(call_sid):
+    # Unless the call already ended (see release_host_ring())
+    HostAvailability.objects.filter(host=settings.TWILIO_SIP_HOST_USERNAME, call_sid=RINGING_CALL_SID).update(
+        call_sid=call_sid
+    )
+
+
+def release_host_ring(call_sid=RINGING_CALL_SID):
+    # The host's call ended (or couldn't be placed), possibly before it was recorded
+    HostAvailability.objects.filter(
+        host=settings.TWILIO_SIP_HOST_USERNAME, call_sid__in={call_sid, RINGING_CALL_SID}
+    ).update(call_sid="", rung_at=None)
@@ -0,0 +1,183 @@
+import datetime
+import logging
+import traceback
+
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(f"calls.{__name__}")
+
+# Runners LISTEN on this, and enqueue() NOTIFYs it, which Postgres only delivers once the job is committed
+NOTIFY_CHANNEL = "jobs"
+# Running jobs are presumed dead if they haven't reported progress, or their runner hasn't renewed them, in this long
+DEFAULT_TIMEOUT = datetime.timedelta(minutes=15)
+# Runners renew the jobs they're running this often, so slow (but alive) jobs aren't presumed dead
+HEARTBEAT_INTERVAL = datetime.timedelta(minutes=1)
+# Failed attempts are retried after this, doubling each time
+RETRY_BACKOFF = datetime.timedelta(seconds=30)
+# Finished jobs are deleted after this
+RETENTION = datetime.timedelta(days=30)
+# Tries at queueing a keyed job, racing runners claiming the queued job it would be a duplicate of
+ENQUEUE_ATTEMPTS = 3
+
+# task name => (function, options), registered with the @task decorator (see api/tasks.py)
+TASKS = {}
+
+
+def task(name=None, *, max_attempts=1, concurrency=None, timeout=DEFAULT_TIMEOUT):
+    """Registers a function as a task that can be queued as a background job with enqueue(). It's called with the job
+    (to report progress with set_progress()) and the job's keyword arguments, and what it returns is saved as the job's
+    result. At most concurrency jobs of a task run at once, across all runners."""
+
+    def decorator(func):
+        TASKS[name or func.__name__] = (
+            func,
+            {"max_attempts": max_attempts, "concurrency": concurrency, "timeout": timeout},
+        )
+        return func
+
+    return decorator
+
+
+def enqueue(task_name, *, key="", created_by=None, run_after=None, **kwargs) -> Job:
+    """Queues a job, or if a job with the same key is already queued, returns that one instead. Keyword arguments are
+    passed to the task, so must be JSON serializable."""
+    _, options = TASKS[task_name]
+    for attempt in range(1, ENQUEUE_ATTEMPTS + 1):
+        try:
+            with transaction.atomic():
+                job = Job.objects.create(
+                    task=task_name,
+                    kwargs=kwargs,
+                    key=key,
+                    created_by=created_by,
+                    run_after=run_after or timezone.now(),
+                    max_attempts=options["max_attempts"],
+                )
+                with connection.cursor() as cursor:
+                    cursor.execute(f"NOTIFY {NOTIFY_CHANNEL}")
+            logger.info(f"Queued job {job}")
+            return job
+        except IntegrityError:
+            # Only keyed jobs can be duplicates, anything else is a real error
+            if not key or attempt == ENQUEUE_ATTEMPTS:
+                raise
+            # Unless it was claimed by a runner in the meantime, in which case try again
+            if existing := Job.objects.filter(key=key, status=Job.Status.QUEUED).first():
+                return existing
+
+
+def claim_job() -> Job | None:
+    """Claims the next due job for this runner, skipping jobs other runners are claiming and tasks that are already
+    running at their concurrency limit. Returns None if there's nothing to do."""
+    saturated_tasks = set()
+    while True:
+        with transaction.atomic():
+            job = (
+                Job.objects.filter(status=Job.Status.QUEUED, run_after__lte=timezone.now())
+                .exclude(task__in=saturated_tasks)
+                .select_for_update(skip_locked=True)
+                .order_by("run_after", "id")
+                .first()
+            )
+            if job is None:
+                return None
+
+            if job.task not in TASKS:
+                job.status, job.error, job.finished_at = Job.Status.FAILED, "Unknown task!", timezone.now()
+                job.save(update_fields=("status", "error", "finished_at"))
+                continue
+
+            _, options = TASKS[job.task]
+            if concurrency := options["concurrency"]:
+                # Serializes claims of this task until commit, so the count of running jobs can't be stale
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"{NOTIFY_CHANNEL}:{job.task}",))
+                if Job.objects.filter(task=job.task, status=Job.Status.RUNNING).count() >= concurrency:
+                    saturated_tasks.add(job.task)
+                    continue
+
+            job.status = Job.Status.RUNNING
+            job.attempts += 1
+            job.started_at = timezone.now()
+            job.locked_until = job.started_at + options["timeout"]
+            job.save(update_fields=("status", "attempts", "started_at", "locked_until"))
+            return job
+
+
+def set_progress(job: Job, progress, total=None):
+    # Also tells runners the job is still alive
+    job.progress, job.progress_total = progress, total if total is not None else job.progress_total
+    _, options = TASKS[job.task]
+    Job.objects.filter(id=job.id, status=Job.Status.RUNNING, attempts=job.attempts).update(
+        progress=job.progress, progress_total=job.progress_total, locked_until=timezone.now() + options["timeout"]
+    )
+
+
+def renew_jobs(jobs):
+    # Like set_progress(), tells runners these jobs are still alive, without changing their progress
+    now = timezone.now()
+    for job in jobs:
+        _, options = TASKS[job.task]
+        Job.objects.filter(id=job.id, status=Job.Status.RUNNING, attempts=job.attempts).update(
+            locked_until=now + options["timeout"]
+        )
+
+
+def run_job(job: Job):
+    """Runs a claimed job, then marks it succeeded, queues it for a retry (with backoff) or marks it failed."""
+    func, _ = TASKS[job.task]
+    logger.info(f"Running job {job} (attempt {job.attempts}/{job.max_attempts})")
+    try:
+        result = func(job, **job.kwargs)
+    except Exception:
+        logger.exception(f"Error running job {job}")
+        values = {"error": traceback.format_exc(), "locked_until": None}
+        if job.attempts < job.max_attempts:
+            values.update(status=Job.Status.QUEUED, run_after=timezone.now() + RETRY_BACKOFF * 2 ** (job.attempts - 1))
+        else:
+            values.update(status=Job.Status.FAILED, finished_at=timezone.now())
+    else:
+        values = {
+            "status": Job.Status.SUCCEEDED,
+            "result": "" if result is None else str(result),
+            "error": "",
+            "finished_at": timezone.now(),
+            "locked_until": None,
+        }
+    update_job(job.id, job.attempts, **values)
+
+
+def update_job(job_id, attempt, **values):
+    # Only if this attempt is still running (ie, it wasn't recovered as stale and claimed again in the meantime)
+    queryset = Job.objects.filter(id=job_id, status=Job.Status.RUNNING, attempts=attempt)
+    try:
+        with transaction.atomic():
+            queryset.update(**values)
+    except IntegrityError:
+        # A retry, but a job with the same key was queued in the meantime, which will do the same thing
+        queryset.update(status=Job.Status.FAILED, finished_at=timezone.now(), locked_until=None)
+
+
+def recover_jobs() -> int:
+    """Retries (or fails, if out of attempts) running jobs whose runner died or hung, and deletes old finished jobs.
+    Returns the number of jobs recovered."""
+    now = timezone.now()
+    error = "Timed out, or its runner was stopped."
+    stale = Job.objects.filter(status=Job.Status.RUNNING, locked_until__lt=now)
+    stale = list(stale.values_list("id", "attempts", "max_attempts"))
+    for job_id, attempts, max_attempts in stale:
+        if attempts < max_attempts:
+            update_job(job_id, attempts, status=Job.Status.QUEUED, error=error, run_after=now, locked_until=None)
+        else:
+            update_job(job_id, attempts, status=Job.Status.FAILED, error=error, finished_at=now, locked_until=None)
+    if stale:
+        logger.warning(f"Recovered {len(stale)} stale job(s)")
+
+    Job.objects.filter(
+        status__in=(Job.Status.SUCCEEDED, Job.Status.FAILED, Job.Status.CANCELLED), finished_at__lt=now - RETENTION
+    ).delete()
+    return len(stale)
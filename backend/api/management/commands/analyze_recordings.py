@@ -0,0 +1,49 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.audio import analyze_audio
+from api.recordings import RECORDING_MODELS, read_recording, save_analysis
+
+
+def measure_recording(url, file_name):
+    # Runs in a child process, prefers the archived copy over downloading from Twilio
+    return analyze_audio(read_recording(url, file_name))
+
+
+class Command(BaseCommand):
+    help = "Compute speech ratio, peak level and effective duration of recordings using a process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Re-analyze recordings that were already analyzed")
+        parser.add_argument("--processes", type=int, default=None, help="Number of processes (default: CPU count)")
+
+    def handle(self, *args, **options):
+        recordings = []
+        for model, prefix in RECORDING_MODELS:
+            queryset = model.objects.exclude(**{f"{prefix}url": ""})
+            if not options["all"]:
+                queryset = queryset.filter(**{f"{prefix}speech_ratio__isnull": True})
+            for pk, url, file_name in queryset.values_list("pk", f"{prefix}url", f"{prefix}file"):
+                recordings.append((model, prefix, pk, url, file_name))
+
+        connections.close_all()  # Don't share database connections with forked processes
+        num_errors = 0
+        with ProcessPoolExecutor(
+            max_workers=options["processes"], mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            futures = {
+                executor.submit(measure_recording, url, file_name): (model, prefix, pk, url)
+                for model, prefix, pk, url, file_name in recordings
+            }
+            for future in as_completed(futures):
+                model, prefix, pk, url = futures[future]
+                try:
+                    save_analysis(model, pk, url, future.result(), prefix=prefix)
+                except Exception as e:
+                    num_errors += 1
+                    self.stderr.write(f"Error analyzing {model._meta.verbose_name} {pk}: {e}")
+
+        self.stdout.write(f"Analyzed {len(recordings) - num_errors} recording(s) with {num_errors} error(s)")
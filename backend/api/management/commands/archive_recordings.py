@@ -0,0 +1,31 @@
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+
+from api.recordings import RECORDING_MODELS, archive_recording, get_executor
+
+
+class Command(BaseCommand):
+    help = "Download, transcode and store locally any recordings that haven't been archived yet"
+
+    def handle(self, *args, **options):
+        futures = {}
+        for model, prefix in RECORDING_MODELS:
+            pks = (
+                model.objects.exclude(**{f"{prefix}url": ""})
+                .filter(**{f"{prefix}file": ""})
+                .values_list("pk", flat=True)
+            )
+            for pk in pks:
+                future = get_executor().submit(archive_recording, model, pk, prefix=prefix)
+                futures[future] = f"{model._meta.verbose_name} {pk}"
+
+        num_errors = 0
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                num_errors += 1
+                self.stderr.write(f"Error archiving {futures[future]}: {e}")
+
+        self.stdout.write(f"Archived {len(futures) - num_errors} recording(s) with {num_errors} error(s)")
@@ -0,0 +1,158 @@
+import datetime
+from decimal import Decimal
+import statistics
+import time
+import uuid
+
+from faker import Faker
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from api.constants import SIMULATED_PREFIX
+from api.models import HIT, Assignment, Worker, generate_words_to_pronounce
+from api.tokens import get_tokens, sign_token
+from api.utils import generate_fake_name, get_ip_addr, get_location_from_ip_addr
+
+
+BENCHMARK_PREFIX = f"{SIMULATED_PREFIX}benchmark/"
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    BENCHMARKS[func.__name__.removeprefix("benchmark_")] = func
+    return func
+
+
+def measure(func, iterations):
+    timings, cpu_timings, num_queries = [], [], []
+    for i in range(iterations):
+        with CaptureQueriesContext(connection) as queries:
+            start, cpu_start = time.perf_counter(), time.process_time()
+            func(i)
+            timings.append(time.perf_counter() - start)
+            cpu_timings.append(time.process_time() - cpu_start)
+        num_queries.append(len(queries))
+    return {
+        "median_ms": statistics.median(timings) * 1000,
+        "cpu_ms": statistics.fmean(cpu_timings) * 1000,  # process_time() is too coarse for a useful median
+        "queries": max(num_queries),
+    }
+
+
+def create_benchmark_hit():
+    hit = make_benchmark_hit()
+    hit.save()
+    return hit
+
+
+def make_benchmark_hit(**kwargs):
+    return HIT(
+        amazon_id=kwargs.pop("amazon_id", f"{BENCHMARK_PREFIX}{uuid.uuid4()}"),
+        name="Benchmark",
+        topic="Benchmarking",
+        show_host="Benchmarker",
+        title="Benchmark",
+        description="Benchmark",
+        keywords="benchmark",
+        duration=datetime.timedelta(hours=1),
+        assignment_duration=datetime.timedelta(minutes=30),
+        assignment_number=1,
+        assignment_reward=Decimal("1.00"),
+        **kwargs,
+    )
+
+
+def legacy_handshake(request, hit_amazon_id, worker_id, assignment_id):
+    # What the handshake did before its upserts were collapsed into INSERT ... ON CONFLICT
+    hit = HIT.objects.get(amazon_id=hit_amazon_id)
+    fake_gender, fake_name = generate_fake_name()
+    ip_addr = get_ip_addr(request)
+    defaults = {"location": get_location_from_ip_addr(ip_addr), "ip_address": ip_addr}
+    create = {"gender": fake_gender, "name": fake_name, **defaults}
+    worker, _ = Worker.objects.update_or_create(amazon_id=worker_id, create_defaults=create, defaults=defaults)
+    Assignment.objects.update_or_create(
+        amazon_id=assignment_id,
+        defaults={
+            "call_started_at": None,
+            "hit": hit,
+            "words_to_pronounce": generate_words_to_pronounce(),
+            "worker": worker,
+            "user_agent": "benchmark",
+        },
+    )
+
+
+@transaction.atomic
+def upsert_handshake(request, hit_amazon_id, worker_id, assignment_id):
+    hit = HIT.objects.get(amazon_id=hit_amazon_id)
+    worker = Worker.from_api(request, worker_id)
+    Assignment.from_api(amazon_id=assignment_id, hit=hit, worker=worker, user_agent="benchmark")
+
+
+@benchmark
+def benchmark_fake_name(iterations):
+    def faker_name(i):
+        # What Worker.from_api did before names were picked from a preloaded pool
+        faker = Faker()
+        fake_gender = "male" if faker.boolean() else "female"
+        return fake_gender, getattr(faker, f"first_name_{fake_gender}")()
+
+    return {
+        "Faker()": measure(faker_name, iterations),
+        "name pool": measure(lambda i: generate_fake_name(), iterations),
+    }
+
+
+@benchmark
+def benchmark_token(iterations):
+    identities = [f"{BENCHMARK_PREFIX}{uuid.uuid4()}" for _ in range(50)]
+    return {
+        "sign": measure(lambda i: sign_token(identities[0]), iterations),
+        "cached": measure(lambda i: get_tokens(identities[:1]), iterations),
+        "sign x50": measure(lambda i: [sign_token(identity) for identity in identities], iterations),
+        "cached x50 (batch)": measure(lambda i: get_tokens(identities), iterations),
+    }
+
+
+@benchmark
+def benchmark_handshake(iterations):
+    hit = create_benchmark_hit()
+    request = RequestFactory().post("/api/hit/handshake", REMOTE_ADDR="127.0.0.1")
+    results = {}
+    for name, handshake in (("update_or_create", legacy_handshake), ("upsert", upsert_handshake)):
+        # First handshake creates rows, repeat handshakes (page reloads) update them
+        for kind in ("first", "repeat"):
+            results[f"{name} ({kind})"] = measure(
+                lambda i: handshake(
+                    request, hit.amazon_id, f"{BENCHMARK_PREFIX}{name}/{i}", f"{BENCHMARK_PREFIX}{name}/{i}"
+                ),
+                iterations,
+            )
+    return results
+
+
+class Command(BaseCommand):
+    help = "Run microbenchmarks of hot code paths against the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("benchmarks", nargs="*", choices=sorted(BENCHMARKS), help="Default: all benchmarks")
+        parser.add_argument("--iterations", type=int, default=200, help="Iterations per benchmark (default: 200)")
+
+    def cleanup(self):
+        for model in (Assignment, Worker, HIT):
+            model.objects.filter(amazon_id__startswith=BENCHMARK_PREFIX).delete()
+
+    def handle(self, *args, benchmarks, iterations, **options):
+        try:
+            for name in benchmarks or sorted(BENCHMARKS):
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{name} ({iterations} iterations)"))
+                for variant, result in BENCHMARKS[name](iterations).items():
+                    self.stdout.write(
+                        f"  {variant:<32} {result['median_ms']:>8.3f}ms median  {result['cpu_ms']:>8.3f}ms CPU "
+                        f" {result['queries']} queries"
+                    )
+        finally:
+            self.cleanup()
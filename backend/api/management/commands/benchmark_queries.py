@@ -0,0 +1,404 @@
+import datetime
+import random
+import statistics
+import time
+
+import psycopg
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models.query import MAX_GET_RESULTS
+from django.db.models.sql import InsertQuery
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.management.commands.benchmark import BENCHMARK_PREFIX, make_benchmark_hit
+from api.models import HIT, Assignment, Caller, Topic, User, Worker, WorkerPageLoad, generate_words_to_pronounce
+from api.partitions import create_partition, get_month, get_partitions
+from api.ratelimit import get_buckets_sql
+from api.spam import get_window_sql, get_window_start
+from api.utils import generate_fake_name, get_upsert_sql
+
+
+# Rows seeded per model at --scale 1, roughly a busy season's worth
+SEED_VOLUMES = {
+    HIT: 200,
+    Worker: 20_000,
+    Assignment: 50_000,
+    WorkerPageLoad: 200_000,
+    Caller: 5_000,
+    Topic: 20,
+}
+SEED_BATCH_SIZE = 5_000
+SEED_PAGE_LOAD_AGE = datetime.timedelta(days=180)
+HOT_QUERIES = {}
+# Admin changelists (including their count and facet queries) by model and filters, rendered end to end
+CHANGELISTS = {
+    "assignments": (Assignment, {}),
+    "assignments by HIT and call step": (Assignment, {"hit__id__exact": "{hit_id}", "call_step__exact": "hold"}),
+    "assignments on hold": (Assignment, {"call_step__exact": "hold"}),
+    "assignments of blocked workers": (Assignment, {"worker__blocked__exact": "1"}),
+    "good workers": (Worker, {"is_good_worker__exact": "1"}),
+    "worker page loads": (WorkerPageLoad, {}),
+    "worker page loads with amp encoded": (WorkerPageLoad, {"had_amp_encoded__exact": "1"}),
+    "worker page loads of good workers": (WorkerPageLoad, {"is_good_worker": "yes"}),
+    "worker page loads in a month": (
+        WorkerPageLoad,
+        {"created_at__year": "{month.year}", "created_at__month": "{month.month}"},
+    ),
+    "assignments searched by worker name": (Assignment, {"q": "jennifer"}),
+    "assignments searched by MTurk ID": (Assignment, {"q": f"{BENCHMARK_PREFIX}assignment/4242"}),
+    "workers searched by name": (Worker, {"q": "jennifer"}),
+    "callers searched by number": (Caller, {"q": "+1 (555) 000-12"}),
+    "callers searched by name": (Caller, {"q": "bench"}),
+}
+
+
+def hot_query(func):
+    HOT_QUERIES[func.__name__.removeprefix("query_").replace("_", " ")] = func
+    return func
+
+
+def get_sql(queryset):
+    # What queryset.get() runs
+    return queryset.order_by()[:MAX_GET_RESULTS].query.sql_with_params()
+
+
+# Each hot query takes the seeded keys and returns (sql, params), compiled from the same querysets the app uses
+
+
+@hot_query
+def query_assignment_by_amazon_id(seeded):
+    return get_sql(Assignment.objects.filter(amazon_id=random.choice(seeded["assignment_amazon_ids"])))
+
+
+@hot_query
+def query_assignment_by_id(seeded):
+    # get_assignment() in the Twilio webhooks
+    return get_sql(
+        Assignment.objects.select_related("hit", "worker").filter(id=random.choice(seeded["assignment_ids"]))
+    )
+
+
+@hot_query
+def query_hit_by_amazon_id(seeded):
+    return get_sql(HIT.objects.filter(amazon_id=random.choice(seeded["hit_amazon_ids"])))
+
+
+@hot_query
+def query_worker_upsert(seeded):
+    # Same as Worker.from_api(), half of them page reloads (updates) and the rest new workers (inserts)
+    gender, name = generate_fake_name()
+    worker = Worker(
+        amazon_id=f"{BENCHMARK_PREFIX}worker/{random.randrange(len(seeded['worker_amazon_ids']) * 2)}",
+        gender=gender,
+        name=name,
+        location="Benchmark",
+        ip_address="127.0.0.1",
+    )
+    return get_upsert_sql(worker, unique_field="amazon_id", update=dict.fromkeys(("location", "ip_address")))
+
+
+@hot_query
+def query_caller_by_number(seeded):
+    return get_sql(Caller.objects.filter(number=random.choice(seeded["caller_numbers"])))
+
+
+@hot_query
+def query_topic_active(seeded):
+    # Topic.get_active()
+    return Topic.objects.filter(is_active=True).order_by("-created_by")[:1].query.sql_with_params()
+
+
+@hot_query
+def query_worker_page_load_admin(seeded):
+    # First page of the worker page load changelist, with its annotations
+    model_admin = admin.site._registry[WorkerPageLoad]
+    queryset = model_admin.get_queryset(RequestFactory().get("/"))[: model_admin.list_per_page]
+    return queryset.query.sql_with_params()
+
+
+@hot_query
+def query_worker_page_load_admin_month(seeded):
+    # Same, drilled down to a month with the date hierarchy, which should only scan that month's partitions
+    model_admin = admin.site._registry[WorkerPageLoad]
+    month = timezone.localtime(seeded["month"]).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    queryset = model_admin.get_queryset(RequestFactory().get("/")).filter(
+        created_at__gte=month, created_at__lt=(month + datetime.timedelta(days=32)).replace(day=1)
+    )
+    return queryset[: model_admin.list_per_page].query.sql_with_params()
+
+
+@hot_query
+def query_worker_page_load_insert(seeded):
+    # WorkerPageLoad.objects.create() in hit_passthrough
+    page_load = WorkerPageLoad(worker_amazon_id=random.choice(seeded["worker_amazon_ids"]))
+    query = InsertQuery(WorkerPageLoad)
+    query.insert_values([field for field in WorkerPageLoad._meta.concrete_fields if not field.primary_key], [page_load])
+    compiler = query.get_compiler(connection=connection)
+    compiler.returning_fields = WorkerPageLoad._meta.db_returning_fields
+    ((sql, params),) = compiler.as_sql()
+    return sql, params
+
+
+@hot_query
+def query_spam_window_upsert(seeded):
+    # record_page_load() in hit_passthrough, a worker's page load counted against their and their IP's windows
+    return get_window_sql(
+        window_start=get_window_start(timezone.now()),
+        worker_amazon_id=random.choice(seeded["worker_amazon_ids"]),
+        assignment_amazon_id=random.choice(seeded["assignment_amazon_ids"]),
+        ip_addr=f"10.0.{random.randrange(256)}.{random.randrange(256)}",
+        had_amp_encoded=random.random() < 0.1,
+    )
+
+
+@hot_query
+def query_rate_limit_progress(seeded):
+    # @rate_limited("progress", sheddable=True) on the HIT API's progress logging
+    sql, params, _ = get_buckets_sql(
+        "progress",
+        assignment_id=random.choice(seeded["assignment_amazon_ids"]),
+        ip_addr=f"10.0.{random.randrange(256)}.{random.randrange(256)}",
+        sheddable=True,
+    )
+    return sql, params
+
+
+def seed(volumes):
+    # Returns the keys hot queries look rows up by
+    seeded = {}
+    seeded["user"] = User.objects.create(username=f"{BENCHMARK_PREFIX}admin", is_superuser=True)
+    hits = HIT.objects.bulk_create(
+        make_benchmark_hit(amazon_id=f"{BENCHMARK_PREFIX}hit/{i}", status=HIT.Status.PRODUCTION)
+        for i in range(volumes[HIT])
+    )
+    seeded["hit_ids"] = [hit.id for hit in hits]
+    seeded["hit_amazon_ids"] = [hit.amazon_id for hit in hits]
+
+    workers = Worker.objects.bulk_create(
+        (
+            Worker(
+                amazon_id=f"{BENCHMARK_PREFIX}worker/{i}",
+                gender=gender,
+                name=name,
+                is_good_worker=random.random() < 0.01,
+                blocked=random.random() < 0.02,
+            )
+            for i, (gender, name) in enumerate(generate_fake_name() for _ in range(volumes[Worker]))
+        ),
+        batch_size=SEED_BATCH_SIZE,
+    )
+    seeded["worker_amazon_ids"] = [worker.amazon_id for worker in workers]
+
+    call_steps = Assignment.CallStep.values
+    assignments = Assignment.objects.bulk_create(
+        (
+            Assignment(
+                amazon_id=f"{BENCHMARK_PREFIX}assignment/{i}",
+                hit=random.choice(hits),
+                worker=random.choice(workers),
+                call_step=random.choice(call_steps),
+                words_to_pronounce=generate_words_to_pronounce(),
+                progress=[Assignment.encode_progress("benchmark")],
+            )
+            for i in range(volumes[Assignment])
+        ),
+        batch_size=SEED_BATCH_SIZE,
+    )
+    seeded["assignment_ids"] = [assignment.id for assignment in assignments]
+    seeded["assignment_amazon_ids"] = [assignment.amazon_id for assignment in assignments]
+
+    callers = Caller.objects.bulk_create(
+        (Caller(number=f"+1555{i:07d}", name="Benchmark") for i in range(volumes[Caller])),
+        batch_size=SEED_BATCH_SIZE,
+    )
+    seeded["caller_numbers"] = [str(caller.number) for caller in callers]
+
+    Topic.objects.update(is_active=False)
+    Topic.objects.bulk_create(
+        Topic(name=f"Benchmark {i}", recording="topics/benchmark.mp3", is_active=i == 0) for i in range(volumes[Topic])
+    )
+
+    # Monthly partitions for the page loads' time span, like partition_page_loads would have created
+    now = datetime.datetime.now(datetime.UTC)
+    seeded["month"] = now - SEED_PAGE_LOAD_AGE / 2
+    partitions = get_partitions(WorkerPageLoad)
+    for months in range(-(SEED_PAGE_LOAD_AGE.days // 28 + 1), 1):
+        if (month := get_month(now, months)) not in partitions:
+            create_partition(WorkerPageLoad, month)
+
+    with connection.cursor() as cursor:
+        # Page loads mostly for known workers, assignments and HITs, with some spam from unknown ones. In SQL, since
+        # there are so many of them, and so created_at (auto_now_add with bulk_create) can be spread out like real
+        # traffic without leaving behind dead rows.
+        cursor.execute(
+            f"""WITH workers AS (SELECT * FROM unnest(%(workers)s::text[]) WITH ORDINALITY AS t(amazon_id, n)),
+                    assignments AS (SELECT * FROM unnest(%(assignments)s::text[]) WITH ORDINALITY AS t(amazon_id, n)),
+                    hits AS (SELECT * FROM unnest(%(hits)s::text[]) WITH ORDINALITY AS t(amazon_id, n)),
+                    page_loads AS (
+                        SELECT i, random() < 0.1 AS spam,
+                            1 + floor(random() * (SELECT count(*) FROM workers)) AS worker_n,
+                            1 + floor(random() * (SELECT count(*) FROM assignments)) AS assignment_n,
+                            1 + floor(random() * (SELECT count(*) FROM hits)) AS hit_n
+                        FROM generate_series(1, %(num)s) AS i
+                    )
+                INSERT INTO {WorkerPageLoad._meta.db_table}
+                    (created_at, worker_amazon_id, assignment_amazon_id, hit_amazon_id, had_amp_encoded)
+                SELECT now() - random() * %(age)s, coalesce(workers.amazon_id, %(prefix)s || 'spam/' || i),
+                    assignments.amazon_id, hits.amazon_id, spam
+                FROM page_loads
+                    LEFT JOIN workers ON NOT spam AND workers.n = worker_n
+                    LEFT JOIN assignments ON NOT spam AND assignments.n = assignment_n
+                    LEFT JOIN hits ON NOT spam AND hits.n = hit_n""",
+            {
+                "workers": seeded["worker_amazon_ids"],
+                "assignments": seeded["assignment_amazon_ids"],
+                "hits": seeded["hit_amazon_ids"],
+                "num": volumes[WorkerPageLoad],
+                "age": SEED_PAGE_LOAD_AGE,
+                "prefix": BENCHMARK_PREFIX,
+            },
+        )
+        for model in volumes:
+            cursor.execute(f"ANALYZE {model._meta.db_table}")  # So the planner sees realistic statistics
+
+    return seeded
+
+
+def walk_plan(plan):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from walk_plan(child)
+
+
+def describe_node(node):
+    s = node["Node Type"]
+    if "Relation Name" in node:
+        s = f"{s} on {node['Relation Name']}"
+    if "Index Name" in node:
+        s = f"{s} using {node['Index Name']}"
+    return s
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed realistic data volumes (rolled back afterwards), time the hot queries with and without server-side"
+        " prepared statements and fail if any of their plans sequentially scans a large table, then time admin"
+        " changelists"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "benchmarks", nargs="*", choices=sorted((*HOT_QUERIES, *CHANGELISTS)), help="Default: all of them"
+        )
+        parser.add_argument("--iterations", type=int, default=500, help="Executions per query (default: 500)")
+        parser.add_argument(
+            "--changelist-iterations", type=int, default=5, help="Renders per admin changelist (default: 5)"
+        )
+        parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for seeded data volumes")
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=1000,
+            help="Sequential scans of tables with fewer rows are fine, since that's the planner's best option",
+        )
+
+    def time_query(self, cursor, seeded, query, iterations, *, prepare):
+        timings = []
+        for _ in range(iterations):
+            sql, params = query(seeded)
+            start = time.perf_counter()
+            cursor.execute(sql, params, prepare=prepare)
+            cursor.fetchall()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1000
+
+    def benchmark_query(self, cursor, seeded, name, iterations, min_rows):
+        # Returns a list of failures
+        query = HOT_QUERIES[name]
+        unprepared_ms = self.time_query(cursor, seeded, query, iterations, prepare=False)
+        prepared_ms = self.time_query(cursor, seeded, query, iterations, prepare=True)
+
+        sql, params = query(seeded)
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+        ((explain,),) = cursor.fetchall()
+        plan = explain[0]
+        nodes = list(walk_plan(plan["Plan"]))
+
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        self.stdout.write(f"  {unprepared_ms:.3f}ms unprepared, {prepared_ms:.3f}ms prepared (median of {iterations})")
+        self.stdout.write(
+            f"  planning {plan['Planning Time']:.3f}ms, execution {plan['Execution Time']:.3f}ms, buffers"
+            f" {plan['Plan'].get('Shared Hit Blocks', 0)} hit / {plan['Plan'].get('Shared Read Blocks', 0)} read"
+        )
+        self.stdout.write(f"  {', '.join(describe_node(node) for node in nodes)}")
+        if self.verbosity > 1:
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", params)
+            self.stdout.write("\n".join(f"    {line}" for (line,) in cursor.fetchall()))
+
+        failures = []
+        for table in sorted({node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"}):
+            cursor.execute("SELECT reltuples FROM pg_class WHERE relname = %s", (table,))
+            ((num_rows,),) = cursor.fetchall()
+            if num_rows >= min_rows:
+                failures.append(f"{name}: Seq Scan on {table} ({num_rows:.0f} rows)")
+                self.stdout.write(self.style.ERROR(f"  {failures[-1]}"))
+        return failures
+
+    def benchmark_changelist(self, seeded, name, iterations):
+        # Not checked for sequential scans, since counts and facets over a whole table can't avoid them
+        model, params = CHANGELISTS[name]
+        model_admin = admin.site._registry[model]
+        timings, sql_timings = [], []
+        for _ in range(iterations):
+            request = RequestFactory().get(
+                "/",
+                {
+                    key: value.format(
+                        hit_id=random.choice(seeded["hit_ids"]), month=timezone.localtime(seeded["month"])
+                    )
+                    for key, value in params.items()
+                },
+            )
+            request.user = seeded["user"]
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                model_admin.changelist_view(request).render()
+                timings.append(time.perf_counter() - start)
+            sql_timings.append(sum(float(query["time"]) for query in queries))
+
+        slowest = max(queries, key=lambda query: float(query["time"]))
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{name} changelist"))
+        self.stdout.write(
+            f"  {statistics.median(timings) * 1000:.1f}ms total, {statistics.median(sql_timings) * 1000:.1f}ms in"
+            f" {len(queries)} queries (median of {iterations})"
+        )
+        self.stdout.write(f"  slowest {float(slowest['time']) * 1000:.1f}ms: {slowest['sql'][:200]}")
+
+    def handle(self, *args, benchmarks, iterations, changelist_iterations, scale, min_rows, verbosity, **options):
+        self.verbosity = verbosity
+        volumes = {model: max(round(volume * scale), 1) for model, volume in SEED_VOLUMES.items()}
+        failures = []
+
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {sum(volumes.values())} rows...")
+            seeded = seed(volumes)
+            connection.ensure_connection()
+            # Server-side binding cursor. Django's default client-side binding one can't use prepared statements.
+            cursor = psycopg.Cursor(connection.connection)
+
+            for name in benchmarks or (*HOT_QUERIES, *CHANGELISTS):
+                if name in HOT_QUERIES:
+                    failures.extend(self.benchmark_query(cursor, seeded, name, iterations, min_rows))
+                else:
+                    self.benchmark_changelist(seeded, name, changelist_iterations)
+
+            cursor.close()
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"Sequential scans in hot query plans:\n  {'\n  '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("No sequential scans of large tables in hot query plans"))
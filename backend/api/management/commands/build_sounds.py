@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.sounds import build_sounds
+
+
+class Command(BaseCommand):
+    help = "Loudness normalize, trim and encode phone sounds to content hashed files in SOUNDS_ROOT"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Rebuild sounds even if they're up to date")
+
+    def handle(self, *args, force=False, **options):
+        manifest, num_built = build_sounds(force=force)
+        self.stdout.write(f"Built {num_built} of {len(manifest)} sound(s)")
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.partitions import MONTHS_AHEAD, maintain_partitions
+
+
+class Command(BaseCommand):
+    help = "Create upcoming monthly worker page load partitions, and archive expired ones to compressed CSVs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=MONTHS_AHEAD,
+            help=f"Create partitions this many months ahead (default: {MONTHS_AHEAD})",
+        )
+        parser.add_argument(
+            "--retention-months",
+            type=int,
+            default=settings.PAGE_LOAD_RETENTION_MONTHS,
+            help=f"Archive partitions older than this many months (default: {settings.PAGE_LOAD_RETENTION_MONTHS})",
+        )
+        parser.add_argument(
+            "--keep", action="store_true", help="Detach expired partitions as standalone tables instead of archiving"
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only print what would be done")
+
+    def handle(self, *args, months_ahead, retention_months, keep, dry_run, **options):
+        created, archived = maintain_partitions(
+            months_ahead=months_ahead, retention_months=retention_months, keep=keep, dry_run=dry_run
+        )
+        expired = "detach" if keep else "archive"
+        for name in created:
+            self.stdout.write(f"{'Would create' if dry_run else 'Created'} partition {name}")
+        for name in archived:
+            self.stdout.write(f"{f'Would {expired}' if dry_run else f'{expired.capitalize()}d'} partition {name}")
+        self.stdout.write(f"{len(created)} partition(s) created, {len(archived)} {expired}d")
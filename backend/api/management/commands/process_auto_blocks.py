@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api.spam import expire_spam_windows, process_auto_blocks
+
+
+class Command(BaseCommand):
+    help = "Block workers queued by the spam detector, and clear out expired spam detection windows"
+
+    def handle(self, *args, **options):
+        num_by_status = process_auto_blocks()
+        processed = ", ".join(f"{num} {status}" for status, num in num_by_status.items() if status != "pending")
+        self.stdout.write(f"Processed auto-blocks: {processed}")
+        self.stdout.write(f"Expired {expire_spam_windows()} spam detection window(s)")
@@ -0,0 +1,105 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.jobs import HEARTBEAT_INTERVAL, NOTIFY_CHANNEL, claim_job, recover_jobs, renew_jobs, run_job
+
+
+logger = logging.getLogger(f"calls.{__name__}")
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs, waiting for more until stopped"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.JOB_RUNNER_CONCURRENCY,
+            help=f"Run this many jobs at once (default: {settings.JOB_RUNNER_CONCURRENCY})",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5,
+            help="Check for jobs due for a retry (or missed notifications) this often in seconds (default: 5)",
+        )
+        parser.add_argument("--once", action="store_true", help="Exit once no more jobs are due")
+
+    def handle(self, *args, concurrency, poll_interval, once, **options):
+        self.stopping = threading.Event()
+        self.listening_connection = None
+        self.running_jobs = {}  # id => job, renewed by the heartbeat thread
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: self.stopping.set())
+
+        # Jobs only get claimed when there's a free thread to run them
+        slots = threading.BoundedSemaphore(concurrency)
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="job")
+        self.stdout.write(f"Running jobs, {concurrency} at a time")
+        last_recovered_at = 0
+        heartbeat_stopping = threading.Event()
+        heartbeat = threading.Thread(target=self.heartbeat, args=(heartbeat_stopping,), name="heartbeat")
+        heartbeat.start()
+        try:
+            while not self.stopping.is_set():
+                if time.monotonic() - last_recovered_at >= poll_interval:
+                    recover_jobs()
+                    last_recovered_at = time.monotonic()
+
+                if not slots.acquire(timeout=poll_interval):
+                    continue
+                if job := claim_job():
+                    self.running_jobs[job.id] = job
+                    executor.submit(self.run_job_in_thread, job, slots)
+                else:
+                    slots.release()
+                    if once:
+                        break
+                    self.wait_for_jobs(poll_interval)
+        finally:
+            self.stdout.write("Waiting for running jobs to finish...")
+            executor.shutdown(wait=True)
+            heartbeat_stopping.set()
+            heartbeat.join()
+
+    def wait_for_jobs(self, timeout):
+        # LISTEN again whenever Django has reconnected
+        connection.ensure_connection()
+        if connection.connection is not self.listening_connection:
+            self.listening_connection = connection.connection
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+
+        # Notifications that arrive mid-claim can be missed (depending on the psycopg version), which polling covers
+        for _ in self.listening_connection.notifies(timeout=timeout, stop_after=1):
+            pass
+
+    def heartbeat(self, stopping):
+        # Renews running jobs until they finish (including while stopping), since only some tasks report progress
+        try:
+            while not stopping.wait(HEARTBEAT_INTERVAL.total_seconds()):
+                try:
+                    renew_jobs(list(self.running_jobs.values()))
+                except Exception:
+                    logger.exception("Error renewing running jobs")
+                    if connection.connection is not None and not connection.is_usable():
+                        connection.close()
+        finally:
+            connection.close()
+
+    def run_job_in_thread(self, job, slots):
+        try:
+            run_job(job)
+        except Exception:
+            logger.exception(f"Error finishing job {job}")
+        finally:
+            self.running_jobs.pop(job.id, None)
+            connection.close()  # Threads get their own connection, don't leak it
+            slots.release()
@@ -0,0 +1,58 @@
+import logging
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.scheduler import run_scheduler, try_lock
+
+
+logger = logging.getLogger(f"calls.{__name__}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Publish scheduled HITs, expire HITs when their show ends, top up running HITs and queue daily page load"
+        " partition maintenance, until stopped"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.SCHEDULER_INTERVAL,
+            help=f"Run the scheduler this often in seconds (default: {settings.SCHEDULER_INTERVAL})",
+        )
+        parser.add_argument("--once", action="store_true", help="Run the scheduler once, if this is the leader")
+
+    def handle(self, *args, interval, once, **options):
+        stopping = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stopping.set())
+
+        # Other processes running this stand by, and take over if the leader's connection closes (ie, it died)
+        leader_connection = None
+        self.stdout.write(f"Running the scheduler every {interval:g}s, when it's the leader")
+        while not stopping.is_set():
+            try:
+                connection.ensure_connection()
+                if connection.connection is not leader_connection:
+                    if try_lock():
+                        leader_connection = connection.connection
+                        logger.info("Became the scheduler's leader")
+                    elif leader_connection is not None:
+                        leader_connection = None
+                        logger.warning("Lost the scheduler's leadership")
+
+                if leader_connection is not None:
+                    run_scheduler()
+            except Exception:
+                logger.exception("Error running the scheduler")
+                if connection.connection is not None and not connection.is_usable():
+                    connection.close()
+
+            if once:
+                break
+            stopping.wait(interval)
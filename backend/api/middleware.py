@@ -1,6 +1,8 @@
 import json
 import logging
 
+from calls.pools import get_saturation
+
 from .twilio import twilio_client
 
 
@@ -28,3 +30,17 @@ class SendTwilioUserDefinedMessageAtEndOfRequestMiddleware:
                 logger.exception("send_twilio_message() threw an exception! Recovering from the error.")
 
         return response
+
+
+class PoolSaturationMiddleware:
+    # Reports the worker pool and how many of its workers are busy (including this one) for nginx to log, as
+    # "X-Pool: <name> <busy>/<workers>". nginx strips it from responses.
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (saturation := get_saturation()) is not None:
+            name, busy, num_workers = saturation
+            response["X-Pool"] = f"{name} {busy}/{num_workers}"
+        return response
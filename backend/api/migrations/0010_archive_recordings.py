@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-19 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0009_add_call_recordings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="assignment",
+            name="voicemail_file",
+            field=models.FileField(
+                blank=True,
+                help_text="Local copy of the voicemail.",
+                upload_to="recordings/",
+                verbose_name="archived voicemail",
+            ),
+        ),
+        migrations.AddField(
+            model_name="callrecording",
+            name="file",
+            field=models.FileField(
+                blank=True,
+                help_text="Local copy of the recording.",
+                upload_to="recordings/",
+                verbose_name="archived file",
+            ),
+        ),
+        migrations.AddField(
+            model_name="voicemail",
+            name="file",
+            field=models.FileField(
+                blank=True,
+                help_text="Local copy of the recording.",
+                upload_to="recordings/",
+                verbose_name="archived file",
+            ),
+        ),
+    ]
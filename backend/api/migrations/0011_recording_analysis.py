@@ -0,0 +1,94 @@
+# Generated by Django 5.1.15 on 2026-10-19 15:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0010_archive_recordings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="assignment",
+            name="voicemail_effective_duration",
+            field=models.DurationField(
+                blank=True,
+                db_index=True,
+                help_text="Amount of the voicemail that contains speech.",
+                null=True,
+                verbose_name="voicemail effective duration",
+            ),
+        ),
+        migrations.AddField(
+            model_name="assignment",
+            name="voicemail_peak_level",
+            field=models.FloatField(blank=True, null=True, verbose_name="voicemail peak level (dBFS)"),
+        ),
+        migrations.AddField(
+            model_name="assignment",
+            name="voicemail_speech_ratio",
+            field=models.FloatField(
+                blank=True,
+                db_index=True,
+                help_text="Fraction of the voicemail containing speech (computed after the voicemail is archived).",
+                null=True,
+                verbose_name="voicemail speech ratio",
+            ),
+        ),
+        migrations.AddField(
+            model_name="callrecording",
+            name="effective_duration",
+            field=models.DurationField(
+                blank=True,
+                db_index=True,
+                help_text="Amount of the recording that contains speech.",
+                null=True,
+                verbose_name="effective duration",
+            ),
+        ),
+        migrations.AddField(
+            model_name="callrecording",
+            name="peak_level",
+            field=models.FloatField(blank=True, null=True, verbose_name="peak level (dBFS)"),
+        ),
+        migrations.AddField(
+            model_name="callrecording",
+            name="speech_ratio",
+            field=models.FloatField(
+                blank=True,
+                db_index=True,
+                help_text="Fraction of the recording containing speech (computed after the recording is archived).",
+                null=True,
+                verbose_name="speech ratio",
+            ),
+        ),
+        migrations.AddField(
+            model_name="voicemail",
+            name="effective_duration",
+            field=models.DurationField(
+                blank=True,
+                db_index=True,
+                help_text="Amount of the recording that contains speech.",
+                null=True,
+                verbose_name="effective duration",
+            ),
+        ),
+        migrations.AddField(
+            model_name="voicemail",
+            name="peak_level",
+            field=models.FloatField(blank=True, null=True, verbose_name="peak level (dBFS)"),
+        ),
+        migrations.AddField(
+            model_name="voicemail",
+            name="speech_ratio",
+            field=models.FloatField(
+                blank=True,
+                db_index=True,
+                help_text="Fraction of the recording containing speech (computed after the recording is archived).",
+                null=True,
+                verbose_name="speech ratio",
+            ),
+        ),
+    ]
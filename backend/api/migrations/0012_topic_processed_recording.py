@@ -0,0 +1,24 @@
+# Generated by Django 5.1.15 on 2026-10-19 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_recording_analysis"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="topic",
+            name="processed_recording",
+            field=models.FileField(
+                blank=True,
+                editable=False,
+                help_text="Loudness normalized and silence trimmed version of the recording, as played to callers.",
+                upload_to="topics/processed/",
+                verbose_name="processed recording",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0012_topic_processed_recording"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="assignment",
+            name="version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.15 on 2026-10-19 16:07
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False  # Build indexes without locking out writes
+
+    dependencies = [
+        ("api", "0013_assignment_version"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="assignment",
+            index=models.Index(fields=["hit", "call_step", "-created_at"], name="assignment_hit_step_created"),
+        ),
+        AddIndexConcurrently(
+            model_name="assignment",
+            index=models.Index(
+                condition=models.Q(("call_step", "done"), _negated=True),
+                fields=["call_step", "-created_at"],
+                name="assignment_active",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="worker",
+            index=models.Index(
+                condition=models.Q(("is_good_worker", True)), fields=["amazon_id"], name="worker_good_amazon_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="worker",
+            index=models.Index(
+                condition=models.Q(("blocked", True)), fields=["amazon_id"], name="worker_blocked_amazon_id"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="workerpageload",
+            index=models.Index(
+                condition=models.Q(("had_amp_encoded", True)), fields=["-created_at"], name="pageload_amp_created"
+            ),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.15 on 2026-10-19 16:07
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+import django.db.models.functions.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    atomic = False  # Build indexes without locking out writes
+
+    dependencies = [
+        ("api", "0014_indexes"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name="hit",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("name"), name="gin_trgm_ops"
+                ),
+                name="hit_name_trgm",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="worker",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("name"), name="gin_trgm_ops"
+                ),
+                name="worker_name_trgm",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="worker",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("location"), name="gin_trgm_ops"
+                ),
+                name="worker_location_trgm",
+            ),
+        ),
+    ]
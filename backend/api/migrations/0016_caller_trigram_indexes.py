@@ -0,0 +1,35 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:14
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+import django.db.models.functions.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    atomic = False  # Build indexes without locking out writes
+
+    dependencies = [
+        ("api", "0015_trigram_indexes"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="caller",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("name"), name="gin_trgm_ops"
+                ),
+                name="caller_name_trgm",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="caller",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("location"), name="gin_trgm_ops"
+                ),
+                name="caller_location_trgm",
+            ),
+        ),
+    ]
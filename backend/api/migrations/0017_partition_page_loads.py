@@ -0,0 +1,92 @@
+from django.db import migrations
+
+
+# Worker page loads are append-only and only ever looked at recently, so they're range partitioned by month. The
+# primary key has to include the partition key, so it's (id, created_at) in the database. Django still treats id as
+# the primary key, which stays unique since it comes from a single sequence. A plain sequence rather than an identity
+# column, since Postgres < 17 doesn't support identity columns on partitioned tables.
+COLUMNS = "id, created_at, worker_amazon_id, assignment_amazon_id, hit_amazon_id, had_amp_encoded"
+INDEXES_SQL = """
+ALTER TABLE api_workerpageload ADD CONSTRAINT api_workerpageload_pkey PRIMARY KEY ({pkey});
+CREATE INDEX api_workerpageload_created_at_c4c749ca ON api_workerpageload (created_at);
+CREATE INDEX api_workerpageload_worker_amazon_id_c9e2e6ea ON api_workerpageload (worker_amazon_id);
+CREATE INDEX api_workerpageload_worker_amazon_id_c9e2e6ea_like
+    ON api_workerpageload (worker_amazon_id varchar_pattern_ops);
+CREATE INDEX pageload_amp_created ON api_workerpageload (created_at DESC) WHERE had_amp_encoded;
+"""
+
+PARTITION_SQL = f"""
+ALTER TABLE api_workerpageload RENAME TO api_workerpageload_unpartitioned;
+
+CREATE TABLE api_workerpageload (
+    id bigint NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    worker_amazon_id varchar(255) NOT NULL,
+    assignment_amazon_id varchar(255) NULL,
+    hit_amazon_id varchar(255) NULL,
+    had_amp_encoded boolean NOT NULL
+) PARTITION BY RANGE (created_at);
+
+-- Catches anything outside the monthly partitions, should partition_page_loads not have run in a while
+CREATE TABLE api_workerpageload_default PARTITION OF api_workerpageload DEFAULT;
+
+-- Monthly partitions (UTC) from the oldest page load through three months from now
+DO $$
+DECLARE
+    month timestamp with time zone;
+BEGIN
+    FOR month IN SELECT generate_series(
+        date_trunc('month', coalesce((SELECT min(created_at) FROM api_workerpageload_unpartitioned), now()), 'UTC'),
+        date_trunc('month', now(), 'UTC') + interval '3 months',
+        interval '1 month'
+    ) LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF api_workerpageload FOR VALUES FROM (%L) TO (%L)',
+            'api_workerpageload_p' || to_char(month AT TIME ZONE 'UTC', 'YYYY_MM'),
+            month,
+            month + interval '1 month'
+        );
+    END LOOP;
+END $$;
+
+INSERT INTO api_workerpageload ({COLUMNS}) SELECT {COLUMNS} FROM api_workerpageload_unpartitioned;
+
+CREATE SEQUENCE api_workerpageload_id_seq_partitioned OWNED BY api_workerpageload.id;
+SELECT setval('api_workerpageload_id_seq_partitioned', coalesce(max(id), 0) + 1, false) FROM api_workerpageload;
+DROP TABLE api_workerpageload_unpartitioned;
+ALTER SEQUENCE api_workerpageload_id_seq_partitioned RENAME TO api_workerpageload_id_seq;
+ALTER TABLE api_workerpageload ALTER COLUMN id SET DEFAULT nextval('api_workerpageload_id_seq');
+
+{INDEXES_SQL.format(pkey="id, created_at")}
+"""
+
+UNPARTITION_SQL = f"""
+ALTER TABLE api_workerpageload RENAME TO api_workerpageload_partitioned;
+ALTER TABLE api_workerpageload_partitioned ALTER COLUMN id DROP DEFAULT;
+ALTER SEQUENCE api_workerpageload_id_seq RENAME TO api_workerpageload_id_seq_partitioned;
+
+CREATE TABLE api_workerpageload (
+    id bigint NOT NULL GENERATED BY DEFAULT AS IDENTITY,
+    created_at timestamp with time zone NOT NULL,
+    worker_amazon_id varchar(255) NOT NULL,
+    assignment_amazon_id varchar(255) NULL,
+    hit_amazon_id varchar(255) NULL,
+    had_amp_encoded boolean NOT NULL
+);
+INSERT INTO api_workerpageload ({COLUMNS}) SELECT {COLUMNS} FROM api_workerpageload_partitioned;
+SELECT setval(pg_get_serial_sequence('api_workerpageload', 'id'), coalesce(max(id), 0) + 1, false)
+    FROM api_workerpageload;
+DROP TABLE api_workerpageload_partitioned;
+
+{INDEXES_SQL.format(pkey="id")}
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0016_caller_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.RunSQL(PARTITION_SQL, reverse_sql=UNPARTITION_SQL),
+    ]
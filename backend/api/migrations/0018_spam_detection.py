@@ -0,0 +1,79 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0017_partition_page_loads"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SpamWindow",
+            fields=[
+                ("key", models.CharField(max_length=271, primary_key=True, serialize=False, verbose_name="key")),
+                ("window_start", models.DateTimeField(verbose_name="window start")),
+                ("page_loads", models.PositiveIntegerField(default=0, verbose_name="page loads")),
+                ("previous_page_loads", models.PositiveIntegerField(default=0, verbose_name="previous page loads")),
+                ("amp_encoded", models.PositiveIntegerField(default=0, verbose_name="amp encoded")),
+                ("previous_amp_encoded", models.PositiveIntegerField(default=0, verbose_name="previous amp encoded")),
+                ("changes", models.PositiveIntegerField(default=0, verbose_name="changes")),
+                ("previous_changes", models.PositiveIntegerField(default=0, verbose_name="previous changes")),
+                ("last_value", models.CharField(blank=True, max_length=255, null=True, verbose_name="last value")),
+            ],
+            options={
+                "verbose_name": "spam window",
+            },
+        ),
+        # Counters are rewritten on every page load and not worth crash-safety (or WAL) to keep
+        migrations.RunSQL(
+            "ALTER TABLE api_spamwindow SET UNLOGGED", reverse_sql="ALTER TABLE api_spamwindow SET LOGGED"
+        ),
+        migrations.CreateModel(
+            name="AutoBlock",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="created at")),
+                ("processed_at", models.DateTimeField(blank=True, null=True, verbose_name="processed at")),
+                (
+                    "worker_amazon_id",
+                    models.CharField(
+                        help_text="Worker identifier as used by the Amazon MTurk API.",
+                        max_length=255,
+                        unique=True,
+                        verbose_name="worker Amazon ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("blocked", "Blocked"),
+                            ("dismissed", "Dismissed"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=9,
+                        verbose_name="status",
+                    ),
+                ),
+                ("score", models.FloatField(verbose_name="spam score")),
+                ("reason", models.CharField(blank=True, max_length=255, verbose_name="reason")),
+            ],
+            options={
+                "verbose_name": "MTurk worker auto-block",
+                "ordering": ("-created_at", "id"),
+                "get_latest_by": "created_at",
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("status", "pending")),
+                        fields=["created_at"],
+                        name="autoblock_pending_created",
+                    )
+                ],
+            },
+        ),
+    ]
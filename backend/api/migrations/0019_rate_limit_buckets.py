@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0018_spam_detection"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RateLimitBucket",
+            fields=[
+                ("key", models.CharField(max_length=287, primary_key=True, serialize=False, verbose_name="key")),
+                ("tokens", models.FloatField(verbose_name="tokens")),
+                ("capacity", models.FloatField(verbose_name="capacity")),
+                ("refill_rate", models.FloatField(help_text="Tokens per second.", verbose_name="refill rate")),
+                ("updated_at", models.DateTimeField(verbose_name="updated at")),
+            ],
+            options={
+                "verbose_name": "rate limit bucket",
+            },
+        ),
+        # Rewritten on every HIT API request, and not worth crash-safety (or WAL) to keep
+        migrations.RunSQL(
+            "ALTER TABLE api_ratelimitbucket SET UNLOGGED", reverse_sql="ALTER TABLE api_ratelimitbucket SET LOGGED"
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0019_rate_limit_buckets"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Job",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("task", models.CharField(max_length=64, verbose_name="task")),
+                ("kwargs", models.JSONField(blank=True, default=dict, verbose_name="arguments")),
+                (
+                    "key",
+                    models.CharField(
+                        blank=True,
+                        help_text="At most one queued job per key, to collapse duplicates.",
+                        max_length=128,
+                        verbose_name="key",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Queued"),
+                            ("running", "Running"),
+                            ("succeeded", "Succeeded"),
+                            ("failed", "Failed"),
+                            ("cancelled", "Cancelled"),
+                        ],
+                        default="queued",
+                        max_length=9,
+                        verbose_name="status",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="created at")),
+                ("run_after", models.DateTimeField(default=django.utils.timezone.now, verbose_name="run after")),
+                ("started_at", models.DateTimeField(blank=True, null=True, verbose_name="started at")),
+                ("finished_at", models.DateTimeField(blank=True, null=True, verbose_name="finished at")),
+                ("locked_until", models.DateTimeField(blank=True, null=True, verbose_name="locked until")),
+                ("attempts", models.PositiveSmallIntegerField(default=0, verbose_name="attempts")),
+                ("max_attempts", models.PositiveSmallIntegerField(default=1, verbose_name="max attempts")),
+                ("progress", models.PositiveIntegerField(default=0, verbose_name="progress")),
+                ("progress_total", models.PositiveIntegerField(blank=True, null=True, verbose_name="progress total")),
+                ("result", models.TextField(blank=True, verbose_name="result")),
+                ("error", models.TextField(blank=True, verbose_name="error")),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "background job",
+                "ordering": ("-created_at", "id"),
+                "get_latest_by": "created_at",
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("status", "queued")),
+                        fields=["run_after", "id"],
+                        name="job_queued_run_after",
+                    ),
+                    models.Index(condition=models.Q(("status", "running")), fields=["task"], name="job_running_task"),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("status", "queued"), models.Q(("key", ""), _negated=True)),
+                        fields=("key",),
+                        name="job_queued_key_unique",
+                    )
+                ],
+            },
+        ),
+    ]
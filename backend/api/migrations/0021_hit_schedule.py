@@ -0,0 +1,77 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:53
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0020_jobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="hit",
+            name="expired_at",
+            field=models.DateTimeField(
+                blank=True,
+                default=None,
+                help_text="Time this HIT was expired early on MTurk.",
+                null=True,
+                verbose_name="expired at",
+            ),
+        ),
+        migrations.AddField(
+            model_name="hit",
+            name="max_assignment_number",
+            field=models.PositiveIntegerField(
+                blank=True,
+                default=None,
+                help_text=(
+                    "While this HIT is running, automatically add assignments as calls complete, up to this many. Leave"
+                    " blank to disable. NOTE: MTurk won't top up a HIT published with fewer than 10 assignments to 10"
+                    " or more."
+                ),
+                null=True,
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(1000),
+                ],
+                verbose_name="maximum number of assignments to top up to",
+            ),
+        ),
+        migrations.AddField(
+            model_name="hit",
+            name="publish_at",
+            field=models.DateTimeField(
+                blank=True,
+                default=None,
+                help_text="Automatically publish this HIT to MTurk at this time. Leave blank to publish it manually.",
+                null=True,
+                verbose_name="publish at",
+            ),
+        ),
+        migrations.AddField(
+            model_name="hit",
+            name="publish_to_production",
+            field=models.BooleanField(
+                default=False,
+                help_text="When publishing automatically, publish to Production rather than the Sandbox.",
+                verbose_name="publish to production",
+            ),
+        ),
+        migrations.AddField(
+            model_name="hit",
+            name="show_ends_at",
+            field=models.DateTimeField(
+                blank=True,
+                default=None,
+                help_text=(
+                    "Expire this HIT on MTurk at this time if it's still running, so no one calls in after the show."
+                ),
+                null=True,
+                verbose_name="show ends at",
+            ),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0021_hit_schedule"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HoldQueueEntry",
+            fields=[
+                (
+                    "assignment",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        serialize=False,
+                        to="api.assignment",
+                    ),
+                ),
+                (
+                    "queued_at",
+                    models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name="queued at"),
+                ),
+                ("dialed_at", models.DateTimeField(blank=True, null=True, verbose_name="last dialed at")),
+            ],
+            options={
+                "verbose_name": "hold queue entry",
+                "verbose_name_plural": "hold queue entries",
+                "ordering": ("queued_at", "assignment_id"),
+            },
+        ),
+        migrations.CreateModel(
+            name="HostAvailability",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("host", models.CharField(max_length=255, unique=True, verbose_name="SIP host")),
+                ("on_call_since", models.DateTimeField(blank=True, null=True, verbose_name="on a call since")),
+                ("available_at", models.DateTimeField(blank=True, null=True, verbose_name="available since")),
+                (
+                    "queue_moved_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="When a worker last left the hold queue, moving the ones behind them up.",
+                        null=True,
+                        verbose_name="hold queue last moved at",
+                    ),
+                ),
+                ("last_answered_at", models.DateTimeField(blank=True, null=True, verbose_name="last answered at")),
+                ("last_busy_at", models.DateTimeField(blank=True, null=True, verbose_name="last busy at")),
+                ("num_answered", models.PositiveIntegerField(default=0, verbose_name="answered calls")),
+                ("num_busy", models.PositiveIntegerField(default=0, verbose_name="busy or unanswered calls")),
+            ],
+            options={
+                "verbose_name": "host availability",
+                "verbose_name_plural": "host availability",
+            },
+        ),
+        # Rewritten on every dial and call event of the show happening right now, and not worth crash-safety (or WAL)
+        migrations.RunSQL(
+            "ALTER TABLE api_holdqueueentry SET UNLOGGED", reverse_sql="ALTER TABLE api_holdqueueentry SET LOGGED"
+        ),
+        migrations.RunSQL(
+            "ALTER TABLE api_hostavailability SET UNLOGGED", reverse_sql="ALTER TABLE api_hostavailability SET LOGGED"
+        ),
+    ]
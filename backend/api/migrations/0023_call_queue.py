@@ -0,0 +1,28 @@
+# Generated by Django 5.1.15 on 2026-10-19 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0022_hold_queue"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="holdqueueentry",
+            name="call_sid",
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name="call SID"),
+        ),
+        migrations.AddField(
+            model_name="hostavailability",
+            name="call_sid",
+            field=models.CharField(blank=True, max_length=64, verbose_name="call SID"),
+        ),
+        migrations.AddField(
+            model_name="hostavailability",
+            name="rung_at",
+            field=models.DateTimeField(blank=True, null=True, verbose_name="rung at"),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-19 18:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0023_call_queue"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="hostavailability",
+            name="queue_moved_at",
+        ),
+        migrations.AddField(
+            model_name="holdqueueentry",
+            name="seen_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                help_text="When the worker last started a hold loop or dialed the host, to tell when they've hung up.",
+                verbose_name="last seen at",
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.15 on 2026-10-19 18:30
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0024_hold_queue_heartbeat"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="spamwindow",
+            name="changes",
+        ),
+        migrations.RemoveField(
+            model_name="spamwindow",
+            name="last_value",
+        ),
+        migrations.RemoveField(
+            model_name="spamwindow",
+            name="previous_changes",
+        ),
+        migrations.AddField(
+            model_name="spamwindow",
+            name="previous_num_seen",
+            field=models.PositiveIntegerField(default=0, verbose_name="previously seen"),
+        ),
+        migrations.AddField(
+            model_name="spamwindow",
+            name="seen",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.CharField(max_length=255), blank=True, default=list, size=None
+            ),
+        ),
+    ]
@@ -1,21 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import datetime
 from decimal import Decimal
 from functools import cached_property
 import logging
 import pprint
 import random
+import re
+import time
 import traceback
 import uuid
 
-from faker import Faker
-
 from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.models import AbstractUser
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core import validators
-from django.db import models
-from django.db.models import F, Func, Q, Value
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.db.models import ExpressionWrapper, F, Func, Q, Value
+from django.db.models.functions import Coalesce, Upper
 from django.template.loader import render_to_string
 from django.utils import timezone
 from django.utils.text import slugify
@@ -24,6 +30,7 @@ from django_countries.fields import CountryField
 from django_jsonform.models.fields import JSONField
 from phonenumber_field.modelfields import PhoneNumberField
 
+from .call_steps import TIMESTAMP_FIELDS, TIMESTAMPS, TRANSITIONS, is_valid_transition
 from .constants import (
     CALL_STEP_CALL,
     CALL_STEP_DONE,
@@ -47,17 +54,22 @@ from .constants import (
     WORKER_NAME_MAX_LENGTH,
     ZULU_STRFTIME,
 )
+from .sounds import encode_sound, get_content_hash
 from .utils import (
     ChoicesCharField,
     block_or_unblock_worker,
+    generate_fake_name,
     get_ip_addr,
     get_location_from_ip_addr,
     get_mturk_client,
     get_mturk_clients,
+    upsert,
 )
 
 
 logger = logging.getLogger(f"calls.{__name__}")
+# HIT IDs are 30 uppercase alphanumerics
+HIT_ID_IN_ERROR_RE = re.compile(r"\b([A-Z0-9]{30})\b")
 
 
 class User(AbstractUser):
@@ -88,6 +100,11 @@ class BaseAmazonModel(models.Model):
         abstract = True
 
 
+def trigram_index(field, name):
+    # Serves admin searches, which are UPPER("field"::text) LIKE UPPER('%term%')
+    return GinIndex(OpClass(Upper(field), name="gin_trgm_ops"), name=name)
+
+
 def min_max(min_value, max_value):
     return [validators.MinValueValidator(min_value), validators.MaxValueValidator(max_value)]
 
@@ -107,6 +124,7 @@ class HIT(BaseAmazonModel):
         "duration",
         "keywords",
         "leave_voicemail_after_duration",
+        "max_assignment_number",
         "min_call_duration",
         "qualification_adult",
         "qualification_approval_rate",
@@ -117,6 +135,8 @@ class HIT(BaseAmazonModel):
         "title",
         "topic",
     )
+    # The cache is per process (locmem), so invalidation on save doesn't reach other workers. Keep this short.
+    CACHE_TIMEOUT = 60
 
     class Status(models.TextChoices):
         SANDBOX = "sandbox", "Sandbox (published)"
@@ -215,10 +235,45 @@ class HIT(BaseAmazonModel):
         blank=True,
         help_text="The last contains of the last error (if any) that occurred while publishing this HIT to MTurk.",
     )
+    # Acted on by ./manage.py run_scheduler (see api/scheduler.py)
+    publish_at = models.DateTimeField(
+        "publish at",
+        null=True,
+        default=None,
+        blank=True,
+        help_text="Automatically publish this HIT to MTurk at this time. Leave blank to publish it manually.",
+    )
+    publish_to_production = models.BooleanField(
+        "publish to production",
+        default=False,
+        help_text="When publishing automatically, publish to Production rather than the Sandbox.",
+    )
+    show_ends_at = models.DateTimeField(
+        "show ends at",
+        null=True,
+        default=None,
+        blank=True,
+        help_text="Expire this HIT on MTurk at this time if it's still running, so no one calls in after the show.",
+    )
+    expired_at = models.DateTimeField(
+        "expired at", null=True, default=None, blank=True, help_text="Time this HIT was expired early on MTurk."
+    )
+    max_assignment_number = models.PositiveIntegerField(
+        "maximum number of assignments to top up to",
+        null=True,
+        default=None,
+        blank=True,
+        validators=min_max(1, 1000),
+        help_text=(
+            "While this HIT is running, automatically add assignments as calls complete, up to this many. Leave blank"
+            " to disable. NOTE: MTurk won't top up a HIT published with fewer than 10 assignments to 10 or more."
+        ),
+    )
 
     class Meta(BaseAmazonModel.Meta):
         verbose_name = "MTurk HIT"
         get_latest_by = "created_at"
+        indexes = (trigram_index("name", "hit_name_trgm"),)
         permissions = (
             ("preview_hit", "Can preview HIT (frontend)"),
             ("publish_sandbox_hit", "Can publish HIT to MTurk (Sandbox)"),
@@ -242,6 +297,29 @@ class HIT(BaseAmazonModel):
         if not is_cloning and self.name.startswith(self.CLONE_PREFIX):
             self.name = self.name.removeprefix(self.CLONE_PREFIX)
         super().save(*args, **kwargs)
+        transaction.on_commit(self.clear_cache)
+
+    @staticmethod
+    def get_cache_key(field, value):
+        return f"hit:{field}:{value}"
+
+    @classmethod
+    def get_cached(cls, **lookup) -> "HIT":
+        # Read-through cache of published HITs (effectively immutable) by id or amazon_id, for the handshake and
+        # Twilio webhooks which only ever read them
+        ((field, value),) = lookup.items()
+        hit = cache.get(cls.get_cache_key(field, value))
+        if hit is None:
+            hit = cls.objects.get(**lookup)
+            if hit.is_published:
+                cache.set_many(
+                    {cls.get_cache_key("id", hit.id): hit, cls.get_cache_key("amazon_id", hit.amazon_id): hit},
+                    timeout=cls.CACHE_TIMEOUT,
+                )
+        return hit
+
+    def clear_cache(self):
+        cache.delete_many([self.get_cache_key("id", self.id), self.get_cache_key("amazon_id", self.amazon_id)])
 
     @admin.display(description="Unit cost")
     def get_unit_cost(self):
@@ -268,6 +346,19 @@ class HIT(BaseAmazonModel):
     def is_on_amazon(self):
         return self.amazon_id and self.is_published
 
+    @property
+    def is_running(self):
+        # Until its lifetime runs out, or it's expired early
+        return bool(self.submitted_at and not self.expired_at and self.submitted_at + self.duration >= timezone.now())
+
+    @classmethod
+    def get_running(cls):
+        # Same as is_running, in the database
+        ends_at = ExpressionWrapper(F("submitted_at") + F("duration"), output_field=models.DateTimeField())
+        return cls.objects.alias(ends_at=ends_at).filter(
+            status__in=(cls.Status.SANDBOX, cls.Status.PRODUCTION), expired_at__isnull=True, ends_at__gte=timezone.now()
+        )
+
     @cached_property
     def __amazon_obj(self) -> dict | None:
         if self.is_on_amazon:
@@ -283,33 +374,17 @@ class HIT(BaseAmazonModel):
     def get_amazon_status(self):
         return self.__amazon_obj["HITStatus"] if self.__amazon_obj else "Not submitted"
 
-    def publish_to_mturk(self, *, production=False):
-        client = get_mturk_client(production=production)
-        kwargs = {
-            "AssignmentDurationInSeconds": int(self.assignment_duration.total_seconds()),
-            "AutoApprovalDelayInSeconds": int(self.approval_delay.total_seconds()),
-            "Description": self.description,
-            "Keywords": self.keywords,
-            "LifetimeInSeconds": int(self.duration.total_seconds()),
-            "MaxAssignments": self.assignment_number,
-            "Question": render_to_string("api/external_question.xml", {"url": f"https://{settings.DOMAIN_NAME}/hit/"}),
-            "RequesterAnnotation": f"{self.name} ({self.topic})",
-            "Reward": f"{self.assignment_reward:.02f}",
-            "Title": self.title,
-            "UniqueRequestToken": str(self.unique_request_token),
-            "AssignmentReviewPolicy": {
-                "PolicyName": "ScoreMyKnownAnswers/2011-09-01",
-                "Parameters": [
-                    {"Key": "AnswerKey", "MapEntries": [{"Key": "approvalCode", "Values": [str(self.approval_code)]}]},
-                    {"Key": "RejectIfKnownAnswerScoreIsLessThan", "Values": ["1"]},
-                    {
-                        "Key": "RejectReason",
-                        "Values": ["You submitted the assignment without first properly completing it."],
-                    },
-                ],
-            },
-        }
+    def get_qualifications_key(self):
+        # HITs with the same key get the same qualification requirements
+        return (
+            self.qualification_masters,
+            self.qualification_approval_rate,
+            self.qualification_num_previously_approved,
+            tuple(country.code for country in self.qualification_countries),
+            self.qualification_adult,
+        )
 
+    def get_qualification_requirements(self, *, production=False) -> list:
         qualifications = []
         if self.qualification_masters:
             qualifications.append({
@@ -340,11 +415,67 @@ class HIT(BaseAmazonModel):
                 "Comparator": "EqualTo",
                 "IntegerValues": [1],
             })
+        return qualifications
+
+    @staticmethod
+    def render_external_question():
+        # The same for every HIT
+        return render_to_string("api/external_question.xml", {"url": f"https://{settings.DOMAIN_NAME}/hit/"})
+
+    def get_create_hit_kwargs(self, *, production=False, question=None, qualifications=None) -> dict:
+        kwargs = {
+            "AssignmentDurationInSeconds": int(self.assignment_duration.total_seconds()),
+            "AutoApprovalDelayInSeconds": int(self.approval_delay.total_seconds()),
+            "Description": self.description,
+            "Keywords": self.keywords,
+            "LifetimeInSeconds": int(self.duration.total_seconds()),
+            "MaxAssignments": self.assignment_number,
+            "Question": question or self.render_external_question(),
+            "RequesterAnnotation": f"{self.name} ({self.topic})",
+            "Reward": f"{self.assignment_reward:.02f}",
+            "Title": self.title,
+            "UniqueRequestToken": str(self.unique_request_token),
+            "AssignmentReviewPolicy": {
+                "PolicyName": "ScoreMyKnownAnswers/2011-09-01",
+                "Parameters": [
+                    {"Key": "AnswerKey", "MapEntries": [{"Key": "approvalCode", "Values": [str(self.approval_code)]}]},
+                    {"Key": "RejectIfKnownAnswerScoreIsLessThan", "Values": ["1"]},
+                    {
+                        "Key": "RejectReason",
+                        "Values": ["You submitted the assignment without first properly completing it."],
+                    },
+                ],
+            },
+        }
+        if qualifications is None:
+            qualifications = self.get_qualification_requirements(production=production)
         if qualifications:
             kwargs["QualificationRequirements"] = qualifications
+        return kwargs
 
+    @staticmethod
+    def create_hit(client, kwargs) -> dict:
         try:
-            response = client.create_hit(**kwargs)
+            return client.create_hit(**kwargs)["HIT"]
+        except client.exceptions.RequestError as e:
+            # MTurk creates at most one HIT per UniqueRequestToken, so a retry of a request that actually went through
+            # (ie, its response was lost) gets an error naming the existing HIT, which counts as success
+            if "already" in str(e).lower() and (match := HIT_ID_IN_ERROR_RE.search(str(e))):
+                logger.warning(f"HIT {match.group(1)} was already created with token {kwargs['UniqueRequestToken']}")
+                return client.get_hit(HITId=match.group(1))["HIT"]
+            raise
+
+    def set_published(self, amazon_hit, *, production=False):
+        self.submitted_at = timezone.now()
+        self.amazon_id = amazon_hit["HITId"]
+        self.status = self.Status.PRODUCTION if production else self.Status.SANDBOX
+        self.publish_api_exception = ""
+
+    def publish_to_mturk(self, *, production=False):
+        client = get_mturk_client(production=production)
+        kwargs = self.get_create_hit_kwargs(production=production)
+        try:
+            amazon_hit = self.create_hit(client, kwargs)
         except Exception:
             self.publish_api_exception = traceback.format_exc()
             logger.exception(f"Error ocurred while publishing to {'Production' if production else 'the Sandbox'}")
@@ -353,16 +484,98 @@ class HIT(BaseAmazonModel):
 
         else:
             if settings.DEBUG:
-                logger.info(f"Got response from Amazon...\n{pprint.pformat(response)}")
-            self.submitted_at = timezone.now()
-            self.amazon_id = response["HIT"]["HITId"]
-            self.status = self.Status.PRODUCTION if production else self.Status.SANDBOX
-            self.publish_api_exception = ""
+                logger.info(f"Got response from Amazon...\n{pprint.pformat(amazon_hit)}")
+            self.set_published(amazon_hit, production=production)
             self.save()
             return True
 
+    @classmethod
+    def bulk_publish_to_mturk(cls, hits, *, production=False, progress=None) -> list["HIT"]:
+        """Publishes many (ie, cloned) HITs at once, calling create_hit concurrently, with calls started at most
+        MTURK_CREATE_HIT_RATE per second. The external question is rendered once, and qualification requirements built
+        once per distinct configuration. Saves all the HITs in one bulk update, and returns the ones that failed, with
+        their errors in publish_api_exception. progress(num_done, total) is called as each HIT is done."""
+        client = get_mturk_client(production=production)
+        question = cls.render_external_question()
+        qualifications_by_key = {}
+        all_kwargs = []
+        for hit in hits:
+            key = hit.get_qualifications_key()
+            if key not in qualifications_by_key:
+                qualifications_by_key[key] = hit.get_qualification_requirements(production=production)
+            all_kwargs.append(
+                hit.get_create_hit_kwargs(
+                    production=production, question=question, qualifications=qualifications_by_key[key]
+                )
+            )
+
+        started_at = time.monotonic()
+
+        def publish(num, hit, kwargs):
+            # Throttled by spacing out start times, in order
+            time.sleep(max(started_at + num / settings.MTURK_CREATE_HIT_RATE - time.monotonic(), 0))
+            try:
+                hit.set_published(cls.create_hit(client, kwargs), production=production)
+            except Exception:
+                hit.publish_api_exception = traceback.format_exc()
+                logger.exception(
+                    f"Error ocurred while publishing {hit.name} to {'Production' if production else 'the Sandbox'}"
+                )
+                return False
+            return True
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=settings.MTURK_PUBLISH_MAX_WORKERS, thread_name_prefix="publish") as pool:
+            futures = {
+                pool.submit(publish, num, hit, kwargs): hit for num, (hit, kwargs) in enumerate(zip(hits, all_kwargs))
+            }
+            for num_done, future in enumerate(as_completed(futures), 1):
+                if not future.result():
+                    failed.append(futures[future])
+                if progress is not None:
+                    progress(num_done, len(hits))
+
+        for hit in hits:
+            # As save() would
+            hit.name = hit.name.removeprefix(cls.CLONE_PREFIX)
+        cls.objects.bulk_update(
+            hits, ("name", "submitted_at", "amazon_id", "status", "publish_api_exception"), batch_size=500
+        )
+        for hit in hits:
+            transaction.on_commit(hit.clear_cache)
+        return failed
+
+    def expire_on_mturk(self):
+        client = get_mturk_client(production=self.is_production)
+        # A time in the past expires it immediately. Workers who already accepted it can still submit.
+        client.update_expiration_for_hit(
+            HITId=self.amazon_id, ExpireAt=datetime.datetime(2015, 1, 1, tzinfo=datetime.UTC)
+        )
+        self.expired_at = timezone.now()
+        HIT.objects.filter(id=self.id).update(expired_at=self.expired_at)
+        transaction.on_commit(self.clear_cache)
+
+    def add_assignments_on_mturk(self, num):
+        client = get_mturk_client(production=self.is_production)
+        new_assignment_number = self.assignment_number + num
+        # Unique per total, so a retry of a request that actually went through doesn't add assignments twice
+        token = f"{self.unique_request_token}:{new_assignment_number}"
+        try:
+            client.create_additional_assignments_for_hit(
+                HITId=self.amazon_id, NumberOfAdditionalAssignments=num, UniqueRequestToken=token
+            )
+        except client.exceptions.RequestError as e:
+            if "already" not in str(e).lower():
+                raise
+            logger.warning(f"Assignments were already added to HIT {self.amazon_id} with token {token}")
+        self.assignment_number = new_assignment_number
+        HIT.objects.filter(id=self.id).update(assignment_number=self.assignment_number)
+        transaction.on_commit(self.clear_cache)
+
 
 class WorkerPageLoad(models.Model):
+    # Partitioned by month of created_at in the database (see migration 0017 and ./manage.py partition_page_loads),
+    # so filter on created_at where possible. Indexes can't be added concurrently to partitioned tables.
     created_at = models.DateTimeField("created at", auto_now_add=True, db_index=True)
     worker_amazon_id = models.CharField(
         "worker Amazon ID",
@@ -393,6 +606,10 @@ class WorkerPageLoad(models.Model):
 
     class Meta(BaseAmazonModel.Meta):
         verbose_name = "MTurk worker page load"
+        indexes = (
+            # Admin filter, amp encoded page loads are (mostly) spam
+            models.Index(fields=("-created_at",), condition=Q(had_amp_encoded=True), name="pageload_amp_created"),
+        )
 
 
 class Worker(BaseAmazonModel):
@@ -418,6 +635,13 @@ class Worker(BaseAmazonModel):
     class Meta(BaseAmazonModel.Meta):
         verbose_name = "MTurk worker"
         permissions = (("block_worker", "Can block workers"),)
+        indexes = (
+            # Good and blocked workers are few, these serve admin filters and the page load admin's annotations
+            models.Index(fields=("amazon_id",), condition=Q(is_good_worker=True), name="worker_good_amazon_id"),
+            models.Index(fields=("amazon_id",), condition=Q(blocked=True), name="worker_blocked_amazon_id"),
+            trigram_index("name", "worker_name_trgm"),
+            trigram_index("location", "worker_location_trgm"),
+        )
 
     def __str__(self):
         return f"{self.name} [{self.gender[:1].upper()}]{'(blocked)' if self.blocked else ''}"
@@ -464,14 +688,124 @@ class Worker(BaseAmazonModel):
 
     @classmethod
     def from_api(cls, request, amazon_id):
-        faker = Faker()
-        fake_gender = "male" if faker.boolean() else "female"
+        fake_gender, fake_name = generate_fake_name()
         ip_addr = get_ip_addr(request)
         defaults = {"location": get_location_from_ip_addr(ip_addr), "ip_address": ip_addr}
-        create = {"gender": fake_gender, "name": getattr(faker, f"first_name_{fake_gender}")(), **defaults}
-        obj, _ = Worker.objects.update_or_create(amazon_id=amazon_id, create_defaults=create, defaults=defaults)
+        worker = cls(amazon_id=amazon_id, gender=fake_gender, name=fake_name, **defaults)
+        # Name and gender only get set on creation
+        return upsert(worker, unique_field="amazon_id", update=dict.fromkeys(defaults))
+
+
+class SpamWindow(models.Model):
+    # Page load counters for the current and previous fixed windows, per worker and per IP address, from which
+    # api/spam.py estimates sliding window rates. An UNLOGGED table (see migration 0018), since it's written on every
+    # page load and losing it in a crash only resets the counters.
+    key = models.CharField("key", max_length=MTURK_ID_LENGTH + 16, primary_key=True)
+    window_start = models.DateTimeField("window start")
+    page_loads = models.PositiveIntegerField("page loads", default=0)
+    previous_page_loads = models.PositiveIntegerField("previous page loads", default=0)
+    amp_encoded = models.PositiveIntegerField("amp encoded", default=0)
+    previous_amp_encoded = models.PositiveIntegerField("previous amp encoded", default=0)
+    # Churn, ie a worker cycling through assignments, or an IP address through workers, as the distinct ones seen
+    seen = ArrayField(models.CharField(max_length=MTURK_ID_LENGTH), default=list, blank=True)
+    previous_num_seen = models.PositiveIntegerField("previously seen", default=0)
+
+    class Meta:
+        verbose_name = "spam window"
+
+
+class RateLimitBucket(models.Model):
+    # Token buckets for the HIT API's rate limits (see api/ratelimit.py), per scope and assignment, worker or IP
+    # address. UNLOGGED like SpamWindow (see migration 0019), since losing them in a crash only refills them.
+    key = models.CharField("key", max_length=MTURK_ID_LENGTH + 32, primary_key=True)
+    tokens = models.FloatField("tokens")
+    capacity = models.FloatField("capacity")
+    refill_rate = models.FloatField("refill rate", help_text="Tokens per second.")
+    updated_at = models.DateTimeField("updated at")
+
+    class Meta:
+        verbose_name = "rate limit bucket"
+
+
+class AutoBlock(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        BLOCKED = "blocked", "Blocked"
+        DISMISSED = "dismissed", "Dismissed"
+        FAILED = "failed", "Failed"
 
-        return obj
+    created_at = models.DateTimeField("created at", auto_now_add=True, db_index=True)
+    processed_at = models.DateTimeField("processed at", null=True, blank=True)
+    worker_amazon_id = models.CharField(
+        "worker Amazon ID",
+        max_length=MTURK_ID_LENGTH,
+        unique=True,
+        help_text="Worker identifier as used by the Amazon MTurk API.",
+    )
+    status = ChoicesCharField("status", choices=Status, default=Status.PENDING)
+    score = models.FloatField("spam score")
+    reason = models.CharField("reason", max_length=255, blank=True)
+
+    def __str__(self):
+        return f"{self.worker_amazon_id} ({self.get_status_display().lower()})"
+
+    class Meta:
+        verbose_name = "MTurk worker auto-block"
+        ordering = ("-created_at", "id")
+        get_latest_by = "created_at"
+        indexes = (
+            # The queue itself, which is tiny compared to everything already processed
+            models.Index(fields=("created_at",), condition=Q(status="pending"), name="autoblock_pending_created"),
+        )
+
+
+class Job(models.Model):
+    # A background job queue in Postgres, run by ./manage.py run_jobs (see api/jobs.py for how they're claimed,
+    # retried and recovered, and api/tasks.py for what they run)
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+        CANCELLED = "cancelled", "Cancelled"
+
+    task = models.CharField("task", max_length=64)
+    kwargs = models.JSONField("arguments", default=dict, blank=True)
+    key = models.CharField(
+        "key", max_length=128, blank=True, help_text="At most one queued job per key, to collapse duplicates."
+    )
+    status = ChoicesCharField("status", choices=Status, default=Status.QUEUED)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField("created at", auto_now_add=True, db_index=True)
+    run_after = models.DateTimeField("run after", default=timezone.now)
+    started_at = models.DateTimeField("started at", null=True, blank=True)
+    finished_at = models.DateTimeField("finished at", null=True, blank=True)
+    # Running jobs whose worker hasn't checked in by then are presumed dead, and get retried
+    locked_until = models.DateTimeField("locked until", null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField("attempts", default=0)
+    max_attempts = models.PositiveSmallIntegerField("max attempts", default=1)
+    progress = models.PositiveIntegerField("progress", default=0)
+    progress_total = models.PositiveIntegerField("progress total", null=True, blank=True)
+    result = models.TextField("result", blank=True)
+    error = models.TextField("error", blank=True)
+
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.get_status_display().lower()})"
+
+    class Meta:
+        verbose_name = "background job"
+        ordering = ("-created_at", "id")
+        get_latest_by = "created_at"
+        indexes = (
+            # The queue itself, and running jobs, which are tiny compared to everything already finished
+            models.Index(fields=("run_after", "id"), condition=Q(status="queued"), name="job_queued_run_after"),
+            models.Index(fields=("task",), condition=Q(status="running"), name="job_running_task"),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=("key",), condition=Q(status="queued") & ~Q(key=""), name="job_queued_key_unique"
+            ),
+        )
 
 
 def generate_words_to_pronounce():
@@ -480,9 +814,19 @@ def generate_words_to_pronounce():
 
 class Assignment(BaseAmazonModel):
     PROGRESS_MAX_LENGTH = 256
+    TRANSITION_MAX_ATTEMPTS = 3
+    UPDATE_MAX_ATTEMPTS = 3
 
     class Meta(BaseAmazonModel.Meta):
         verbose_name = "MTurk assignment"
+        indexes = (
+            # Admin filters on HIT and call step, in the admin's ordering
+            models.Index(fields=("hit", "call_step", "-created_at"), name="assignment_hit_step_created"),
+            # Assignments still in progress, a small fraction of all of them once a HIT is done
+            models.Index(
+                fields=("call_step", "-created_at"), condition=~Q(call_step=CALL_STEP_DONE), name="assignment_active"
+            ),
+        )
 
     class CallStep(models.TextChoices):
         # Update HIT.js
@@ -500,6 +844,8 @@ class Assignment(BaseAmazonModel):
     call_started_at = models.DateTimeField("call started at", default=None, null=True, blank=True)
     call_connected_at = models.DateTimeField("call connected at", default=None, null=True, blank=True)
     call_completed_at = models.DateTimeField("call ended time", default=None, null=True, blank=True)
+    # Bumped by every write except progress appends, for optimistic concurrency control (see _cas_update)
+    version = models.PositiveIntegerField(default=0, editable=False)
     user_agent = models.CharField("user agent", max_length=1024, blank=True)
     words_to_pronounce = JSONField(
         schema={
@@ -513,37 +859,167 @@ class Assignment(BaseAmazonModel):
     feedback = models.TextField("additional feedback", default="", blank=True)
     voicemail_duration = models.DurationField("voicemail duration", default=datetime.timedelta(0))
     voicemail_url = models.URLField("voicemail URL", blank=True)
+    voicemail_file = models.FileField(
+        "archived voicemail", upload_to="recordings/", blank=True, help_text="Local copy of the voicemail."
+    )
+    voicemail_speech_ratio = models.FloatField(
+        "voicemail speech ratio",
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="Fraction of the voicemail containing speech (computed after the voicemail is archived).",
+    )
+    voicemail_peak_level = models.FloatField("voicemail peak level (dBFS)", null=True, blank=True)
+    voicemail_effective_duration = models.DurationField(
+        "voicemail effective duration",
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="Amount of the voicemail that contains speech.",
+    )
 
     def __str__(self):
         return f"{self.worker} [HIT: {self.hit}]"
 
-    def append_progress(self, progress: str, backend=True):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending_progress = []
+
+    @classmethod
+    def encode_progress(cls, progress: str, backend=True):
         if backend:
             progress = f"[backend] {progress}"
         zulu_now = datetime.datetime.now(tz=datetime.timezone.utc).strftime(ZULU_STRFTIME)
-        encoded_progress = f"{zulu_now}/{progress}"[: self.PROGRESS_MAX_LENGTH]
-        self.progress = Func(F("progress"), Value(encoded_progress), function="array_append")
-        self.save(update_fields=("progress",))
-        self.refresh_from_db(fields=("progress",))
+        return f"{zulu_now}/{progress}"[: cls.PROGRESS_MAX_LENGTH]
 
-    def save(self, *args, **kwargs):
+    @classmethod
+    def get_progress_append_expression(cls, encoded_progress: list):
+        return Func(
+            F("progress"), Value(encoded_progress, output_field=cls._meta.get_field("progress")), function="array_cat"
+        )
+
+    def append_progress(self, progress: str, backend=True):
+        # Buffered and written by the next save() in the same UPDATE, or in a single UPDATE on commit otherwise
+        self._pending_progress.append(self.encode_progress(progress, backend=backend))
+        if len(self._pending_progress) == 1:
+            transaction.on_commit(self.flush_progress)  # Runs immediately if not in a transaction
+
+    def flush_progress(self):
+        if self._pending_progress:
+            pending, self._pending_progress = self._pending_progress, []
+            Assignment.objects.filter(id=self.id).update(progress=self.get_progress_append_expression(pending))
+            self.progress = [*self.progress, *pending]
+
+    @cached_property
+    def cached_hit(self) -> HIT:
+        # Read only! Avoids lazily loading the HIT from the database on every webhook.
+        if Assignment.hit.is_cached(self):  # Already loaded, ie via select_related()
+            return self.hit
+        return HIT.get_cached(id=self.hit_id)
+
+    def update_call_timestamps(self) -> set:
+        # Call timestamps follow call_step (see api.call_steps). Returns the names of the fields that changed.
+        now = timezone.now()
+        changed = {}
         # Reset call when state set to INITIAL
         if self.call_step == self.CallStep.INITIAL:
-            self.call_started_at = None
-        # Start call when call_step moved from INITIAL to anything else
-        elif self.call_started_at is None:
-            self.call_started_at = timezone.now()
-
-        if (
-            self.call_step in (self.CallStep.VOICEMAIL, self.CallStep.CALL, self.CallStep.DONE)
-            and self.call_connected_at is None
-        ):
-            self.call_connected_at = timezone.now()
+            if self.call_started_at is not None:
+                changed["call_started_at"] = None
+        else:
+            changed.update((field, now) for field in TIMESTAMPS[self.call_step] if getattr(self, field) is None)
+
+        for field, value in changed.items():
+            setattr(self, field, value)
+        return set(changed)
+
+    def transition(self, call_step, *, update_fields=(), conditional=False) -> bool:
+        # Moves to call_step if the call step state machine allows it, recording it in progress and only saving what
+        # changed: call_step, call timestamps, progress and update_fields. Conditional transitions don't need the row
+        # to be locked (see _cas_update). If the call step changed under us, it's reloaded and tried from there.
+        for _ in range(self.TRANSITION_MAX_ATTEMPTS if conditional else 1):
+            from_step = self.call_step
+            if not is_valid_transition(from_step, call_step):
+                logger.warning(f"Ignoring invalid call step transition {from_step} > {call_step} for {self.amazon_id}")
+                self.append_progress(f"invalid call step {from_step} > {call_step} ignored")
+                return False
+
+            if not conditional:
+                if call_step != from_step:
+                    self.append_progress(f"call step {from_step} > {call_step}")
+                    self.call_step = call_step
+                    update_fields = {*update_fields, "call_step"}
+                self.save(update_fields=update_fields)
+                return True
+
+            now = timezone.now()
+            values = {field: getattr(self, field) for field in update_fields}
+            values["call_step"] = call_step
+            timestamps = TRANSITIONS[from_step, call_step]
+            values.update((field, Coalesce(field, Value(now))) for field in timestamps)
+            progress = [self.encode_progress(f"call step {from_step} > {call_step}")] if call_step != from_step else []
+            if self._cas_update(values, depends_on=("call_step",), progress=progress):
+                self.call_step = call_step
+                for field in timestamps:
+                    if getattr(self, field) is None:
+                        setattr(self, field, now)
+                return True
+            self.refresh_from_db(fields=("call_step", "version", *TIMESTAMP_FIELDS))
+
+        logger.warning(f"Gave up on call step transition to {call_step} for {self.amazon_id}, it kept changing")
+        return False
+
+    def merge_update(self, **values) -> bool:
+        # Writes values (and buffered progress) without locking the row, on top of concurrent writes to other fields
+        for field, value in values.items():
+            setattr(self, field, value)
+        if not self._cas_update(values):
+            logger.warning(f"Gave up updating {', '.join(values)} for {self.amazon_id}, the row kept changing")
+            return False
+        return True
+
+    def _cas_update(self, values, *, depends_on=(), progress=()) -> bool:
+        # UPDATE ... WHERE version = <version>, ie compare-and-swap. If another write got there first but didn't change
+        # any of the fields in depends_on (what values were computed from), the two don't conflict. Retry on top of it.
+        progress = [*self._pending_progress, *progress]
+        if progress:
+            values = {**values, "progress": self.get_progress_append_expression(progress)}
+        for _ in range(self.UPDATE_MAX_ATTEMPTS):
+            if Assignment.objects.filter(id=self.id, version=self.version).update(**values, version=F("version") + 1):
+                self.version += 1
+                self.progress, self._pending_progress = [*self.progress, *progress], []
+                return True
+            current = Assignment.objects.filter(id=self.id).values("version", *depends_on).get()
+            if any(current[field] != getattr(self, field) for field in depends_on):
+                return False
+            self.version = current["version"]
+        return False
 
-        if self.call_step == self.CallStep.DONE and self.call_completed_at is None:
-            self.call_completed_at = timezone.now()
+    def save(self, *args, **kwargs):
+        changed_timestamps = self.update_call_timestamps()
 
-        super().save(*args, **kwargs)
+        pending, self._pending_progress = self._pending_progress, []
+        if self._state.adding:
+            self.progress = [*self.progress, *pending]
+            super().save(*args, **kwargs)
+            return
+
+        # Never write back the whole progress array (it may be stale if the row wasn't locked), only append to it
+        update_fields = kwargs.pop("update_fields", None)
+        if update_fields is None:
+            update_fields = {field.name for field in self._meta.concrete_fields if not field.primary_key}
+        update_fields = (set(update_fields) | changed_timestamps) - {"progress", "version"}
+        progress, version = self.progress, self.version
+        if update_fields:  # Progress appends don't conflict with anything, so they don't bump it
+            self.version = F("version") + 1
+            update_fields.add("version")
+        if pending:
+            self.progress = self.get_progress_append_expression(pending)
+            update_fields.add("progress")
+        try:
+            super().save(*args, update_fields=update_fields, **kwargs)
+        finally:
+            self.progress = [*progress, *pending]
+            self.version = version + 1 if "version" in update_fields else version
 
     @admin.display(description="Call duration")
     def get_call_duration(self):
@@ -568,23 +1044,64 @@ class Assignment(BaseAmazonModel):
 
     @classmethod
     def from_api(cls, amazon_id, hit, worker, user_agent, reset_to_initial=False):
-        defaults = {
-            "call_started_at": None,
-            "hit": hit,
-            "words_to_pronounce": generate_words_to_pronounce(),
-            "worker": worker,
-            "user_agent": user_agent,
-        }
+        assignment = cls(
+            amazon_id=amazon_id,
+            hit=hit,
+            worker=worker,
+            user_agent=user_agent,
+            words_to_pronounce=generate_words_to_pronounce(),
+        )
+        update = dict.fromkeys(("hit", "worker", "user_agent", "words_to_pronounce"))
+        update["version"] = f"{cls._meta.db_table}.version + 1"
         if reset_to_initial:
-            defaults.update({
-                "call_step": cls.CallStep.INITIAL,
-                "call_started_at": None,
-                "call_completed_at": None,
-                "call_connected_at": None,
-                "progress": [],
-            })
-        obj, _ = cls.objects.update_or_create(amazon_id=amazon_id, defaults=defaults)
-        return obj
+            # Reset to the values of a brand new assignment
+            update.update(
+                dict.fromkeys(("call_step", "call_started_at", "call_completed_at", "call_connected_at", "progress"))
+            )
+        else:
+            # Same as save(), which restarts a call's start time on every handshake
+            update["call_started_at"] = (
+                f"CASE WHEN {cls._meta.db_table}.call_step = '{CALL_STEP_INITIAL}' THEN NULL ELSE now() END"
+            )
+        return upsert(assignment, unique_field="amazon_id", update=update)
+
+
+class HostAvailability(models.Model):
+    # What's known of the SIP host's availability from HIT calls' answer and busy events, to pace the hold queue (see
+    # api/holdqueue.py). UNLOGGED like SpamWindow (see migration 0022), since it's only ever about right now.
+    host = models.CharField("SIP host", max_length=255, unique=True)
+    on_call_since = models.DateTimeField("on a call since", null=True, blank=True)
+    available_at = models.DateTimeField("available since", null=True, blank=True)
+    last_answered_at = models.DateTimeField("last answered at", null=True, blank=True)
+    last_busy_at = models.DateTimeField("last busy at", null=True, blank=True)
+    num_answered = models.PositiveIntegerField("answered calls", default=0)
+    num_busy = models.PositiveIntegerField("busy or unanswered calls", default=0)
+    # In call queue mode, the host's call taking callers from the queue (see api/apis/twilio/mturk.py)
+    call_sid = models.CharField("call SID", max_length=64, blank=True)
+    rung_at = models.DateTimeField("rung at", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "host availability"
+        verbose_name_plural = "host availability"
+
+
+class HoldQueueEntry(models.Model):
+    # Assignments waiting for the host, first come first served (see api/holdqueue.py). UNLOGGED like HostAvailability.
+    assignment = models.OneToOneField(Assignment, on_delete=models.CASCADE, primary_key=True)
+    queued_at = models.DateTimeField("queued at", default=timezone.now, db_index=True)
+    dialed_at = models.DateTimeField("last dialed at", null=True, blank=True)
+    seen_at = models.DateTimeField(
+        "last seen at",
+        default=timezone.now,
+        help_text="When the worker last started a hold loop or dialed the host, to tell when they've hung up.",
+    )
+    # In call queue mode, the worker's call waiting in the queue
+    call_sid = models.CharField("call SID", max_length=64, blank=True, db_index=True)
+
+    class Meta:
+        verbose_name = "hold queue entry"
+        verbose_name_plural = "hold queue entries"
+        ordering = ("queued_at", "assignment_id")
 
 
 class BaseCallModel(models.Model):
@@ -608,6 +1125,13 @@ class Topic(BaseCallModel):
             ' current topic is:"'
         ),
     )
+    processed_recording = models.FileField(
+        "processed recording",
+        upload_to="topics/processed/",
+        blank=True,
+        editable=False,
+        help_text="Loudness normalized and silence trimmed version of the recording, as played to callers.",
+    )
 
     class Meta(BaseCallModel.Meta):
         verbose_name = "phone call topic"
@@ -617,9 +1141,27 @@ class Topic(BaseCallModel):
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
+        try:
+            self.process_recording()
+        except Exception:
+            logger.exception(f"Error processing recording for topic {self.name}, falling back to raw recording")
         if self.is_active:
             Topic.objects.update(is_active=Q(id=self.id))
 
+    def process_recording(self):
+        with self.recording.open("rb") as file:
+            data = file.read()
+        name = f"topics/processed/{get_content_hash(data)}.mp3"  # Content hashed, so unchanged files are skipped
+        if self.processed_recording.name != name:
+            if not default_storage.exists(name):
+                name = default_storage.save(name, ContentFile(encode_sound(data)))
+            self.processed_recording.name = name
+            Topic.objects.filter(id=self.id).update(processed_recording=name)
+
+    @property
+    def recording_url(self):
+        return (self.processed_recording or self.recording).url
+
     @classmethod
     def get_active(cls):
         return cls.objects.filter(is_active=True).order_by("created_by").last()
@@ -633,6 +1175,7 @@ class Caller(BaseCallModel):
 
     class Meta(BaseCallModel.Meta):
         verbose_name = "phone caller"
+        indexes = (trigram_index("name", "caller_name_trgm"), trigram_index("location", "caller_location_trgm"))
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
@@ -663,6 +1206,24 @@ class RecordingBase(BaseCallModel):
     caller = models.ForeignKey(Caller, on_delete=models.SET_NULL, null=True, blank=True)
     duration = models.DurationField("duration", default=datetime.timedelta(0))
     url = models.URLField("URL")
+    file = models.FileField(
+        "archived file", upload_to="recordings/", blank=True, help_text="Local copy of the recording."
+    )
+    speech_ratio = models.FloatField(
+        "speech ratio",
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="Fraction of the recording containing speech (computed after the recording is archived).",
+    )
+    peak_level = models.FloatField("peak level (dBFS)", null=True, blank=True)
+    effective_duration = models.DurationField(
+        "effective duration",
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="Amount of the recording that contains speech.",
+    )
 
     def __str__(self):
         name = self._meta.verbose_name.removeprefix("phone ").capitalize()
@@ -0,0 +1,137 @@
+import datetime
+import gzip
+import logging
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+from .models import WorkerPageLoad
+
+
+logger = logging.getLogger(f"calls.{__name__}")
+
+ARCHIVE_DIR = "page_loads"
+# Partitions are created this many months ahead, so inserts never land in the default partition
+MONTHS_AHEAD = 3
+# Monthly partitions of range partitioned tables (see migration 0017), named {table}_pYYYY_MM, in UTC
+PARTITIONED_MODELS = {WorkerPageLoad: "created_at"}
+PARTITION_SUFFIX_FORMAT = "_p%Y_%m"
+# Partitions detached to be archived are renamed with this, until they're exported and dropped
+ARCHIVING_SUFFIX = "_archiving"
+
+
+def get_month(dt, months=0) -> datetime.datetime:
+    # Start of the month (in UTC) that dt is in, offset by a number of months
+    dt = dt.astimezone(datetime.UTC)
+    month = dt.year * 12 + dt.month - 1 + months
+    return datetime.datetime(month // 12, month % 12 + 1, 1, tzinfo=datetime.UTC)
+
+
+def get_partition_name(model, month) -> str:
+    return f"{model._meta.db_table}{month.strftime(PARTITION_SUFFIX_FORMAT)}"
+
+
+def get_partitions(model, *, archiving=False) -> dict:
+    # Maps month => partition name, excluding the default partition. Or with archiving, partitions that were detached
+    # to be archived, but weren't (see archive_partition).
+    with connection.cursor() as cursor:
+        if archiving:
+            cursor.execute(
+                "SELECT relname FROM pg_class WHERE relkind = 'r' AND relname LIKE %s",
+                [f"{model._meta.db_table}_p%{ARCHIVING_SUFFIX}"],
+            )
+        else:
+            cursor.execute(
+                "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = %s::regclass",
+                [model._meta.db_table],
+            )
+        names = [name for (name,) in cursor.fetchall()]
+    partitions = {}
+    for name in names:
+        try:
+            suffix = name.removeprefix(model._meta.db_table).removesuffix(ARCHIVING_SUFFIX)
+            month = datetime.datetime.strptime(suffix, PARTITION_SUFFIX_FORMAT)
+        except ValueError:
+            continue
+        partitions[month.replace(tzinfo=datetime.UTC)] = name
+    return partitions
+
+
+@transaction.atomic
+def create_partition(model, month):
+    table, name = model._meta.db_table, get_partition_name(model, month)
+    column = PARTITIONED_MODELS[model]
+    bounds = (month, get_month(month, 1))
+    with connection.cursor() as cursor:
+        # Attaching a partition fails if the default partition has rows in its range, so move them over first
+        cursor.execute(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM "{table}_default" WHERE "{column}" >= %s AND "{column}" < %s RETURNING *)'
+            f' INSERT INTO "{name}" SELECT * FROM moved',
+            bounds,
+        )
+        num_moved = cursor.rowcount
+        cursor.execute(f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)', bounds)
+    logger.info(f"Created partition {name}{f' (moved {num_moved} rows from default partition)' if num_moved else ''}")
+    return name
+
+
+def archive_partition(model, month, *, keep=False):
+    # Detaches a partition, and unless keeping it (as a standalone table), saves it as a gzipped CSV and drops it
+    table, name = model._meta.db_table, get_partition_name(model, month)
+    archive_name, archiving_name = f"{ARCHIVE_DIR}/{name}.csv.gz", f"{name}{ARCHIVING_SUFFIX}"
+    if month in get_partitions(model):
+        # DETACH locks the whole table (blocking page load inserts), so commit it right away, rather than holding the
+        # lock through the export. If the export fails, the renamed table is archived on the next run.
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"')
+            if not keep:
+                cursor.execute(f'ALTER TABLE "{name}" RENAME TO "{archiving_name}"')
+    if keep:
+        logger.info(f"Detached partition {name}")
+        return None
+
+    with connection.cursor() as cursor:
+        with tempfile.TemporaryFile() as tmp:
+            with (
+                gzip.open(tmp, "wb") as gz,
+                cursor.copy(f'COPY "{archiving_name}" TO STDOUT WITH (FORMAT csv, HEADER)') as copy,
+            ):
+                for data in copy:
+                    gz.write(data)
+            tmp.seek(0)
+            # Overwrite anything left behind by an earlier attempt that failed
+            if default_storage.exists(archive_name):
+                default_storage.delete(archive_name)
+            archive_name = default_storage.save(archive_name, File(tmp))
+
+        # Only once it's safely stored
+        cursor.execute(f'DROP TABLE "{archiving_name}"')
+    logger.info(f"Archived partition {name} to {archive_name}")
+    return archive_name
+
+
+def maintain_partitions(*, months_ahead, retention_months, keep=False, dry_run=False, now=None):
+    # Creates partitions from this month through months_ahead months from now, and archives (or detaches) ones
+    # entirely older than retention_months. Returns lists of partitions created and archived.
+    now = now or datetime.datetime.now(datetime.UTC)
+    created, archived = [], []
+    for model in PARTITIONED_MODELS:
+        partitions = get_partitions(model)
+        for months in range(months_ahead + 1):
+            month = get_month(now, months)
+            if month not in partitions:
+                created.append(get_partition_name(model, month) if dry_run else create_partition(model, month))
+
+        if retention_months is not None:
+            cutoff = get_month(now, -retention_months)
+            if not keep:
+                partitions.update(get_partitions(model, archiving=True))
+            for month, name in sorted(partitions.items()):
+                if month < cutoff:
+                    if not dry_run:
+                        archive_partition(model, month, keep=keep)
+                    archived.append(name)
+    return created, archived
@@ -0,0 +1,115 @@
+import functools
+import logging
+import random
+
+from django.conf import settings
+from django.db import connection
+
+from ninja.errors import HttpError
+
+from .models import RateLimitBucket
+from .utils import get_ip_addr
+
+
+logger = logging.getLogger(f"calls.{__name__}")
+
+# scope => kind of key => (bucket capacity, tokens refilled per second). Each scope has its own buckets, so a flood of
+# progress logging can't starve a worker's finalize. IP addresses get more, since workers can share them (ie, NAT).
+RATE_LIMITS = {
+    "handshake": {"assignment": (10, 0.1), "worker": (20, 0.2), "ip": (60, 1)},
+    "progress": {"assignment": (30, 1), "ip": (120, 4)},
+    "default": {"assignment": (20, 0.5), "ip": (60, 1)},
+}
+# Buckets untouched for this long have refilled completely, so are the same as no bucket at all
+EXPIRE_AFTER_SECONDS = max(capacity / rate for limits in RATE_LIMITS.values() for capacity, rate in limits.values())
+# Clear out expired buckets on roughly one request in this many, rather than needing a cron job
+EXPIRE_ONE_IN = 1000
+
+BUCKETS_SQL = f"""
+INSERT INTO {RateLimitBucket._meta.db_table} AS b (key, tokens, capacity, refill_rate, updated_at)
+VALUES {{values}}
+ON CONFLICT (key) DO UPDATE SET
+    tokens = least(EXCLUDED.capacity, b.tokens + extract(epoch FROM EXCLUDED.updated_at - b.updated_at)
+        * EXCLUDED.refill_rate) - 1,
+    capacity = EXCLUDED.capacity,
+    refill_rate = EXCLUDED.refill_rate,
+    updated_at = EXCLUDED.updated_at
+WHERE least(EXCLUDED.capacity, b.tokens + extract(epoch FROM EXCLUDED.updated_at - b.updated_at)
+    * EXCLUDED.refill_rate) >= 1
+RETURNING key, {{active_queries}}
+"""
+# Only read when shedding is possible, still in the same round-trip
+ACTIVE_QUERIES_SQL = "(SELECT count(*) FROM pg_stat_activity WHERE state = 'active' AND datname = current_database())"
+
+
+class RateLimited(HttpError):
+    def __init__(self, status_code, message, *, retry_after):
+        super().__init__(status_code, message)
+        self.retry_after = retry_after
+
+
+def get_buckets_sql(scope, *, assignment_id=None, worker_id=None, ip_addr=None, sheddable=False):
+    # SQL, params and bucket keys for take_tokens(), below
+    limits = RATE_LIMITS[scope]
+    values, params, keys = [], [], {}
+    for kind, value in (("assignment", assignment_id), ("worker", worker_id), ("ip", ip_addr)):
+        if value and kind in limits:
+            capacity, refill_rate = limits[kind]
+            key = f"{scope}:{kind}:{value}"
+            keys[key] = kind
+            values.append("(%s, %s, %s, %s, now())")
+            params.extend((key, capacity - 1, capacity, refill_rate))
+    sql = BUCKETS_SQL.format(
+        values=", ".join(values), active_queries=ACTIVE_QUERIES_SQL if sheddable else "NULL::bigint"
+    )
+    return sql, params, keys
+
+
+def take_tokens(scope, *, assignment_id=None, worker_id=None, ip_addr=None, sheddable=False):
+    """Takes a token from each of a request's buckets, in one round-trip. Raises RateLimited if any of them are empty,
+    or if the request is sheddable and the database is saturated."""
+    sql, params, keys = get_buckets_sql(
+        scope, assignment_id=assignment_id, worker_id=worker_id, ip_addr=ip_addr, sheddable=sheddable
+    )
+    if not keys:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        results = cursor.fetchall()
+        if random.randrange(EXPIRE_ONE_IN) == 0:
+            cursor.execute(
+                f"DELETE FROM {RateLimitBucket._meta.db_table} WHERE updated_at < now() - make_interval(secs => %s)",
+                (EXPIRE_AFTER_SECONDS,),
+            )
+
+    if empty := set(keys) - {key for key, _ in results}:
+        retry_after = max(1 / RATE_LIMITS[scope][keys[key]][1] for key in empty)
+        logger.warning(f"Rate limited {scope} request: {', '.join(sorted(empty))}")
+        raise RateLimited(429, "Too many requests!", retry_after=retry_after)
+
+    max_active_queries = settings.HIT_API_SHED_ACTIVE_QUERIES
+    if sheddable and max_active_queries and (active_queries := results[0][1]) >= max_active_queries:
+        logger.warning(f"Shed {scope} request with {active_queries} active queries")
+        raise RateLimited(503, "Server busy, try again later!", retry_after=1)
+
+
+def rate_limited(scope="default", *, sheddable=False):
+    """Rate limits a HIT API view by the assignment and worker IDs in its payload, and the client's IP address, before
+    it touches the database. Sheddable views are also rejected when the database is saturated, leaving capacity for
+    the ones that matter (ie, Twilio's webhooks)."""
+
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def view(request, *args, **kwargs):
+            ids = {}
+            for payload in kwargs.values():
+                for field in ("assignment_id", "worker_id"):
+                    if (value := getattr(payload, field, None)) is not None:
+                        ids.setdefault(field, value)
+            take_tokens(scope, **ids, ip_addr=get_ip_addr(request), sheddable=sheddable)
+            return view_func(request, *args, **kwargs)
+
+        return view
+
+    return decorator
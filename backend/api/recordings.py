@@ -0,0 +1,104 @@
+import base64
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+import hashlib
+import logging
+import subprocess
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+from .audio import analyze_audio
+from .models import Assignment, CallRecording, Voicemail
+
+
+logger = logging.getLogger(f"calls.{__name__}")
+
+ARCHIVE_DIR = "recordings"
+ARCHIVE_EXTENSION = "opus"
+DOWNLOAD_TIMEOUT = 60
+# Speech only, so mono 24kbps Opus is plenty (~180KB/minute vs ~960KB/minute for Twilio's WAVs)
+FFMPEG_OPUS_ARGS = ("-ac", "1", "-c:a", "libopus", "-b:a", "24k", "-application", "voip", "-f", "ogg")
+# Models with recordings and the prefix of their recording fields ({prefix}url, {prefix}file, etc)
+RECORDING_MODELS = ((Voicemail, ""), (CallRecording, ""), (Assignment, "voicemail_"))
+ANALYSIS_FIELDS = ("speech_ratio", "peak_level", "effective_duration")
+
+
+@cache
+def get_executor():
+    # Created lazily so threads are only ever started in gunicorn workers, never in the (preloaded) arbiter
+    return ThreadPoolExecutor(max_workers=settings.RECORDING_ARCHIVE_MAX_WORKERS, thread_name_prefix="archive")
+
+
+def download_recording(url) -> bytes:
+    # Recording URLs may require HTTP basic auth, depending on the Twilio account's settings
+    credentials = base64.b64encode(f"{settings.TWILIO_ACCOUNT_SID}:{settings.TWILIO_AUTH_TOKEN}".encode()).decode()
+    request = Request(url, headers={"Authorization": f"Basic {credentials}"})
+    with urlopen(request, timeout=DOWNLOAD_TIMEOUT) as response:
+        return response.read()
+
+
+def read_recording(url, file_name=None) -> bytes:
+    if file_name:
+        with default_storage.open(file_name, "rb") as file:
+            return file.read()
+    return download_recording(url)
+
+
+def transcode_to_opus(data: bytes) -> bytes:
+    process = subprocess.run(
+        ("ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0", *FFMPEG_OPUS_ARGS, "pipe:1"),
+        input=data,
+        capture_output=True,
+        check=True,
+    )
+    return process.stdout
+
+
+def store_archive(data: bytes) -> str:
+    # Content addressed, so files are never overwritten and can be cached forever
+    digest = hashlib.sha256(data).hexdigest()
+    name = f"{ARCHIVE_DIR}/{digest[:2]}/{digest}.{ARCHIVE_EXTENSION}"
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(data))
+    return name
+
+
+def save_analysis(model, pk, url, analysis: dict, *, prefix=""):
+    update = {f"{prefix}{field}": analysis[field] for field in ANALYSIS_FIELDS}
+    return model.objects.filter(pk=pk, **{f"{prefix}url": url}).update(**update)
+
+
+def archive_recording(model, pk, *, prefix="", analyze=True):
+    url = model.objects.filter(pk=pk).values_list(f"{prefix}url", flat=True).first()
+    if not url:
+        logger.warning(f"No recording URL for {model._meta.model_name} {pk}, skipping archival")
+        return None
+
+    data = transcode_to_opus(download_recording(url))
+    name = store_archive(data)
+    # Only update if the URL hasn't changed under us (ie, a voicemail was re-recorded)
+    updated = model.objects.filter(pk=pk, **{f"{prefix}url": url}).update(**{f"{prefix}file": name})
+    logger.info(f"Archived {model._meta.model_name} {pk} recording {url} to {name}{'' if updated else ' (stale)'}")
+
+    if analyze and updated:
+        save_analysis(model, pk, url, analyze_audio(data), prefix=prefix)
+    return name
+
+
+def _archive_recording_in_thread(model, pk, **kwargs):
+    try:
+        archive_recording(model, pk, **kwargs)
+    except Exception:
+        logger.exception(f"Error archiving {model._meta.model_name} {pk} recording")
+    finally:
+        connection.close()  # Threads get their own connection, don't leak it
+
+
+def schedule_recording_archive(obj, *, prefix=""):
+    # Wait for commit so the thread sees the new URL
+    model, pk = type(obj), obj.pk
+    transaction.on_commit(lambda: get_executor().submit(_archive_recording_in_thread, model, pk, prefix=prefix))
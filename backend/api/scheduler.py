@@ -0,0 +1,135 @@
+import datetime
+import logging
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .jobs import enqueue
+from .models import HIT, Assignment, Job
+
+
+logger = logging.getLogger(f"calls.{__name__}")
+
+# Only the process holding this (session level) advisory lock runs the scheduler, see ./manage.py run_scheduler
+LOCK_NAME = "scheduler"
+# HITs that fail to publish at their time are retried every tick for this long, then left to be published manually
+PUBLISH_RETRY_FOR = datetime.timedelta(minutes=10)
+# Running HITs keep enough free assignments for as many calls as completed in the last this long
+TOP_UP_WINDOW = datetime.timedelta(minutes=15)
+# MTurk won't top up a HIT created with fewer than 10 assignments to 10 or more
+SMALL_HIT_MAX_ASSIGNMENTS = 9
+# Page load partitions are created ahead and archived this often, as a background job (see api/partitions.py)
+PARTITION_MAINTENANCE_INTERVAL = datetime.timedelta(days=1)
+
+
+def try_lock() -> bool:
+    """Tries to become the leader. Returns True if this connection now holds the lock, which it does until it closes."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (LOCK_NAME,))
+        return cursor.fetchone()[0]
+
+
+def publish_due_hits() -> int:
+    """Publishes unpublished HITs whose publish_at time has come. Returns the number published."""
+    now = timezone.now()
+    num_published = 0
+    for production in (False, True):
+        hits = list(
+            HIT.objects.filter(status=HIT.Status.LOCAL, publish_at__lte=now, publish_to_production=production).order_by(
+                "publish_at", "id"
+            )
+        )
+        if not hits:
+            continue
+        environment = "Production" if production else "the Sandbox"
+
+        if production and not settings.ALLOW_MTURK_PRODUCTION_ACCESS:
+            logger.warning(f"Not publishing {len(hits)} scheduled HIT(s) to Production, since access is disabled")
+            HIT.objects.filter(id__in=[hit.id for hit in hits]).update(
+                publish_at=None, publish_api_exception="Production access is disabled (ALLOW_MTURK_PRODUCTION_ACCESS)"
+            )
+            continue
+
+        failed = HIT.bulk_publish_to_mturk(hits, production=production)
+        num_published += len(hits) - len(failed)
+        logger.info(f"Published {len(hits) - len(failed)} of {len(hits)} scheduled HIT(s) to {environment}")
+        if given_up := [hit for hit in failed if hit.publish_at < now - PUBLISH_RETRY_FOR]:
+            logger.error(f"Gave up publishing HIT(s) to {environment}: {', '.join(hit.name for hit in given_up)}")
+            HIT.objects.filter(id__in=[hit.id for hit in given_up]).update(publish_at=None)
+    return num_published
+
+
+def expire_ended_hits() -> int:
+    """Expires running HITs on MTurk whose show has ended. Returns the number expired."""
+    num_expired = 0
+    for hit in HIT.get_running().filter(show_ends_at__lte=timezone.now()):
+        try:
+            hit.expire_on_mturk()
+        except Exception:
+            # Tried again next tick
+            logger.exception(f"Error expiring HIT {hit.amazon_id}")
+        else:
+            logger.info(f"Expired HIT {hit.name} ({hit.amazon_id}), since its show ended at {hit.show_ends_at}")
+            num_expired += 1
+    return num_expired
+
+
+def get_num_assignments_to_add(hit: HIT) -> int:
+    """Number of assignments to add to a running HIT so it has enough free for the rate calls are completing at."""
+    now = timezone.now()
+    counts = Assignment.objects.filter(hit=hit).aggregate(
+        done=Count("id", filter=Q(call_step=Assignment.CallStep.DONE)),
+        recently_done=Count(
+            "id", filter=Q(call_step=Assignment.CallStep.DONE, call_completed_at__gte=now - TOP_UP_WINDOW)
+        ),
+        # Older ones have run out of time, and if they weren't submitted MTurk has freed up their assignment
+        in_progress=Count(
+            "id", filter=~Q(call_step=Assignment.CallStep.DONE) & Q(created_at__gte=now - hit.assignment_duration)
+        ),
+    )
+    num_free = max(hit.assignment_number - counts["done"] - counts["in_progress"], 0)
+    max_assignment_number = hit.max_assignment_number
+    if hit.assignment_number <= SMALL_HIT_MAX_ASSIGNMENTS:
+        max_assignment_number = min(max_assignment_number, SMALL_HIT_MAX_ASSIGNMENTS)
+    return max(min(counts["recently_done"] - num_free, max_assignment_number - hit.assignment_number), 0)
+
+
+def top_up_hits() -> int:
+    """Adds assignments to running HITs with a max_assignment_number, as their calls complete. Returns the number of
+    assignments added."""
+    num_added = 0
+    hits = (
+        HIT.get_running().filter(max_assignment_number__gt=F("assignment_number"))
+        # No point in new workers showing up right before the show ends
+        .exclude(show_ends_at__lte=timezone.now() + TOP_UP_WINDOW)
+    )
+    for hit in hits:
+        if num := get_num_assignments_to_add(hit):
+            try:
+                hit.add_assignments_on_mturk(num)
+            except Exception:
+                logger.exception(f"Error adding {num} assignment(s) to HIT {hit.amazon_id}")
+            else:
+                logger.info(f"Added {num} assignment(s) to HIT {hit.name}, for {hit.assignment_number} total")
+                num_added += num
+    return num_added
+
+
+def schedule_partition_maintenance() -> bool:
+    """Queues partition maintenance, unless it was queued within the interval. Returns whether it was queued."""
+    if Job.objects.filter(
+        task="maintain_partitions", created_at__gte=timezone.now() - PARTITION_MAINTENANCE_INTERVAL
+    ).exists():
+        return False
+    enqueue("maintain_partitions", key="maintain_partitions")
+    return True
+
+
+def run_scheduler():
+    """One tick of the scheduler. Only to be run by the leader (see try_lock())."""
+    publish_due_hits()
+    expire_ended_hits()
+    top_up_hits()
+    schedule_partition_maintenance()
@@ -0,0 +1,153 @@
+from functools import cache
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import subprocess
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core import checks
+from django.templatetags.static import static
+
+
+logger = logging.getLogger(f"calls.{__name__}")
+
+SOUNDS_STATIC_PREFIX = "api/twilio/sounds/"
+MANIFEST_NAME = "manifest.json"
+# Twilio transcodes everything to 8kHz mono for the phone network, so anything more is wasted bandwidth
+FFMPEG_FILTERS = ",".join((
+    # Trim leading and trailing silence (silenceremove only trims the start, so reverse in between)
+    "silenceremove=start_periods=1:start_threshold=-50dB",
+    "areverse",
+    "silenceremove=start_periods=1:start_threshold=-50dB",
+    "areverse",
+    "loudnorm=I=-16:TP=-1.5:LRA=11",
+))
+FFMPEG_ENCODE_ARGS = (
+    "-af",
+    FFMPEG_FILTERS,
+    *("-ar", "8000", "-ac", "1"),
+    *("-c:a", "libmp3lame", "-b:a", "32k", "-f", "mp3"),
+)
+# Part of the content hash, so changing encoder settings causes a rebuild
+ENCODE_VERSION = hashlib.sha256(" ".join(FFMPEG_ENCODE_ARGS).encode()).hexdigest()[:8]
+
+
+def encode_sound(data: bytes) -> bytes:
+    process = subprocess.run(
+        ("ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0", *FFMPEG_ENCODE_ARGS, "pipe:1"),
+        input=data,
+        capture_output=True,
+        check=True,
+    )
+    return process.stdout
+
+
+def get_content_hash(data: bytes) -> str:
+    return hashlib.sha256(ENCODE_VERSION.encode() + data).hexdigest()[:16]
+
+
+def list_source_sounds():
+    # Yields sound names (ie, "dialed/welcome") and their source paths, as found by the staticfiles finders
+    found = {}
+    for finder in finders.get_finders():
+        for path, storage in finder.list([]):
+            path = path.replace(os.sep, "/")
+            if path.startswith(SOUNDS_STATIC_PREFIX) and path.endswith(".mp3"):
+                name = path.removeprefix(SOUNDS_STATIC_PREFIX).removesuffix(".mp3")
+                found.setdefault(name, Path(storage.path(path)))  # First finder wins, like finders.find()
+    return found
+
+
+def build_sounds(*, force=False):
+    sounds_root = Path(settings.SOUNDS_ROOT)
+    manifest = {}
+    num_built = 0
+
+    for name, source_path in sorted(list_source_sounds().items()):
+        data = source_path.read_bytes()
+        built_name = f"{name}.{get_content_hash(data)}.mp3"
+        built_path = sounds_root / built_name
+        if force or not built_path.exists():
+            logger.info(f"Building sound {name} => {built_name}")
+            built_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = built_path.with_suffix(".tmp")
+            tmp_path.write_bytes(encode_sound(data))
+            tmp_path.replace(built_path)
+            num_built += 1
+        manifest[name] = built_name
+
+    # Atomic replace, since running workers may be reading it
+    sounds_root.mkdir(parents=True, exist_ok=True)
+    tmp_manifest_path = sounds_root / f"{MANIFEST_NAME}.tmp"
+    tmp_manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    tmp_manifest_path.replace(sounds_root / MANIFEST_NAME)
+    get_sound_index.cache_clear()
+    return manifest, num_built
+
+
+def load_manifest() -> dict:
+    try:
+        with open(Path(settings.SOUNDS_ROOT) / MANIFEST_NAME, "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        logger.warning("No sounds manifest found. Run ./manage.py build_sounds! Falling back to unprocessed sounds.")
+    except Exception:
+        logger.exception("Error reading sounds manifest! Falling back to unprocessed sounds.")
+    return {}
+
+
+@cache
+def get_sound_index() -> dict:
+    # Maps sound names to URLs, preferring built sounds. Built once at startup (in ApiConfig.ready) so <Play />
+    # verbs are a dict lookup, rather than walking the staticfiles finders for every sound.
+    manifest = load_manifest()
+    return {
+        name: (
+            f"{settings.SOUNDS_URL}{manifest[name]}"
+            if name in manifest
+            else static(f"{SOUNDS_STATIC_PREFIX}{name}.mp3")
+        )
+        for name in list_source_sounds()
+    }
+
+
+def get_sound_url(name):
+    return get_sound_index().get(name)
+
+
+def get_sound_dirs():
+    dirs = []
+    for finder in finders.get_finders():
+        for storage in getattr(finder, "storages", {}).values():
+            if (path := Path(storage.location) / SOUNDS_STATIC_PREFIX).is_dir():
+                dirs.append(path)
+    return dirs
+
+
+def watch_sounds(sender, **kwargs):
+    # DEBUG only: restart runserver (rebuilding the index) when sounds are added, changed or rebuilt
+    for path in get_sound_dirs():
+        sender.watch_dir(path, "**/*.mp3")
+    sender.watch_dir(Path(settings.SOUNDS_ROOT), MANIFEST_NAME)
+
+
+_required_sounds = set()
+
+
+def require_sounds(*names):
+    _required_sounds.update(names)
+
+
+@checks.register(checks.Tags.files)
+def check_required_sounds(app_configs, **kwargs):
+    from . import apis  # noqa: F401 (Make sure all modules that require sounds are loaded)
+
+    index = get_sound_index()
+    return [
+        checks.Warning(f"Sound {name} not found in {SOUNDS_STATIC_PREFIX}", obj=f"{name}.mp3", id="api.W001")
+        for name in sorted(_required_sounds)
+        if name not in index
+    ]
@@ -0,0 +1,190 @@
+import datetime
+import logging
+
+from django.core.cache import cache as django_cache
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from constance import config
+
+from .jobs import enqueue
+from .models import AutoBlock, SpamWindow, Worker
+from .utils import block_or_unblock_worker
+
+
+logger = logging.getLogger(f"calls.{__name__}")
+
+# Rates are estimated over a sliding window, from counts in the current fixed window and a weighted share of the
+# previous one's, so each worker and IP address is a single row no matter how fast they're loading pages
+WINDOW = datetime.timedelta(minutes=5)
+# A worker's score is the worst of their own and their IP address's. Page loads with &amp; encoded query strings are
+# (almost always) spam, while bursts and churn only count beyond what a real worker plausibly does in a window.
+SCORE_THRESHOLD = 3.0
+# Less for IP addresses, since a real worker can share one (ie, behind NAT) with a spammer, or other real workers
+AMP_ENCODED_WEIGHTS = {"worker": 1.0, "ip": 0.25}
+BURST_WEIGHT = 0.1
+CHURN_WEIGHTS = {"worker": 1.0, "ip": 0.25}
+LIMITS = {
+    # key prefix => (page loads, distinct assignments or workers respectively) in a window
+    "worker": (20, 6),
+    "ip": (60, 4),
+}
+# Distinct assignments or workers stored per window, well past where churn alone scores as spam
+MAX_SEEN = 32
+AUTO_BLOCK_BATCH_SIZE = 100
+ENQUEUED_CACHE_KEY_PREFIX = "auto-block:"
+
+WINDOW_SQL = f"""
+INSERT INTO {SpamWindow._meta.db_table} AS w
+    (key, window_start, page_loads, previous_page_loads, amp_encoded, previous_amp_encoded, seen, previous_num_seen)
+VALUES {{values}}
+ON CONFLICT (key) DO UPDATE SET
+    previous_page_loads = CASE
+        WHEN w.window_start = EXCLUDED.window_start THEN w.previous_page_loads
+        WHEN w.window_start = EXCLUDED.window_start - %(window)s THEN w.page_loads ELSE 0 END,
+    previous_amp_encoded = CASE
+        WHEN w.window_start = EXCLUDED.window_start THEN w.previous_amp_encoded
+        WHEN w.window_start = EXCLUDED.window_start - %(window)s THEN w.amp_encoded ELSE 0 END,
+    previous_num_seen = CASE
+        WHEN w.window_start = EXCLUDED.window_start THEN w.previous_num_seen
+        WHEN w.window_start = EXCLUDED.window_start - %(window)s THEN cardinality(w.seen) ELSE 0 END,
+    page_loads = CASE WHEN w.window_start = EXCLUDED.window_start THEN w.page_loads ELSE 0 END + 1,
+    amp_encoded = CASE WHEN w.window_start = EXCLUDED.window_start THEN w.amp_encoded ELSE 0 END
+        + EXCLUDED.amp_encoded,
+    seen = CASE
+        WHEN w.window_start <> EXCLUDED.window_start THEN EXCLUDED.seen
+        WHEN EXCLUDED.seen <@ w.seen OR cardinality(w.seen) >= %(max_seen)s THEN w.seen
+        ELSE w.seen || EXCLUDED.seen END,
+    window_start = EXCLUDED.window_start
+RETURNING key, page_loads, previous_page_loads, amp_encoded, previous_amp_encoded, cardinality(seen), previous_num_seen
+"""
+
+
+def get_window_start(now) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(
+        now.timestamp() // WINDOW.total_seconds() * WINDOW.total_seconds(), datetime.UTC
+    )
+
+
+def get_score(kind, counts, weight) -> tuple[float, str]:
+    # Sliding window estimates, assuming the previous window's events were spread out evenly
+    page_loads, amp_encoded, num_seen = (current + previous * weight for current, previous in counts)
+    page_load_limit, seen_limit = LIMITS[kind]
+    scores = {
+        "amp encoded": amp_encoded * AMP_ENCODED_WEIGHTS[kind],
+        "burst": max(page_loads - page_load_limit, 0) * BURST_WEIGHT,
+        "churn": max(num_seen - seen_limit, 0) * CHURN_WEIGHTS[kind],
+    }
+    reasons = ", ".join(f"{kind} {reason} {score:.1f}" for reason, score in scores.items() if score > 0)
+    return sum(scores.values()), reasons
+
+
+def get_window_sql(*, window_start, worker_amazon_id, assignment_amazon_id, ip_addr, had_amp_encoded):
+    # SQL and params for record_page_load(), below. Always worker then IP address, so concurrent upserts of the same
+    # rows lock them in the same order.
+    rows = [(f"worker:{worker_amazon_id}", assignment_amazon_id)]
+    if ip_addr:
+        rows.append((f"ip:{ip_addr}", worker_amazon_id))
+    params = {
+        "window": WINDOW,
+        "window_start": window_start,
+        "amp_encoded": int(had_amp_encoded),
+        "max_seen": MAX_SEEN,
+    }
+    values = []
+    for i, (key, value) in enumerate(rows):
+        params.update({f"key{i}": key, f"value{i}": value})
+        values.append(
+            f"(%(key{i})s, %(window_start)s, 1, 0, %(amp_encoded)s, 0,"
+            f" array_remove(ARRAY[%(value{i})s]::varchar[], NULL), 0)"
+        )
+    return WINDOW_SQL.format(values=", ".join(values)), params
+
+
+def record_page_load(*, worker_amazon_id, assignment_amazon_id, ip_addr, had_amp_encoded) -> float:
+    """Counts a page load against the worker's and IP address's sliding windows, in one round-trip, and queues the
+    worker to be blocked if either scores as spam. Returns the worker's spam score."""
+    now = timezone.now()
+    window_start = get_window_start(now)
+    sql, params = get_window_sql(
+        window_start=window_start,
+        worker_amazon_id=worker_amazon_id,
+        assignment_amazon_id=assignment_amazon_id,
+        ip_addr=ip_addr,
+        had_amp_encoded=had_amp_encoded,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        results = cursor.fetchall()
+
+    weight = 1 - (now - window_start) / WINDOW
+    score, reasons = 0.0, []
+    for key, *counts in results:
+        key_score, key_reasons = get_score(key.split(":", 1)[0], zip(counts[::2], counts[1::2]), weight)
+        score = max(score, key_score)
+        if key_score >= SCORE_THRESHOLD:
+            reasons.append(key_reasons)
+
+    # Once per process per window, rather than a write for every page load of a flood
+    if reasons and django_cache.add(f"{ENQUEUED_CACHE_KEY_PREFIX}{worker_amazon_id}", True, WINDOW.total_seconds()):
+        enqueue_auto_block(worker_amazon_id, score=score, reason="; ".join(reasons))
+    return score
+
+
+def enqueue_auto_block(worker_amazon_id, *, score, reason):
+    logger.warning(f"Queuing worker {worker_amazon_id} to be blocked with spam score {score:.1f} ({reason})")
+    # Re-detections only update the score, so dismissed workers stay dismissed
+    AutoBlock.objects.bulk_create(
+        (AutoBlock(worker_amazon_id=worker_amazon_id, score=score, reason=reason),),
+        update_conflicts=True,
+        unique_fields=("worker_amazon_id",),
+        update_fields=("score", "reason"),
+    )
+    if config.AUTO_BLOCK_SPAMMERS:
+        # Keyed, so there's at most one of these queued no matter how many spammers are detected
+        enqueue("process_auto_blocks", key="process_auto_blocks")
+
+
+def process_auto_blocks(queryset=None, *, batch_size=AUTO_BLOCK_BATCH_SIZE) -> dict:
+    """Blocks pending queued workers (or retries the given ones that are pending or failed), in batches, skipping rows
+    another process is working on and dismissing good workers. Returns the number of auto-blocks by resulting status."""
+    if queryset is None:
+        queryset = AutoBlock.objects.filter(status=AutoBlock.Status.PENDING)
+    started_at = timezone.now()
+    # Not rows already processed in this run, since failed ones stay retryable
+    queryset = queryset.filter(
+        Q(processed_at__isnull=True) | Q(processed_at__lt=started_at),
+        status__in=(AutoBlock.Status.PENDING, AutoBlock.Status.FAILED),
+    )
+    num_by_status = dict.fromkeys(AutoBlock.Status.values, 0)
+    while True:
+        with transaction.atomic():
+            auto_blocks = list(queryset.select_for_update(skip_locked=True).order_by("created_at")[:batch_size])
+            if not auto_blocks:
+                break
+
+            worker_ids = [auto_block.worker_amazon_id for auto_block in auto_blocks]
+            good_worker_ids = set(
+                Worker.objects.filter(amazon_id__in=worker_ids, is_good_worker=True).values_list("amazon_id", flat=True)
+            )
+            for auto_block in auto_blocks:
+                if auto_block.worker_amazon_id in good_worker_ids:
+                    auto_block.status = AutoBlock.Status.DISMISSED
+                elif block_or_unblock_worker(auto_block.worker_amazon_id, block=True):
+                    auto_block.status = AutoBlock.Status.BLOCKED
+                else:
+                    auto_block.status = AutoBlock.Status.FAILED
+                auto_block.processed_at = timezone.now()
+                num_by_status[auto_block.status] += 1
+
+            AutoBlock.objects.bulk_update(auto_blocks, ("status", "processed_at"))
+            blocked_ids = [a.worker_amazon_id for a in auto_blocks if a.status == AutoBlock.Status.BLOCKED]
+            Worker.objects.filter(amazon_id__in=blocked_ids).update(blocked=True)
+    return num_by_status
+
+
+def expire_spam_windows() -> int:
+    # Rows that haven't been written to in two windows contribute nothing to the sliding window anymore
+    num_deleted, _ = SpamWindow.objects.filter(window_start__lt=timezone.now() - 2 * WINDOW).delete()
+    return num_deleted
@@ -0,0 +1,117 @@
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import holdqueue, partitions
+from .apis import twilio_mturk_url_for, twilio_phone_url_for
+from .jobs import enqueue, set_progress, task
+from .models import HIT, AutoBlock, Caller, Worker
+from .spam import process_auto_blocks
+from .twilio import twilio_client
+from .utils import block_or_unblock_worker
+
+
+# Tasks that hit the MTurk API one at a time, so bulk admin actions can't get the requester throttled
+
+
+@task(concurrency=1)
+def block_workers(job, *, amazon_ids, block=True):
+    # Like Worker.block() and unblock() for many workers, which don't all need to exist (ie, from page loads)
+    if block:
+        good_worker_ids = set(
+            Worker.objects.filter(amazon_id__in=amazon_ids, is_good_worker=True).values_list("amazon_id", flat=True)
+        )
+        amazon_ids = [amazon_id for amazon_id in amazon_ids if amazon_id not in good_worker_ids]
+
+    set_progress(job, 0, len(amazon_ids))
+    succeeded = []
+    for num, amazon_id in enumerate(amazon_ids, 1):
+        if block_or_unblock_worker(amazon_id, block=block):
+            succeeded.append(amazon_id)
+        set_progress(job, num)
+    Worker.objects.filter(amazon_id__in=succeeded).update(blocked=block)
+    return f"{'Blocked' if block else 'Unblocked'} {len(succeeded)} of {len(amazon_ids)} worker(s)"
+
+
+@task(concurrency=1, max_attempts=3)
+def resync_blocks(job):
+    num_by_status = Worker.resync_blocks()
+    return f"Resynchronized worker blocks: {num_by_status['blocked']} blocked, {num_by_status['unblocked']} unblocked"
+
+
+@task("process_auto_blocks", concurrency=1)
+def auto_block_workers(job, *, auto_block_ids=None):
+    queryset = None if auto_block_ids is None else AutoBlock.objects.filter(id__in=auto_block_ids)
+    num_by_status = process_auto_blocks(queryset)
+    return (
+        f"Blocked {num_by_status[AutoBlock.Status.BLOCKED]} worker(s), dismissed"
+        f" {num_by_status[AutoBlock.Status.DISMISSED]} good worker(s) and failed to block"
+        f" {num_by_status[AutoBlock.Status.FAILED]}"
+    )
+
+
+# Safe to retry, since MTurk won't create a HIT twice with the same UniqueRequestToken
+@task(concurrency=1, max_attempts=3)
+def publish_hit(job, *, hit_id, production=False):
+    hit = HIT.objects.get(id=hit_id)
+    if hit.status != HIT.Status.LOCAL:
+        return f"HIT {hit.name} was already published"
+    hit.publish_to_mturk(production=production)
+    return f"Published {hit.name} to {'Production' if production else 'the Sandbox'}"
+
+
+# Also safe to retry, since HITs that were already created are looked up by their UniqueRequestToken
+@task(concurrency=1, max_attempts=3, timeout=datetime.timedelta(hours=1))
+def publish_hits(job, *, hit_ids, production=False):
+    hits = list(HIT.objects.filter(id__in=hit_ids, status=HIT.Status.LOCAL).order_by("created_at", "id"))
+    failed = HIT.bulk_publish_to_mturk(
+        hits, production=production, progress=lambda num_done, total: set_progress(job, num_done, total)
+    )
+    result = f"Published {len(hits) - len(failed)} HIT(s) to {'Production' if production else 'the Sandbox'}"
+    if failed:
+        raise Exception(f"{result}, but {len(failed)} failed: {', '.join(hit.name for hit in failed)}")
+    return result
+
+
+# Safe to retry, since partitions that were already created or archived are skipped. Queued daily by the scheduler.
+@task(concurrency=1, max_attempts=3, timeout=datetime.timedelta(hours=1))
+def maintain_partitions(job):
+    created, archived = partitions.maintain_partitions(
+        months_ahead=partitions.MONTHS_AHEAD, retention_months=settings.PAGE_LOAD_RETENTION_MONTHS
+    )
+    return f"Created {len(created)} partition(s) and archived {len(archived)}"
+
+
+# Not retried, since a call minutes after someone asked for it would be a surprise
+@task()
+def call_caller(job, *, caller_id):
+    caller = Caller.objects.get(id=caller_id)
+    twilio_client.calls.create(
+        url=twilio_phone_url_for("sip_outgoing_host", called_override=caller.number, domain_name=True),
+        to=f"sip:{settings.TWILIO_SIP_HOST_USERNAME}@{settings.TWILIO_SIP_DOMAIN}",
+        from_=caller.caller_id,
+    )
+    return f'Called "{caller}"'
+
+
+# Not retried either, since it's queued again whenever a worker joins the call queue or the host's call ends
+@task(concurrency=1)
+def ring_host(job):
+    # Rings the host to take callers from the call queue (see api/apis/twilio/mturk.py)
+    if (entry := holdqueue.claim_host_ring()) is None:
+        return "Nobody's waiting, or the host is already taking callers"
+    try:
+        # From the caller at the front of the queue, who's the one they'll (most likely) get
+        call = twilio_client.calls.create(
+            url=twilio_mturk_url_for("hit_queue_host", _external=True),
+            status_callback=twilio_mturk_url_for("hit_queue_host_callback", _external=True),
+            to=f"sip:{settings.TWILIO_SIP_HOST_USERNAME}@{settings.TWILIO_SIP_DOMAIN}",
+            from_=entry.assignment.worker.caller_id,
+        )
+    except Exception:
+        holdqueue.release_host_ring()
+        enqueue("ring_host", key="ring_host", run_after=timezone.now() + holdqueue.RING_HOST_RETRY_AFTER)
+        raise
+    holdqueue.record_host_ring(call.sid)
+    return f"Rang the host for {entry.assignment.worker.name}"
@@ -0,0 +1,73 @@
+import datetime
+from unittest import mock
+
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+
+from .apis.twilio.utils import QueryBudgetExceeded, query_budget
+from .models import HIT, Assignment, HoldQueueEntry, Worker
+
+
+@override_settings(QUERY_BUDGETS=True, HIT_CALL_QUEUE=False)
+@mock.patch("api.middleware.twilio_client", mock.MagicMock())
+@mock.patch("api.apis.twilio.utils.validator.validate", lambda *args: True)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        hit = HIT.objects.create(
+            name="Test",
+            topic="Test",
+            show_host="Test",
+            title="Test",
+            description="Test",
+            keywords="test",
+            status=HIT.Status.SANDBOX,
+            duration=datetime.timedelta(hours=1),
+            assignment_duration=datetime.timedelta(minutes=30),
+            approval_delay=datetime.timedelta(days=2),
+            assignment_number=5,
+            assignment_reward="1.00",
+        )
+        cls.assignments = []
+        for num in range(2):
+            worker = Worker.objects.create(amazon_id=f"WORKER{num}", name=f"Worker {num}")
+            assignment = Assignment.objects.create(
+                hit=hit, worker=worker, amazon_id=f"ASSIGNMENT{num}", words_to_pronounce=["a", "b", "c"]
+            )
+            Assignment.objects.filter(id=assignment.id).update(
+                call_step=Assignment.CallStep.VERIFIED, call_started_at=timezone.now()
+            )
+            cls.assignments.append(assignment)
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST="example.com", HTTP_X_TWILIO_SIGNATURE="test")
+
+    def post(self, assignment, path, **data):
+        response = self.client.post(
+            f"/api/mturk/hit/outgoing/{assignment.id}/{path}", {"CallSid": f"CA{assignment.id}", **data}, secure=True
+        )
+        self.assertIn(response.status_code, (200, 204))
+        return response.content.decode()
+
+    def test_query_budget_raises(self):
+        @query_budget(1)
+        def two_queries():
+            for _ in range(2):
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+
+        with self.assertRaises(QueryBudgetExceeded):
+            two_queries()
+
+    def test_hold_queue_webhooks_within_budget(self):
+        # The test client raises the view's exceptions, including QueryBudgetExceeded
+        first, second = self.assignments
+        self.assertIn("<Dial", self.post(first, "call"))
+        self.post(first, "callback/answered", CallStatus="in-progress", ParentCallSid=f"CA{first.id}")
+        self.assertIn("/hold</Redirect>", self.post(second, "call"))
+        self.assertIn("/hold</Redirect>", self.post(second, "hold"))
+        self.post(first, "callback/answered", CallStatus="completed", ParentCallSid=f"CA{first.id}")
+        self.post(first, "call/done", DialCallStatus="completed")
+        self.assertIn("/call</Redirect>", self.post(second, "hold"))
+        self.assertEqual(list(HoldQueueEntry.objects.values_list("assignment_id", flat=True)), [second.id])
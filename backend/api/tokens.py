@@ -0,0 +1,54 @@
+import datetime
+
+from twilio.jwt.access_token import AccessToken
+from twilio.jwt.access_token.grants import VoiceGrant
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+
+CACHE_KEY_PREFIX = "twilio-token:"
+# Cached tokens are only handed out until this long before they expire, since the browser asks for a new one just
+# before expiry and should always get a fresh token when it does
+EXPIRY_MARGIN = 300
+REFRESH_TOKEN_SALT = "api.tokens.refresh"
+REFRESH_TOKEN_MAX_AGE = datetime.timedelta(days=1)
+
+
+def sign_token(identity) -> str:
+    token = AccessToken(
+        settings.TWILIO_ACCOUNT_SID,
+        settings.TWILIO_API_KEY,
+        settings.TWILIO_API_SECRET,
+        identity=identity,
+        ttl=settings.TWILIO_TOKEN_TTL,
+    )
+    token.add_grant(VoiceGrant(outgoing_application_sid=settings.TWILIO_TWIML_APP_SID))
+    return token.to_jwt()
+
+
+def get_tokens(identities) -> dict:
+    # One cache round-trip for the lot, signing only those not already cached
+    keys = {f"{CACHE_KEY_PREFIX}{identity}": identity for identity in identities}
+    cached = cache.get_many(keys)
+    signed = {key: sign_token(identity) for key, identity in keys.items() if key not in cached}
+    if signed:
+        timeout = max(settings.TWILIO_TOKEN_TTL - EXPIRY_MARGIN, settings.TWILIO_TOKEN_TTL // 2)
+        cache.set_many(signed, timeout=timeout)
+    return {keys[key]: token for key, token in (cached | signed).items()}
+
+
+def get_token(identity) -> str:
+    return get_tokens((identity,))[identity]
+
+
+def make_refresh_token(identity) -> str:
+    return signing.dumps(identity, salt=REFRESH_TOKEN_SALT)
+
+
+def get_identity_from_refresh_token(refresh_token):
+    try:
+        return signing.loads(refresh_token, salt=REFRESH_TOKEN_SALT, max_age=REFRESH_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
@@ -1,14 +1,18 @@
 import datetime
 from functools import cache
+from itertools import accumulate
 import logging
+import os
+import random
 import re
 
 import boto3
 from dateutil.parser import parse as dateutil_parse
+from faker.providers.person.en_US import Provider as PersonProvider
 import geoip2.database
 
 from django.conf import settings
-from django.db import models
+from django.db import connection, models
 from django.utils import timezone
 from django.utils.formats import date_format as django_date_format
 
@@ -19,6 +23,16 @@ underscore_converter_re = re.compile(r"(?<!^)(?=[A-Z])")
 depunctuate_words_re = re.compile(r"[^a-z]+")
 logger = logging.getLogger(f"calls.{__name__}")
 
+# Same names and weights Faker().first_name_{gender}() picks from, built once rather than constructing Faker per call
+FAKE_NAME_GENDERS = ("male", "female")
+_fake_names = {gender: tuple(getattr(PersonProvider, f"first_names_{gender}")) for gender in FAKE_NAME_GENDERS}
+_fake_name_cum_weights = {
+    gender: tuple(accumulate(getattr(PersonProvider, f"first_names_{gender}").values())) for gender in FAKE_NAME_GENDERS
+}
+_fake_name_random = random.Random()
+# Forked gunicorn workers (preload_app = True) would otherwise all generate the same sequence of names
+os.register_at_fork(after_in_child=_fake_name_random.seed)
+
 
 def short_datetime_str(datetime_or_string: datetime.datetime | str):
     if isinstance(datetime_or_string, str):
@@ -70,10 +84,15 @@ def get_ip_addr(request):
     return request.META.get("HTTP_X_REAL_IP") or request.META.get("REMOTE_ADDR")
 
 
+@cache
+def get_geoip_reader():
+    # Opening the database is expensive, so do it once per process (memory mapped, so shared between workers)
+    return geoip2.database.Reader(settings.GEOIP2_LITE_CITY_DB_PATH, mode=geoip2.database.MODE_MMAP)
+
+
 def get_location_from_ip_addr(ip_addr):
     try:
-        with geoip2.database.Reader(settings.GEOIP2_LITE_CITY_DB_PATH) as reader:
-            resp = reader.city(ip_addr)
+        resp = get_geoip_reader().city(ip_addr)
         parts = (resp.city.name, resp.subdivisions.most_specific.name, resp.country.name, resp.continent.name)
         return ", ".join(filter(None, parts)) or LOCATION_UNKNOWN
     except Exception:
@@ -82,6 +101,36 @@ def get_location_from_ip_addr(ip_addr):
     return LOCATION_UNKNOWN
 
 
+def generate_fake_name() -> tuple[str, str]:
+    gender = _fake_name_random.choice(FAKE_NAME_GENDERS)
+    return gender, _fake_name_random.choices(_fake_names[gender], cum_weights=_fake_name_cum_weights[gender])[0]
+
+
+def get_upsert_sql(obj: models.Model, *, unique_field, update):
+    # SQL and params for upsert(), below
+    meta, qn = obj._meta, connection.ops.quote_name
+    fields = [field for field in meta.concrete_fields if not field.primary_key]
+    params = [field.get_db_prep_save(field.pre_save(obj, add=True), connection) for field in fields]
+    updates = []
+    for name, sql in update.items():
+        column = qn(meta.get_field(name).column)
+        updates.append(f"{column} = {sql or f'EXCLUDED.{column}'}")
+    sql = (
+        f"INSERT INTO {qn(meta.db_table)} ({', '.join(qn(field.column) for field in fields)})"
+        f" VALUES ({', '.join(['%s'] * len(fields))})"
+        f" ON CONFLICT ({qn(meta.get_field(unique_field).column)}) DO UPDATE SET {', '.join(updates)} RETURNING *"
+    )
+    return sql, params
+
+
+def upsert(obj: models.Model, *, unique_field, update):
+    """INSERT ... ON CONFLICT ... DO UPDATE ... RETURNING * for obj, in a single round-trip. Returns the inserted or
+    updated row as a model instance. update maps field names to the SQL to set them to on conflict, or None to use the
+    value that would have been inserted."""
+    sql, params = get_upsert_sql(obj, unique_field=unique_field, update=update)
+    return next(iter(type(obj).objects.raw(sql, params)))
+
+
 def block_or_unblock_worker(amazon_id, *, block=True):
     success = False
     verb = "block" if block else "unblock"
@@ -0,0 +1,16 @@
+# Gunicorn worker pool saturation, shared between a pool's workers. Set up in each worker by gunicorn.conf.py, so
+# unavailable under runserver or in management commands.
+_pool = None
+
+
+def init(name, *, busy_pids, num_workers):
+    global _pool
+    _pool = (name, busy_pids, num_workers)
+
+
+def get_saturation():
+    # Returns (pool name, busy workers, total workers), or None outside of gunicorn
+    if _pool is None:
+        return None
+    name, busy_pids, num_workers = _pool
+    return name, sum(1 for pid in busy_pids if pid), num_workers
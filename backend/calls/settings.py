@@ -28,6 +28,7 @@ TWILIO_SIP_SIMULATE_USERNAME = env("TWILIO_SIP_SIMULATE_USERNAME", default="simu
 TWILIO_TWIML_APP_SID = env("TWILIO_TWIML_APP_SID")
 TWILIO_API_KEY = env("TWILIO_API_KEY")
 TWILIO_API_SECRET = env("TWILIO_API_SECRET")
+TWILIO_TOKEN_TTL = env.int("TWILIO_TOKEN_TTL", default=3600)
 
 ALLOW_MTURK_PRODUCTION_ACCESS = env.bool("ALLOW_MTURK_PRODUCTION_ACCESS", default=False)
 AWS_ACCESS_KEY_ID = env("AWS_ACCESS_KEY_ID")
@@ -35,6 +36,17 @@ AWS_SECRET_ACCESS_KEY = env("AWS_SECRET_ACCESS_KEY")
 
 GEOIP2_LITE_CITY_DB_PATH = env("GEOIP2_LITE_CITY_DB_PATH")
 
+RECORDING_ARCHIVE_MAX_WORKERS = env.int("RECORDING_ARCHIVE_MAX_WORKERS", default=2)
+PAGE_LOAD_RETENTION_MONTHS = env.int("PAGE_LOAD_RETENTION_MONTHS", default=12)
+HIT_API_SHED_ACTIVE_QUERIES = env.int("HIT_API_SHED_ACTIVE_QUERIES", default=16)
+JOB_RUNNER_CONCURRENCY = env.int("JOB_RUNNER_CONCURRENCY", default=4)
+MTURK_PUBLISH_MAX_WORKERS = env.int("MTURK_PUBLISH_MAX_WORKERS", default=4)
+MTURK_CREATE_HIT_RATE = env.float("MTURK_CREATE_HIT_RATE", default=5.0)
+SCHEDULER_INTERVAL = env.float("SCHEDULER_INTERVAL", default=30.0)
+HOLD_QUEUE_DIALERS = env.int("HOLD_QUEUE_DIALERS", default=1)
+HIT_CALL_QUEUE = env.bool("HIT_CALL_QUEUE", default=False)
+QUERY_BUDGETS = env.bool("QUERY_BUDGETS", default=DEBUG)
+
 ALLOWED_HOSTS = [DOMAIN_NAME]
 if DEBUG:
     ALLOWED_HOSTS.append("localhost")
@@ -71,6 +83,7 @@ INSTALLED_APPS.extend([
 ])
 
 MIDDLEWARE = [
+    "api.middleware.PoolSaturationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -142,11 +155,6 @@ LOGGING = {
             "level": "INFO",
             "propagate": False,
         },
-        "huey": {
-            "handlers": ["console"],
-            "level": "INFO",
-            "propagate": False,
-        },
         "calls": {
             "handlers": ["console"],
             "level": "INFO",
@@ -166,6 +174,8 @@ STATIC_URL = "/static/"
 STATIC_ROOT = "/serve/static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = "/serve/media/"
+SOUNDS_URL = "/sounds/"  # Processed phone sounds, built by ./manage.py build_sounds
+SOUNDS_ROOT = "/serve/sounds/"
 
 SESSION_ENGINE = "django.contrib.sessions.backends.signed_cookies"
 SESSION_COOKIE_AGE = 315360000  # 10 years
@@ -196,6 +206,13 @@ CONSTANCE_CONFIG = {
             " because they can get expensive."
         ),
     ),
+    "AUTO_BLOCK_SPAMMERS": (
+        False,
+        (
+            "Block workers queued by the spam detector as soon as they're detected. Otherwise the queue is processed"
+            " from the MTurk worker auto-blocks admin, or with ./manage.py process_auto_blocks."
+        ),
+    ),
 }
 
 if DEBUG:
@@ -9,6 +9,8 @@ from django.urls import include, path, re_path
 
 from api.apis import hit_api, twilio_mturk_api, twilio_phone_api
 from api.models import WorkerPageLoad
+from api.spam import record_page_load
+from api.utils import get_ip_addr
 
 
 logger = logging.getLogger(f"calls.{__name__}")
@@ -50,6 +52,16 @@ def hit_passthrough(request):
         worker_id, had_amp_encoded = page_load["worker_amazon_id"], "had_amp_encoded" in page_load
         logger.info(f"Worker {worker_id} loaded page, logging{' (had amp encoded)' if had_amp_encoded else ''}")
         WorkerPageLoad.objects.create(**page_load)
+        try:
+            record_page_load(
+                worker_amazon_id=worker_id,
+                assignment_amazon_id=page_load.get("assignment_amazon_id"),
+                ip_addr=get_ip_addr(request),
+                had_amp_encoded=had_amp_encoded,
+            )
+        except Exception:
+            # Best effort, never at the expense of serving the worker their HIT
+            logger.exception(f"Error recording page load of worker {worker_id} for spam detection")
 
     return HttpResponse(headers={"X-Accel-Redirect": f"/__hit_passthrough__{request.path}"})
 
@@ -71,4 +83,5 @@ urlpatterns = [
 
 if settings.DEBUG:
     urlpatterns.extend(static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT))
+    urlpatterns.extend(static(settings.SOUNDS_URL, document_root=settings.SOUNDS_ROOT))
     urlpatterns.append(path("__debug__/", include("debug_toolbar.urls")))
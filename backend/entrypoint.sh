@@ -22,13 +22,19 @@ cd "$(dirname "$0")"
 
 wait-for-it --timeout 0 --service db:5432
 
-if [ -z "$DEBUG" ]; then
-    # Do this in the background
-    ./manage.py collectstatic --noinput &
+if [ "$WAIT_FOR_BACKEND" ]; then
+    # The main backend migrates and builds sounds before it starts serving, and collects static files
+    wait-for-it --timeout 0 --service backend:8000
+else
+    if [ -z "$DEBUG" ]; then
+        # Do this in the background
+        ./manage.py collectstatic --noinput &
+    fi
+    ./manage.py migrate
+    ./manage.py partition_page_loads
+    ./manage.py build_sounds
 fi
 
-./manage.py migrate
-
 if [ "$DEBUG" ]; then
     if [ "$(./manage.py shell -c 'from api.models import User; print("" if User.objects.exists() else "1")')" = 1 ]; then
         DJANGO_SUPERUSER_PASSWORD=calls ./manage.py createsuperuser --noinput --username calls --email ''
@@ -1,18 +1,62 @@
 import multiprocessing
 import os
+import time
 
 
+# With the twilio-pool compose profile, Twilio's webhooks get their own pool (in the backend-twilio container), so
+# they're never stuck waiting behind slow admin pages. nginx routes /api/mturk/ and /api/phone/ to it.
+POOL = os.environ.get("GUNICORN_POOL", "web")
+# Log that a pool is saturated at most this often
+SATURATED_LOG_INTERVAL = 10
+
 accesslog = "-"
 bind = ["0.0.0.0:8000"]
 capture_output = True
 forwarded_allow_ips = "*"
 preload_app = True
+proc_name = f"calls-{POOL}"
 reuse_port = True
-workers = int(os.environ.get("NUM_GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+workers = int(
+    os.environ.get(
+        f"NUM_GUNICORN_WORKERS_{POOL.upper()}",
+        os.environ.get("NUM_GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1),
+    )
+)
 wsgi_app = "calls.wsgi"
 
+# PIDs of busy workers (or 0s), shared by all of them since they're forked from the arbiter. PIDs rather than a
+# count, so a worker killed mid request can be cleared out, rather than counting as busy forever.
+busy_pids = multiprocessing.Array("i", workers)
+last_saturated_log = multiprocessing.Value("d", 0.0)
+
+
+def set_busy(pid, busy):
+    with busy_pids.get_lock():
+        for i, slot_pid in enumerate(busy_pids):
+            if slot_pid == (0 if busy else pid):
+                busy_pids[i] = pid if busy else 0
+                break
+        return sum(1 for slot_pid in busy_pids if slot_pid)
+
+
+def post_fork(server, worker):
+    from calls import pools
+
+    pools.init(POOL, busy_pids=busy_pids, num_workers=workers)
+
+
+def pre_request(worker, req):
+    if set_busy(worker.pid, True) >= workers:
+        with last_saturated_log.get_lock():
+            if (now := time.monotonic()) - last_saturated_log.value >= SATURATED_LOG_INTERVAL:
+                last_saturated_log.value = now
+                worker.log.warning(f"Pool {POOL} saturated, all {workers} workers busy (at {req.method} {req.path})")
+
+
+def post_request(worker, req, environ, resp):
+    set_busy(worker.pid, False)
 
-def post_worker_init(worker):
-    from faker import Faker
 
-    Faker.seed()  # Faker needs to be re-seeded before use (preload_app = True)
+def child_exit(server, worker):
+    # In the arbiter, for workers that died (or timed out) mid request
+    set_busy(worker.pid, False)
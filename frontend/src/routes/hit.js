@@ -101,6 +101,8 @@ const createState = () => {
 
   /** @type {import("@twilio/voice-sdk").Call}} */
   let call = null
+  // Signed by the server at handshake, lets /token skip looking up the assignment
+  let refreshCredential = null
   return {
     subscribe: subscribeDerived,
     async initialize() {
@@ -122,7 +124,8 @@ const createState = () => {
           return
         }
 
-        const { isStaff, token, ...rest } = data
+        const { isStaff, token, refreshToken, ...rest } = data
+        refreshCredential = refreshToken
 
         if (isStaff) {
           // In case we're staff, these may have been sent back by server if unspecified
@@ -170,7 +173,7 @@ const createState = () => {
       }
     },
     async refreshToken() {
-      const { success, token } = await post("token")
+      const { success, token } = await post("token", { refreshToken: refreshCredential })
       if (success) {
         device.updateToken(token)
         this.logProgress("update token")